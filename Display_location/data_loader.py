@@ -1,7 +1,13 @@
 import re
 import os
+import sys
 import numpy as np
 
+# 跳变检测与 TrajectoryComparison 共用 jump_events.py (只依赖 numpy，阈值也在那里统一修改)。
+# 追加到 sys.path 末尾：本工具自己的 main.py 等模块仍然优先，不会被另一个工具的同名模块覆盖
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'TrajectoryComparison'))
+from jump_events import detect_jumps, parse_log_times
+
 class DataLoader:
     def __init__(self):
         self.trajectory_data = [] 
@@ -97,6 +103,25 @@ class DataLoader:
                     count += 1
         return count
 
+    def detect_jumps(self, **options):
+        """
+        把每个日志的记录整理成列式数组后交给 jump_events.detect_jumps，标记位置跳变 (jump)、
+        航向跳变 (yaw) 和定位状态切换 (state)。返回按 (日志, 帧) 排序的事件字典列表，index 为日志内跳变后的帧
+        """
+        events = []
+        for log_name in sorted(self.all_logs_data.keys()):
+            data = self.all_logs_data[log_name]
+            timestamps = [d['timestamp'] for d in data]
+            columns = {
+                'x': self.all_logs_np[log_name]['x'], 'y': self.all_logs_np[log_name]['y'],
+                't': np.array([d['t'] for d in data]), 'time': parse_log_times(timestamps),
+                'timestamps': timestamps, 'states': [d['loc_state'] for d in data],
+            }
+            for e in detect_jumps(columns, **options):
+                e['file'] = log_name
+                events.append(e)
+        return events
+
     def select_log(self, log_name):
         if log_name in self.all_logs_data:
             self.trajectory_data = self.all_logs_data[log_name]
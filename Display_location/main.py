@@ -3,7 +3,7 @@ import os
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
                              QHBoxLayout, QPushButton, QLabel, QFileDialog, 
-                             QSlider, QGroupBox, QFormLayout, QMessageBox)
+                             QSlider, QGroupBox, QFormLayout, QMessageBox, QListWidget, QListWidgetItem)
 from PyQt5.QtCore import Qt
 
 from data_loader import DataLoader
@@ -163,6 +163,17 @@ class MainWindow(QMainWindow):
         grp_filter.setLayout(filter_layout)
         ctrl_layout.addWidget(grp_filter)
 
+        # 6. 跳变事件 (重定位跳变 / 状态切换)，单击跳到对应帧
+        grp_jumps = QGroupBox("Jump Events")
+        jumps_layout = QVBoxLayout()
+        self.list_jumps = QListWidget()
+        self.list_jumps.setMaximumHeight(200)
+        self.list_jumps.setStyleSheet("font-family: Consolas, monospace; font-size: 11px;")
+        self.list_jumps.itemClicked.connect(self.on_jump_clicked)
+        jumps_layout.addWidget(self.list_jumps)
+        grp_jumps.setLayout(jumps_layout)
+        ctrl_layout.addWidget(grp_jumps)
+
         ctrl_layout.addStretch()
         layout.addWidget(control_panel)
 
@@ -230,6 +241,29 @@ class MainWindow(QMainWindow):
             self.update_frame_info(0)
         else:
             self.lbl_status.setText("No log data loaded.")
+        self.refresh_jump_events()
+
+    def refresh_jump_events(self):
+        """对所有日志做跳变检测，列表项记录对应的全局帧号"""
+        self.list_jumps.clear()
+        for e in self.loader.detect_jumps():
+            text = (f"{e['time'][11:]} {e['reason']:<10} {e['jump_m']:.2f} m {e['yaw_deg']:.1f}°\n"
+                    f"  {e['file']} #{e['index']} | {e['state_from']} -> {e['state_to']}")
+            item = QListWidgetItem(text)
+            item.setData(Qt.UserRole, self.global_index(e['file'], e['index']))
+            self.list_jumps.addItem(item)
+
+    def on_jump_clicked(self, item):
+        self.update_frame_info(item.data(Qt.UserRole))
+
+    def global_index(self, log_name, local_idx):
+        """日志内的局部索引 -> 合并轨迹中的全局索引"""
+        global_idx = 0
+        for name in self.log_files_list:
+            if name == log_name:
+                return global_idx + local_idx
+            global_idx += len(self.loader.all_logs_data[name])
+        return global_idx
 
     def activate_log(self, log_name):
         self.loader.select_log(log_name)
@@ -313,13 +347,7 @@ class MainWindow(QMainWindow):
 
         if best_log and min_dist < 5.0:
             # 计算局部索引在全局列表中的绝对偏移量
-            global_idx = 0
-            for name in self.log_files_list:
-                if name == best_log:
-                    global_idx += best_local_idx
-                    break
-                global_idx += len(self.loader.all_logs_data[name])
-                
+            global_idx = self.global_index(best_log, best_local_idx)
             self.update_frame_info(global_idx)
             print(f"Jumped to Global Frame {global_idx} (dist={min_dist:.2f})")
 
@@ -0,0 +1,59 @@
+import numpy as np
+
+
+class FrameTimeIndex:
+    """
+    扫描时间戳 -> 帧序号的索引。
+    文件名排序不一定等于时间顺序 (例如 99999_20.pcd 排在 100000_20.pcd 之后)，
+    因此建立一次按时间排序的数组，之后所有跳转都是 O(log n) 的二分查找，无需再扫描目录。
+    """
+
+    def __init__(self, timestamps, unit=1e-3):
+        """timestamps: 每帧的原始时间戳 (解析失败为 NaN)；unit: 原始时间戳换算为秒的系数"""
+        raw = np.asarray(timestamps, dtype=np.float64)
+        valid = np.flatnonzero(np.isfinite(raw))
+        order = valid[np.argsort(raw[valid], kind='stable')]
+        self.unit = unit
+        self.frame_times = raw * unit                 # 按帧序号索引的时间 (秒)
+        self.sorted_times = self.frame_times[order]   # 升序时间 (秒)
+        self.sorted_frames = order                    # 与 sorted_times 对应的帧序号
+
+    def __len__(self):
+        return len(self.sorted_frames)
+
+    @property
+    def start_time(self):
+        return self.sorted_times[0] if len(self) else float('nan')
+
+    @property
+    def end_time(self):
+        return self.sorted_times[-1] if len(self) else float('nan')
+
+    def seek(self, t):
+        """返回时间最接近 t (秒) 的帧序号；没有时间戳时返回 None"""
+        if len(self) == 0:
+            return None
+        pos = int(np.searchsorted(self.sorted_times, t))
+        if pos >= len(self):
+            pos = len(self) - 1
+        elif pos > 0 and t - self.sorted_times[pos - 1] <= self.sorted_times[pos] - t:
+            pos -= 1
+        return int(self.sorted_frames[pos])
+
+    def seek_raw(self, raw_timestamp):
+        """按原始时间戳 (与文件名同单位) 跳转"""
+        return self.seek(raw_timestamp * self.unit)
+
+    def shift_seconds(self, frame, seconds):
+        """
+        从当前帧出发跳转 ±seconds 秒：向后取第一个不早于目标时刻的帧，向前取最后一个不晚于目标时刻的帧。
+        当前帧没有时间戳时保持不动
+        """
+        t = self.frame_times[frame]
+        if not np.isfinite(t) or len(self) == 0:
+            return frame
+        if seconds >= 0:
+            pos = min(int(np.searchsorted(self.sorted_times, t + seconds, side='left')), len(self) - 1)
+        else:
+            pos = max(int(np.searchsorted(self.sorted_times, t + seconds, side='right')) - 1, 0)
+        return int(self.sorted_frames[pos])
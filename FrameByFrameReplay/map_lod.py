@@ -0,0 +1,84 @@
+import os
+import numpy as np
+
+from pcd_reader import read_scan_pcd
+
+# 降采样结果缓存目录 (位于地图文件旁边)
+MAP_CACHE_DIRNAME = ".map_cache"
+
+
+def voxel_downsample(points, voxel_size):
+    """体素降采样：每个体素内的点取质心 (纯 numpy 向量化)"""
+    if len(points) == 0 or not voxel_size:
+        return points
+    keys = np.floor(points / voxel_size).astype(np.int64)
+    keys -= keys.min(axis=0)
+    dims = keys.max(axis=0) + 1
+    # 三维体素坐标压成一维编号，再用一维 unique 分组
+    linear = (keys[:, 0] * dims[1] + keys[:, 1]) * dims[2] + keys[:, 2]
+    _, inverse, counts = np.unique(linear, return_inverse=True, return_counts=True)
+    inverse = inverse.ravel()
+    down = np.empty((len(counts), 3), dtype=np.float64)
+    for axis in range(3):
+        down[:, axis] = np.bincount(inverse, weights=points[:, axis], minlength=len(counts)) / counts
+    return down
+
+
+def _cache_path(file_path, voxel_size):
+    folder = os.path.join(os.path.dirname(os.path.abspath(file_path)), MAP_CACHE_DIRNAME)
+    return os.path.join(folder, f"{os.path.basename(file_path)}.voxel{voxel_size:g}.npz")
+
+
+def _source_stamp(file_path):
+    st = os.stat(file_path)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def load_full_map(file_path):
+    """读取全分辨率地图点 (float64)"""
+    xyz, _, _ = read_scan_pcd(file_path)
+    xyz = xyz.astype(np.float64)
+    return xyz[np.isfinite(xyz).all(axis=1)]
+
+
+def _map_meta(points):
+    """地图元数据：用于回正的点和/点数 (可跨地图合并求中心) 与包围盒"""
+    if len(points) == 0:
+        return {'count': 0, 'point_sum': np.zeros(3), 'min': np.zeros(3), 'max': np.zeros(3)}
+    return {'count': len(points), 'point_sum': points.sum(axis=0),
+            'min': points.min(axis=0), 'max': points.max(axis=0)}
+
+
+def load_map_lod(file_path, voxel_size):
+    """
+    读取降采样后的地图，返回 (points float64, meta)
+    结果按 (地图文件, 体素大小) 缓存为 .npz (点以 float32 存储)，源文件大小或修改时间变化时自动重建。
+    首次生成时也先量化到 float32 再返回，命中缓存与否结果完全一致。
+    voxel_size 为 None/0 时直接返回全分辨率地图。
+    """
+    if not voxel_size:
+        points = load_full_map(file_path)
+        return points, _map_meta(points)
+
+    cache_path = _cache_path(file_path, voxel_size)
+    stamp = _source_stamp(file_path)
+    if os.path.exists(cache_path):
+        try:
+            with np.load(cache_path) as cache:
+                if np.array_equal(cache['stamp'], stamp):
+                    meta = {'count': int(cache['count']), 'point_sum': cache['point_sum'],
+                            'min': cache['min'], 'max': cache['max']}
+                    return cache['points'].astype(np.float64), meta
+        except Exception as e:
+            print(f"地图缓存损坏，重新生成: {e}")
+
+    full = load_full_map(file_path)
+    meta = _map_meta(full)
+    points = voxel_downsample(full, voxel_size).astype(np.float32)
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        np.savez(cache_path, points=points, stamp=stamp,
+                 count=meta['count'], point_sum=meta['point_sum'], min=meta['min'], max=meta['max'])
+    except OSError as e:
+        print(f"地图缓存写入失败: {e}")
+    return points.astype(np.float64), meta
@@ -0,0 +1,208 @@
+import os
+import sys
+import io
+import glob
+import time
+import shutil
+import argparse
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import open3d as o3d
+import open3d.visualization.rendering as rendering
+
+from map_lod import load_map_lod
+from replay_style import (build_pose_arrow, build_reflector_spheres, colorize_scan, get_map_style,
+                          is_reflector_map, planar_pose)
+from scan_archive import ARCHIVE_SUFFIX, open_scan_source, read_scan_frame
+
+# 强制设置标准输出为 UTF-8，解决中文乱码
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+FRAME_NAME_FORMAT = "frame_%06d.png"
+CAMERA_FOV = 60.0  # 垂直视场角 (度)
+
+
+class OffscreenReplayRenderer:
+    """无窗口逐帧渲染：与 PointCloudPlayer 相同的地图样式、强度高亮与朝向箭头"""
+
+    def __init__(self, map_path, frames_dir, width=1280, height=720,
+                 map_voxel_size=0.05, view_extent=40.0, follow=True):
+        self.frames_dir = frames_dir
+        self.archive, self.pcd_files = open_scan_source(frames_dir)
+        self.view_extent = view_extent  # 画面覆盖的范围 (米)
+        self.follow = follow            # True: 镜头跟随机器人; False: 固定在地图中心
+
+        self.renderer = rendering.OffscreenRenderer(width, height)
+        self.scene = self.renderer.scene
+        self.scene.set_background([1.0, 1.0, 1.0, 1.0])
+
+        self.scan_material = rendering.MaterialRecord()
+        self.scan_material.shader = "defaultUnlit"
+        self.scan_material.point_size = 3.0
+
+        arrow_material = rendering.MaterialRecord()
+        arrow_material.shader = "defaultLit"
+        self.scene.add_geometry("arrow", build_pose_arrow(), arrow_material)
+
+        map_files = sorted(glob.glob(os.path.join(map_path, "*.pcd"))) if os.path.isdir(map_path) else [map_path]
+        total_count, point_sum = 0, np.zeros(3)
+        for file_path in map_files:
+            if not os.path.exists(file_path):
+                continue
+            filename = os.path.basename(file_path)
+            style = get_map_style(filename)
+            reflector = is_reflector_map(filename)
+            points, meta = load_map_lod(file_path, None if reflector else map_voxel_size)
+            if len(points) == 0:
+                continue
+            points[:, 2] += style.get('z_offset', 0.0)
+            if not reflector:
+                total_count += meta['count']
+                point_sum += meta['point_sum']
+
+            material = rendering.MaterialRecord()
+            if reflector:
+                # 与 PointCloudPlayer 一致：反光板画成小球而不是大点
+                material.shader = "defaultLit"
+                self.scene.add_geometry(f"map_{filename}", build_reflector_spheres(points, style['color']), material)
+                continue
+            pcd = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+            pcd.paint_uniform_color(style['color'])
+            material.shader = "defaultUnlit"
+            material.point_size = style['point_size']
+            self.scene.add_geometry(f"map_{filename}", pcd, material)
+
+        self.map_center = point_sum / total_count if total_count > 0 else np.zeros(3)
+
+    def _setup_camera(self, center):
+        """俯视 XY 平面，Y 轴朝上；相机高度按视场角换算，使画面纵向覆盖 view_extent 米"""
+        center = np.asarray(center, dtype=np.float64)
+        height = self.view_extent / (2.0 * np.tan(np.radians(CAMERA_FOV / 2.0)))
+        eye = center + np.array([0.0, 0.0, height])
+        self.renderer.setup_camera(CAMERA_FOV, center, eye, [0.0, 1.0, 0.0])
+
+    def render_frame(self, index):
+        """渲染单帧，返回 open3d.geometry.Image"""
+        points, intensities, transform_mat = read_scan_frame(self.archive, self.pcd_files, index)
+        points = points.astype(np.float64) @ transform_mat[:3, :3].T + transform_mat[:3, 3]
+        colors = colorize_scan(points, intensities)
+
+        cloud = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
+        cloud.colors = o3d.utility.Vector3dVector(colors)
+        if self.scene.has_geometry("scan"):
+            self.scene.remove_geometry("scan")
+        self.scene.add_geometry("scan", cloud, self.scan_material)
+        self.scene.set_geometry_transform("arrow", planar_pose(transform_mat))
+
+        self._setup_camera(transform_mat[:3, 3] if self.follow else self.map_center)
+        return self.renderer.render_to_image()
+
+
+def _render_range(map_path, frames_dir, out_dir, start, end, options):
+    """子进程：渲染 [start, end) 区间的帧，返回 (帧数, 耗时)"""
+    t0 = time.perf_counter()
+    renderer = OffscreenReplayRenderer(map_path, frames_dir, **options)
+    for index in range(start, end):
+        image = renderer.render_frame(index)
+        if out_dir is not None:
+            o3d.io.write_image(os.path.join(out_dir, FRAME_NAME_FORMAT % index), image)
+    return end - start, time.perf_counter() - t0
+
+
+def render_sequence(map_path, frames_dir, out_dir, start=0, end=None, workers=None, **options):
+    """
+    按帧区间把渲染任务分给多个进程，每个进程持有独立的离屏渲染器。
+    out_dir 为 None 时只渲染不落盘 (用于吞吐量测试)；落盘前先删除 out_dir 中上一次留下的 frame_*.png，
+    避免不同帧区间的结果混在一起。返回 (帧数, 总耗时, 实际帧区间 (start, end))
+    """
+    n_frames = len(open_scan_source(frames_dir)[1])
+    end = n_frames if end is None else min(end, n_frames)
+    if start >= end:
+        raise ValueError("没有可渲染的帧")
+    workers = max(1, min(workers or os.cpu_count() or 1, end - start))
+    if out_dir is not None:
+        os.makedirs(out_dir, exist_ok=True)
+        stale = [name for name in os.listdir(out_dir) if name.startswith("frame_") and name.endswith(".png")]
+        for name in stale:
+            os.remove(os.path.join(out_dir, name))
+        if stale:
+            print(f"已清理 {out_dir} 中上次渲染留下的 {len(stale)} 帧")
+
+    bounds = np.linspace(start, end, workers + 1).astype(int)
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(_render_range, map_path, frames_dir, out_dir, int(a), int(b), options)
+                   for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        results = [fut.result() for fut in futures]
+    elapsed = time.perf_counter() - t0
+
+    rendered = sum(r[0] for r in results)
+    for i, (count, cost) in enumerate(results):
+        print(f"  worker {i}: {count} 帧, {cost:.1f}s ({count / cost if cost > 0 else 0:.1f} fps)")
+    print(f"共渲染 {rendered} 帧, 用时 {elapsed:.1f}s, 吞吐量 {rendered / elapsed:.1f} fps ({len(results)} 进程)")
+    return rendered, elapsed, (start, end)
+
+
+def encode_video(png_dir, video_path, frame_range, fps=10):
+    """用 ffmpeg 把 render_sequence 本次写出的帧区间 [start, end) 编码为视频 (ffmpeg 需在 PATH 中)"""
+    if shutil.which("ffmpeg") is None:
+        print("未找到 ffmpeg，已保留 PNG 序列，可手动编码")
+        return False
+    start, end = frame_range
+    cmd = ["ffmpeg", "-y", "-loglevel", "error", "-framerate", str(fps), "-start_number", str(start),
+           "-i", os.path.join(png_dir, FRAME_NAME_FORMAT), "-frames:v", str(end - start),
+           "-c:v", "libx264", "-pix_fmt", "yuv420p", video_path]
+    subprocess.run(cmd, check=True)
+    print(f"视频已保存: {video_path}")
+    return True
+
+
+def benchmark(map_path, frames_dir, n_frames=200, **options):
+    """吞吐量测试：分别用 1 个进程和全部核心渲染前 n_frames 帧 (不落盘)"""
+    results = {}
+    for workers in sorted({1, os.cpu_count() or 1}):
+        print(f"\n=== Benchmark: {workers} 进程 ===")
+        rendered, elapsed, _ = render_sequence(map_path, frames_dir, None, 0, n_frames, workers=workers, **options)
+        results[workers] = rendered / elapsed
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="离屏回放：把扫描序列渲染为 PNG 序列或视频")
+    parser.add_argument("--map", default="./map", help="地图文件或文件夹")
+    parser.add_argument("--frames", default="scans_directory", help="PCD 文件夹或 .scanpack 打包文件")
+    parser.add_argument("--out", default="./out/replay", help="PNG 输出目录")
+    parser.add_argument("--video", default=None, help="输出视频路径 (如 ./out/replay.mp4)，需要 ffmpeg")
+    parser.add_argument("--fps", type=int, default=10, help="视频帧率")
+    parser.add_argument("--start", type=int, default=0)
+    parser.add_argument("--end", type=int, default=None)
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--extent", type=float, default=40.0, help="画面覆盖范围 (米)")
+    parser.add_argument("--fixed", action="store_true", help="镜头固定在地图中心 (默认跟随机器人)")
+    parser.add_argument("--voxel", type=float, default=0.05, help="地图体素降采样边长 (米)，0 为全分辨率")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N", help="只测试前 N 帧的渲染吞吐量")
+    args = parser.parse_args()
+
+    frames_dir = args.frames
+    if os.path.isfile(frames_dir + ARCHIVE_SUFFIX):
+        frames_dir = frames_dir + ARCHIVE_SUFFIX
+    options = dict(width=args.width, height=args.height, map_voxel_size=args.voxel or None,
+                   view_extent=args.extent, follow=not args.fixed)
+
+    try:
+        if args.benchmark:
+            benchmark(args.map, frames_dir, args.benchmark, **options)
+        else:
+            _, _, frame_range = render_sequence(args.map, frames_dir, args.out, args.start, args.end,
+                                                workers=args.workers, **options)
+            if args.video:
+                encode_video(args.out, args.video, frame_range, args.fps)
+    except Exception as e:
+        print(f"发生错误: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,156 @@
+import numpy as np
+
+# PCD 头部 TYPE/SIZE 到 numpy 类型的映射
+_PCD_TYPES = {
+    ('F', 4): '<f4', ('F', 8): '<f8',
+    ('I', 1): 'i1', ('I', 2): '<i2', ('I', 4): '<i4', ('I', 8): '<i8',
+    ('U', 1): 'u1', ('U', 2): '<u2', ('U', 4): '<u4', ('U', 8): '<u8',
+}
+
+DEFAULT_VIEWPOINT = [0.0, 0.0, 0.0, 1.0, 0.0, 0.0, 0.0]
+
+
+def viewpoint_to_matrix(viewpoint):
+    """VIEWPOINT (tx ty tz qw qx qy qz) 转 4x4 位姿矩阵"""
+    tx, ty, tz, w, x, y, z = viewpoint
+    norm = np.sqrt(w*w + x*x + y*y + z*z)
+    if norm > 0:
+        w, x, y, z = w / norm, x / norm, y / norm, z / norm
+    transform_matrix = np.eye(4)
+    transform_matrix[:3, :3] = [
+        [1 - 2*(y*y + z*z), 2*(x*y - z*w),     2*(x*z + y*w)],
+        [2*(x*y + z*w),     1 - 2*(x*x + z*z), 2*(y*z - x*w)],
+        [2*(x*z - y*w),     2*(y*z + x*w),     1 - 2*(x*x + y*y)],
+    ]
+    transform_matrix[:3, 3] = [tx, ty, tz]
+    return transform_matrix
+
+
+def parse_pcd_header(raw):
+    """解析 PCD 头部，返回 (头部字典, 数据区起始偏移)"""
+    header = {'fields': [], 'size': [], 'type': [], 'count': [],
+              'width': 0, 'height': 1, 'points': None,
+              'viewpoint': list(DEFAULT_VIEWPOINT), 'data': None}
+    pos = 0
+    while pos < len(raw):
+        end = raw.find(b'\n', pos)
+        if end < 0:
+            end = len(raw)
+        line = raw[pos:end].decode('utf-8', errors='ignore').strip()
+        pos = end + 1
+        if not line or line.startswith('#'):
+            continue
+        parts = line.split()
+        key = parts[0].upper()
+        if key == 'FIELDS':
+            header['fields'] = parts[1:]
+        elif key == 'SIZE':
+            header['size'] = [int(p) for p in parts[1:]]
+        elif key == 'TYPE':
+            header['type'] = [p.upper() for p in parts[1:]]
+        elif key == 'COUNT':
+            header['count'] = [int(p) for p in parts[1:]]
+        elif key == 'WIDTH':
+            header['width'] = int(parts[1])
+        elif key == 'HEIGHT':
+            header['height'] = int(parts[1])
+        elif key == 'POINTS':
+            header['points'] = int(parts[1])
+        elif key == 'VIEWPOINT':
+            if len(parts) >= 8:
+                header['viewpoint'] = [float(p) for p in parts[1:8]]
+        elif key == 'DATA':
+            header['data'] = parts[1].lower() if len(parts) > 1 else 'ascii'
+            break
+
+    if header['data'] is None:
+        raise ValueError("PCD 头部缺少 DATA 字段")
+    if not header['count']:
+        header['count'] = [1] * len(header['fields'])
+    if header['points'] is None:
+        header['points'] = header['width'] * header['height']
+    return header, pos
+
+
+def read_pcd_header(file_path):
+    """只读取 PCD 头部 (不读数据区)"""
+    chunks = []
+    with open(file_path, 'rb') as f:
+        for line in f:
+            chunks.append(line)
+            if line.lstrip().upper().startswith(b'DATA'):
+                break
+    header, _ = parse_pcd_header(b''.join(chunks))
+    return header
+
+
+def _point_dtype(header):
+    """根据 FIELDS/SIZE/TYPE/COUNT 构造每个点的结构化 dtype"""
+    fields = []
+    for i, (name, size, type_, count) in enumerate(
+            zip(header['fields'], header['size'], header['type'], header['count'])):
+        key = (type_, size)
+        if key not in _PCD_TYPES:
+            raise ValueError(f"不支持的 PCD 字段类型: {name} TYPE={type_} SIZE={size}")
+        # 填充字段 "_" 可能重复出现，需要改名
+        field_name = name if name != '_' else f'_pad{i}'
+        fields.append((field_name, _PCD_TYPES[key], (count,)) if count > 1 else (field_name, _PCD_TYPES[key]))
+    return np.dtype(fields)
+
+
+def decode_scan_pcd(raw, file_path=None):
+    """
+    一次性解码 PCD 字节流，返回 (xyz float32 (N,3), intensity float32 (N,), 4x4 位姿)
+    binary 数据用 np.frombuffer 直接映射；binary_compressed 交给 Open3D 按 file_path 解码。
+    """
+    header, data_offset = parse_pcd_header(raw)
+    transform_mat = viewpoint_to_matrix(header['viewpoint'])
+    n_points = header['points']
+    fields = header['fields']
+    for axis in ('x', 'y', 'z'):
+        if axis not in fields:
+            raise ValueError(f"PCD 缺少坐标字段: {axis}")
+
+    if header['data'] == 'binary':
+        dtype = _point_dtype(header)
+        cloud = np.frombuffer(raw, dtype=dtype, count=n_points, offset=data_offset)
+        xyz = np.empty((n_points, 3), dtype=np.float32)
+        xyz[:, 0], xyz[:, 1], xyz[:, 2] = cloud['x'], cloud['y'], cloud['z']
+        intensity = cloud['intensity'].astype(np.float32) if 'intensity' in fields else None
+    elif header['data'] == 'ascii':
+        n_cols = sum(header['count'])
+        values = np.array(raw[data_offset:].split(), dtype=np.float64)
+        values = values[:n_points * n_cols].reshape(-1, n_cols)
+        # 计算每个字段所在的列
+        cols = np.concatenate(([0], np.cumsum(header['count'])))
+        col_of = {name: cols[i] for i, name in enumerate(fields)}
+        xyz = values[:, [col_of['x'], col_of['y'], col_of['z']]].astype(np.float32)
+        intensity = values[:, col_of['intensity']].astype(np.float32) if 'intensity' in fields else None
+    elif header['data'] == 'binary_compressed':
+        if file_path is None:
+            raise ValueError("binary_compressed 格式需要提供文件路径")
+        xyz, intensity = _decode_with_open3d(file_path)
+    else:
+        raise ValueError(f"不支持的 PCD DATA 格式: {header['data']}")
+
+    if intensity is None:
+        intensity = np.zeros(len(xyz), dtype=np.float32)
+    return xyz, intensity, transform_mat
+
+
+def _decode_with_open3d(file_path):
+    """LZF 压缩数据没有纯 numpy 解法，回退到 Open3D 的 tensor 读取器"""
+    import open3d as o3d
+    pcd_t = o3d.t.io.read_point_cloud(file_path)
+    xyz = pcd_t.point.positions.numpy().astype(np.float32)
+    intensity = None
+    if 'intensity' in pcd_t.point:
+        intensity = pcd_t.point['intensity'].numpy().flatten().astype(np.float32)
+    return xyz, intensity
+
+
+def read_scan_pcd(file_path):
+    """读取并解码单帧扫描 PCD (一次 IO，头部只解析一次)"""
+    with open(file_path, 'rb') as f:
+        raw = f.read()
+    return decode_scan_pcd(raw, file_path)
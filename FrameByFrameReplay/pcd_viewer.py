@@ -3,43 +3,29 @@ import io
 import open3d as o3d
 import os
 import glob
+import time
 import numpy as np
 
+from map_lod import load_full_map, load_map_lod
+from pcd_reader import decode_scan_pcd
+from replay_style import (build_pose_arrow, build_reflector_spheres, colorize_scan, get_map_style,
+                          is_reflector_map, planar_pose)
+from frame_index import FrameTimeIndex
+from scan_accumulator import ScanRingBuffer
+from scan_archive import ARCHIVE_SUFFIX, open_scan_source, parse_scan_timestamp, read_scan_frame
+
 # 强制设置标准输出为 UTF-8，解决中文乱码
 sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
 
-def parse_pcd_viewpoint(file_path):
-    """解析 PCD 文件头部的 VIEWPOINT 字段"""
-    translation = np.array([0.0, 0.0, 0.0])
-    rotation_q = np.array([1.0, 0.0, 0.0, 0.0]) # w, x, y, z
-    
-    try:
-        with open(file_path, 'rb') as f:
-            while True:
-                line = f.readline().decode('utf-8', errors='ignore')
-                if line.startswith('DATA'): 
-                    break
-                if line.startswith('VIEWPOINT'):
-                    parts = line.strip().split()
-                    if len(parts) >= 8:
-                        translation = np.array([float(parts[1]), float(parts[2]), float(parts[3])])
-                        rotation_q = np.array([float(parts[4]), float(parts[5]), float(parts[6]), float(parts[7])])
-                    break
-    except Exception as e:
-        print(f"解析 Viewpoint 失败: {e}")
-
-    R = o3d.geometry.get_rotation_matrix_from_quaternion(rotation_q)
-    transform_matrix = np.eye(4)
-    transform_matrix[:3, :3] = R
-    transform_matrix[:3, 3] = translation
-    return transform_matrix
-
 class PointCloudPlayer:
-    def __init__(self, map_path, frames_dir):
+    def __init__(self, map_path, frames_dir, map_voxel_size=None, score_table=None,
+                 timestamp_unit=1e-3, jump_frames=10, jump_seconds=5.0,
+                 accumulate_scans=20, accumulate_points=20000):
         self.frames_dir = frames_dir
         self.current_index = 0
         
-        self.pcd_files = sorted(glob.glob(os.path.join(frames_dir, "*.pcd")))
+        # 帧来源：.scanpack 打包文件 (memmap 零拷贝) 或 PCD 文件夹
+        self.archive, self.pcd_files = open_scan_source(frames_dir)
         
         if not self.pcd_files:
             print(f"错误: 在 {frames_dir} 中没有找到 .pcd 文件")
@@ -47,13 +33,32 @@ class PointCloudPlayer:
             
         print(f"共加载了 {len(self.pcd_files)} 帧动态点云。")
 
+        # 时间戳索引 (打包文件直接读索引中的时间戳，否则从文件名解析)，用于按时间跳转
+        if self.archive is not None:
+            timestamps = self.archive.timestamps
+        else:
+            timestamps = [parse_scan_timestamp(p) for p in self.pcd_files]
+        self.time_index = FrameTimeIndex(timestamps, unit=timestamp_unit)
+        self.jump_frames = jump_frames
+        self.jump_seconds = jump_seconds
+        if len(self.time_index):
+            print(f"时间范围: {self.time_index.start_time:.3f} ~ {self.time_index.end_time:.3f} s "
+                  f"({len(self.time_index)} 帧带时间戳)")
+
         self.vis = o3d.visualization.VisualizerWithKeyCallback()
         self.vis.create_window(window_name="PCD Player (按 R 回正)", width=1280, height=720)
         self.vis.get_render_option().point_size = 3.0  # 调整全局点大小
         
-        self.current_arrow = None
+        self.current_arrow = build_pose_arrow()
+        self.arrow_pose = np.eye(4)  # 箭头当前所处的位姿 (用于计算增量变换)
         self.map_geometries = {}  # 存储所有地图的几何体对象
         self.map_styles = {}  # 存储所有地图的样式信息
+        self.map_meta = {}  # 点云地图的元数据 (点数、点和、包围盒，来自降采样缓存)
+        self.map_paths = {}  # 点云地图的文件路径 (用于按需加载全分辨率)
+        self.map_full_points = {}  # 已加载的全分辨率地图点
+        self.map_lod_points = {}   # 降采样地图点 (未加 z_offset)，切换分辨率时不再重读缓存文件
+        self.map_voxel_size = map_voxel_size
+        self.map_full_res = not map_voxel_size
         
         # 加载静态地图（支持单个文件或文件夹）
         if os.path.isdir(map_path):
@@ -63,76 +68,94 @@ class PointCloudPlayer:
             # 如果是单个文件，直接加载
             self.load_single_map(map_path)
             
-        # 计算地图中心（用于回正）
-        if self.map_geometries:
-            # 合并所有地图的点来计算中心
-            all_points = []
-            for pcd in self.map_geometries.values():
-                if pcd is not None and not pcd.is_empty():
-                    all_points.append(np.asarray(pcd.points))
-            if all_points:
-                combined = np.vstack(all_points)
-                self.map_center = np.mean(combined, axis=0)
-            else:
-                self.map_center = np.array([0, 0, 0])
+        # 计算地图中心（用于回正）：直接合并缓存的元数据 (点数/点和/包围盒)，无需拼接所有地图点
+        total_count = sum(meta['count'] for meta in self.map_meta.values())
+        if total_count > 0:
+            self.map_center = sum(meta['point_sum'] for meta in self.map_meta.values()) / total_count
+            self.map_bounds = (np.min([meta['min'] for meta in self.map_meta.values()], axis=0),
+                               np.max([meta['max'] for meta in self.map_meta.values()], axis=0))
         else:
             self.map_center = np.array([0, 0, 0])
+            self.map_bounds = (np.zeros(3), np.zeros(3))
             
         print(f"地图中心: ({self.map_center[0]:.2f}, {self.map_center[1]:.2f}, {self.map_center[2]:.2f})")
 
+        # 逐帧扫描-地图评分表 (可选)
+        self.worst_frames = []
+        self.worst_cursor = -1
+        if score_table and os.path.isfile(score_table):
+            self.load_score_table(score_table)
+
+        # 叠加模式的环形缓冲区 (预分配，容量固定)
+        self.scan_ring = ScanRingBuffer(accumulate_scans, accumulate_points)
+        self.accumulate = False
+        self.ring_last_index = -2
+
+        # 当前帧与箭头为常驻几何体，逐帧原地更新
         self.current_frame = o3d.geometry.PointCloud()
+        self.frame_geometry_added = False
         self.update_frame(0)
 
         # ================= 按键注册 =================
         # 262: 右箭头 (下一帧)
         # 263: 左箭头 (上一帧)
         # 82 : R 键 (Reset View / 回正)
+        # 72 : H 键 (地图分辨率切换)
+        # 87 : W 键 (跳转到评分最差的帧)
+        # 265/264: 上/下箭头 (前进/后退 jump_seconds 秒)
+        # 266/267: PageUp/PageDown (前进/后退 jump_frames 帧)
+        # 84 : T 键 (输入时间戳跳转)
+        # 65 : A 键 (叠加最近 N 帧)
         self.vis.register_key_callback(262, self.next_frame)
         self.vis.register_key_callback(263, self.prev_frame)
         self.vis.register_key_callback(82, self.reset_view) 
+        self.vis.register_key_callback(72, self.toggle_map_resolution)
+        self.vis.register_key_callback(87, self.jump_to_worst)
+        self.vis.register_key_callback(265, lambda vis: self.jump_time(self.jump_seconds))
+        self.vis.register_key_callback(264, lambda vis: self.jump_time(-self.jump_seconds))
+        self.vis.register_key_callback(266, lambda vis: self.jump_to_frame(self.current_index + self.jump_frames))
+        self.vis.register_key_callback(267, lambda vis: self.jump_to_frame(self.current_index - self.jump_frames))
+        self.vis.register_key_callback(84, self.seek_time_prompt)
+        self.vis.register_key_callback(65, self.toggle_accumulate)
         
         print("\n=== 操作指南 ===")
         print("按 [右箭头] : 下一帧")
         print("按 [左箭头] : 上一帧")
         print("按 [R]      : 视角回正 (XY平面俯视)")
+        print("按 [H]      : 切换地图分辨率 (降采样/全分辨率)")
+        print("按 [W]      : 跳转到下一个评分最差的帧")
+        print(f"按 [上/下]  : 前进/后退 {self.jump_seconds:g} 秒")
+        print(f"按 [PgUp/PgDn] : 前进/后退 {self.jump_frames} 帧")
+        print("按 [T]      : 在控制台输入时间戳跳转")
+        print(f"按 [A]      : 叠加最近 {accumulate_scans} 帧 (旧帧渐隐)")
         print("按 [Q]      : 退出")
         print("================")
 
         # 启动时自动回正一次视角
         self.reset_view(self.vis)
 
-    def get_map_style(self, filename):
-        """根据地图文件名返回颜色和点大小"""
-        name_lower = filename.lower()
-        
-        if 'global' in name_lower or 'normal_map' in name_lower:
-            # 全局地图：灰色，点大小 1（细密）
-            return {'color': [0.5, 0.5, 0.5], 'point_size': 1.0, 'description': '全局地图（灰色，小点）', 'z_offset': 0.0}
-        elif 'reflector' in name_lower or 'mark' in name_lower or 'feature' in name_lower:
-            # 反光板/特征地图：橙色，点大小 10（醒目），Z 轴抬高
-            return {'color': [1.0, 0.5, 0.0], 'point_size': 10.0, 'description': '反光板地图（橙色，大点）', 'z_offset': 0.3}
-        elif 'local' in name_lower:
-            # 局部地图：绿色，点大小 3
-            return {'color': [0.0, 0.8, 0.0], 'point_size': 3.0, 'description': '局部地图（绿色，中点）', 'z_offset': 0.0}
-        else:
-            # 其他地图：蓝色，点大小 5
-            return {'color': [0.0, 0.5, 1.0], 'point_size': 5.0, 'description': f'其他地图（蓝色，中点）', 'z_offset': 0.0}
-
     def load_single_map(self, file_path):
-        """加载单个地图文件"""
+        """加载单个地图文件 (按 map_voxel_size 降采样，结果缓存)"""
         filename = os.path.basename(file_path)
         print(f"正在加载地图: {filename} ...")
         
-        pcd = o3d.io.read_point_cloud(file_path)
-        if pcd.is_empty():
-            print(f"警告: 地图文件 {filename} 为空或读取失败")
-            return
-            
         # 根据文件名设置样式
-        style = self.get_map_style(filename)
+        style = get_map_style(filename)
         print(f"  - {style['description']}")
         
-        points = np.asarray(pcd.points)
+        # 对于 reflector 地图，将点替换为球体，使其看起来更大 (点数少，不降采样)
+        is_reflector = is_reflector_map(filename)
+        try:
+            points, meta = load_map_lod(file_path, None if is_reflector else self.map_voxel_size)
+        except Exception as e:
+            print(f"警告: 地图文件 {filename} 读取失败: {e}")
+            return
+        if len(points) == 0:
+            print(f"警告: 地图文件 {filename} 为空或读取失败")
+            return
+        if not is_reflector and self.map_voxel_size:
+            print(f"  - 体素降采样 {self.map_voxel_size:g} m: {meta['count']} -> {len(points)} 点")
+            self.map_lod_points[filename] = points.copy()
         
         # 如果有 Z 轴偏移，调整点的位置
         if style.get('z_offset', 0.0) != 0.0:
@@ -140,27 +163,44 @@ class PointCloudPlayer:
             # 抬高 Z 轴，使该图层显示在其他图层上方
             points[:, 2] += z_offset
         
-        # 对于 reflector 地图，将点替换为球体，使其看起来更大
-        name_lower = filename.lower()
-        if 'reflector' in name_lower or 'mark' in name_lower or 'feature' in name_lower:
-            color = style['color']
-            sphere_radius = 0.0375  # 球体半径，使点看起来更大
-            for point in points:
-                sphere = o3d.geometry.TriangleMesh.create_sphere(radius=sphere_radius, resolution=8)
-                sphere.translate(point)
-                sphere.paint_uniform_color(color)
-                sphere.compute_vertex_normals()
-                self.vis.add_geometry(sphere)
-            self.map_geometries[filename] = None  # reflector 地图使用多个球体，不存储单个几何体
+        if is_reflector:
+            self.vis.add_geometry(build_reflector_spheres(points, style['color']))
+            self.map_geometries[filename] = None  # reflector 地图为球体网格，不参与分辨率切换
         else:
             # 对于其他地图，使用正常的点云渲染
-            pcd.points = o3d.utility.Vector3dVector(points)
+            pcd = o3d.geometry.PointCloud(o3d.utility.Vector3dVector(points))
             pcd.paint_uniform_color(style['color'])
             self.vis.add_geometry(pcd)
             self.map_geometries[filename] = pcd
+            self.map_meta[filename] = meta
+            self.map_paths[filename] = file_path
         
         self.map_styles[filename] = style
 
+    def toggle_map_resolution(self, vis):
+        """H 键：在降采样地图与全分辨率地图之间切换 (全分辨率首次按需加载，之后两级都常驻内存)"""
+        if not self.map_voxel_size:
+            print(">> 当前已是全分辨率地图", flush=True)
+            return False
+        self.map_full_res = not self.map_full_res
+        for filename, pcd in self.map_geometries.items():
+            if pcd is None:
+                continue
+            style = self.map_styles[filename]
+            if self.map_full_res:
+                if filename not in self.map_full_points:
+                    self.map_full_points[filename] = load_full_map(self.map_paths[filename])
+                points = self.map_full_points[filename]
+            else:
+                points = self.map_lod_points[filename]
+            points = points.copy()
+            points[:, 2] += style.get('z_offset', 0.0)
+            pcd.points = o3d.utility.Vector3dVector(points)
+            pcd.paint_uniform_color(style['color'])
+            vis.update_geometry(pcd)
+        print(f">> 地图分辨率: {'全分辨率' if self.map_full_res else f'降采样 {self.map_voxel_size:g} m'}", flush=True)
+        return False
+
     def load_all_maps(self, folder_path):
         """加载文件夹中的所有地图文件"""
         print(f"\n正在加载文件夹中的所有地图: {folder_path}")
@@ -207,77 +247,67 @@ class PointCloudPlayer:
         file_name = os.path.basename(file_path)
 
         # === 1. 读取点云 (含强度处理) ===
-        try:
-            pcd_t = o3d.t.io.read_point_cloud(file_path)
-            if 'intensity' in pcd_t.point:
-                intensities = pcd_t.point['intensity'].numpy().flatten()
-            else:
-                intensities = np.zeros(len(pcd_t.point.positions))
-            new_cloud = pcd_t.to_legacy()
-        except Exception as e:
-            print(f"强度读取失败: {e}")
-            new_cloud = o3d.io.read_point_cloud(file_path)
-            intensities = np.zeros(len(new_cloud.points))
+        t0 = time.perf_counter()
+        if self.archive is not None:
+            # 打包文件：memmap 零拷贝切片
+            points, intensities, transform_mat = self.archive.read_frame(index)
+            t1 = time.perf_counter()
+        else:
+            # PCD 文件：一次读入字节流，头部只解析一次 (含 VIEWPOINT)
+            try:
+                with open(file_path, 'rb') as f:
+                    raw = f.read()
+                t1 = time.perf_counter()
+                points, intensities, transform_mat = decode_scan_pcd(raw, file_path)
+            except Exception as e:
+                print(f"点云读取失败: {file_name} ({e})", flush=True)
+                return
 
-        # 坐标变换
-        transform_mat = parse_pcd_viewpoint(file_path)
-        new_cloud.transform(transform_mat)
-        
-        # 打印坐标
-        pos = transform_mat[:3, 3]
-        print(f"[{index+1:03d}/{len(self.pcd_files)}] {file_name} | Origin: ({pos[0]:6.2f}, {pos[1]:6.2f}, {pos[2]:6.2f})", flush=True)
-
-        # === 2. 颜色与层级逻辑 ===
-        points = np.asarray(new_cloud.points)
-        if len(points) > 0:
-            # 2.1 颜色设置
-            new_cloud.paint_uniform_color([0.0, 0.75, 1.0]) # 底色：天蓝色
-            colors = np.asarray(new_cloud.colors)
-            
-            # 筛选高强度点
-            mask = intensities > 250
-            colors[mask] = [1.0, 0.0, 0.0] # 高亮色：红色
-            new_cloud.colors = o3d.utility.Vector3dVector(colors)
-
-            # 2.2 Z轴分层 (关键修改！)
-            # 先把所有点压平到 0
-            points[:, 2] = 0.0
-            
-            # 【核心改动】把红色的点稍微抬高 (例如 0.2米)
-            # 这样在渲染时，红色点会物理位于橙色点上方，确保不被遮挡
-            points[mask, 2] = 0.2
-            
-            new_cloud.points = o3d.utility.Vector3dVector(points)
-
-        # === 3. 箭头 (保持在最高层，避免被红色点遮挡) ===
-        arrow = o3d.geometry.TriangleMesh.create_arrow(
-            cylinder_radius=0.1, cone_radius=0.25, cylinder_height=0.5, cone_height=0.25
-        )
-        arrow.paint_uniform_color([0.0, 0.0, 1.0]) 
-        arrow.compute_vertex_normals()
-        
-        R_fix = o3d.geometry.get_rotation_matrix_from_axis_angle([0, np.pi/2, 0])
-        arrow.rotate(R_fix, center=[0,0,0])
-        arrow.transform(transform_mat)
-        
-        # 箭头设为更高的位置 (例如 0.5)，确保它是最顶层的
-        arrow_verts = np.asarray(arrow.vertices)
-        arrow_verts[:, 2] = 0.5 
-        arrow.vertices = o3d.utility.Vector3dVector(arrow_verts)
-
-        # === 4. 刷新显示 ===
-        if self.current_frame.is_empty():
-            self.current_frame = new_cloud
+        # === 2. 解码为 numpy 并做坐标变换 ===
+        points = points.astype(np.float64) @ transform_mat[:3, :3].T + transform_mat[:3, 3]
+        t2 = time.perf_counter()
+
+        # === 3. 颜色与层级逻辑 ===
+        colors = colorize_scan(points, intensities)
+
+        # 叠加模式：写入环形缓冲区，显示最近 N 帧组成的局部子图
+        if self.accumulate:
+            if index != self.ring_last_index + 1:
+                self._refill_ring(index)
+            self.scan_ring.push(points, colors, transform_mat[:3, 3])
+            self.ring_last_index = index
+            points, colors = self.scan_ring.points, self.scan_ring.colors
+        t3 = time.perf_counter()
+
+        # === 4. 刷新显示 (复用几何体，原地覆盖缓冲区) ===
+        if len(self.current_frame.points) == len(points):
+            np.asarray(self.current_frame.points)[:] = points
+            np.asarray(self.current_frame.colors)[:] = colors
+        else:
+            # 点数变化时才需要重新分配
+            self.current_frame.points = o3d.utility.Vector3dVector(points)
+            self.current_frame.colors = o3d.utility.Vector3dVector(colors)
+
+        # 箭头只做增量变换：delta = 新位姿 * 旧位姿^-1
+        arrow_pose = planar_pose(transform_mat)
+        self.current_arrow.transform(arrow_pose @ np.linalg.inv(self.arrow_pose))
+        self.arrow_pose = arrow_pose
+
+        if not self.frame_geometry_added:
             self.vis.add_geometry(self.current_frame)
+            self.vis.add_geometry(self.current_arrow, reset_bounding_box=False)
+            self.frame_geometry_added = True
         else:
-            self.vis.remove_geometry(self.current_frame, reset_bounding_box=False)
-            self.current_frame = new_cloud
-            self.vis.add_geometry(self.current_frame, reset_bounding_box=False)
+            self.vis.update_geometry(self.current_frame)
+            self.vis.update_geometry(self.current_arrow)
+            self.vis.update_renderer()
+        t4 = time.perf_counter()
 
-        if self.current_arrow is not None:
-            self.vis.remove_geometry(self.current_arrow, reset_bounding_box=False)
-        self.current_arrow = arrow
-        self.vis.add_geometry(self.current_arrow, reset_bounding_box=False)
+        # 打印坐标与分阶段耗时
+        pos = transform_mat[:3, 3]
+        print(f"[{index+1:03d}/{len(self.pcd_files)}] {file_name} | Origin: ({pos[0]:6.2f}, {pos[1]:6.2f}, {pos[2]:6.2f})"
+              f" | IO {(t1-t0)*1e3:.1f}ms, Decode {(t2-t1)*1e3:.1f}ms, Color {(t3-t2)*1e3:.1f}ms, Render {(t4-t3)*1e3:.1f}ms",
+              flush=True)
 
     def next_frame(self, vis):
         if self.current_index < len(self.pcd_files) - 1:
@@ -295,6 +325,86 @@ class PointCloudPlayer:
             print("已经是第一帧了", flush=True)
         return False
 
+    def _prepare_frame(self, index):
+        """读取、变换并着色一帧 (用于叠加模式跳帧后的回填)"""
+        points, intensities, transform_mat = read_scan_frame(self.archive, self.pcd_files, index)
+        points = points.astype(np.float64) @ transform_mat[:3, :3].T + transform_mat[:3, 3]
+        colors = colorize_scan(points, intensities)
+        return points, colors, transform_mat[:3, 3]
+
+    def _refill_ring(self, index):
+        """非连续前进 (后退/跳转) 时，用 index 之前的 N-1 帧重建环形缓冲区"""
+        self.scan_ring.reset()
+        for j in range(max(0, index - self.scan_ring.n_scans + 1), index):
+            try:
+                self.scan_ring.push(*self._prepare_frame(j))
+            except Exception as e:
+                print(f"点云读取失败: {os.path.basename(self.pcd_files[j])} ({e})", flush=True)
+
+    def toggle_accumulate(self, vis):
+        """A 键：切换单帧显示 / 最近 N 帧叠加子图"""
+        self.accumulate = not self.accumulate
+        self.ring_last_index = -2  # 强制下一次刷新时回填
+        print(f">> 叠加模式: {'开启 (最近 %d 帧)' % self.scan_ring.n_scans if self.accumulate else '关闭'}", flush=True)
+        self.update_frame(self.current_index)
+        return False
+
+    def jump_to_frame(self, index):
+        """跳转到指定帧 (越界时截断到首尾帧)"""
+        index = max(0, min(int(index), len(self.pcd_files) - 1))
+        if index != self.current_index:
+            self.current_index = index
+            self.update_frame(self.current_index)
+        return False
+
+    def jump_time(self, seconds):
+        """按时间戳前进/后退 seconds 秒 (二分查找)"""
+        if len(self.time_index) == 0:
+            print("帧文件名中没有时间戳，无法按时间跳转", flush=True)
+            return False
+        return self.jump_to_frame(self.time_index.shift_seconds(self.current_index, seconds))
+
+    def seek_time_prompt(self, vis):
+        """
+        T 键：在控制台输入时间戳并跳转到最近的帧。
+        直接输入原始时间戳 (与文件名同单位)，或以 + 开头输入相对起始时刻的秒数，例如 +125.5
+        """
+        if len(self.time_index) == 0:
+            print("帧文件名中没有时间戳，无法按时间跳转", flush=True)
+            return False
+        text = input("跳转到时间戳 (原始时间戳，或 +秒数): ").strip()
+        try:
+            if text.startswith('+'):
+                index = self.time_index.seek(self.time_index.start_time + float(text[1:]))
+            else:
+                index = self.time_index.seek_raw(float(text))
+        except ValueError:
+            print(f"无效的时间: {text}", flush=True)
+            return False
+        return self.jump_to_frame(index)
+
+    def load_score_table(self, score_csv):
+        """加载 scan_map_score.py 生成的逐帧评分表，用于按 W 键跳转到最差帧"""
+        from scan_map_score import load_worst_frames
+        frame_of = {os.path.basename(name): i for i, name in enumerate(self.pcd_files)}
+        self.worst_frames = [(frame_of[name],) + tuple(rest)
+                             for name, *rest in load_worst_frames(score_csv) if name in frame_of]
+        self.worst_cursor = -1
+        print(f"已加载评分表: {score_csv} ({len(self.worst_frames)} 帧)")
+
+    def jump_to_worst(self, vis):
+        """W 键：按内点率从低到高依次跳转"""
+        if not self.worst_frames:
+            print("未加载评分表 (先运行 scan_map_score.py)", flush=True)
+            return False
+        self.worst_cursor = (self.worst_cursor + 1) % len(self.worst_frames)
+        index, inlier_ratio, mean_dist, p95_dist = self.worst_frames[self.worst_cursor]
+        print(f">> 第 {self.worst_cursor + 1} 差帧: inlier {inlier_ratio*100:.1f}%, "
+              f"mean {mean_dist:.3f} m, p95 {p95_dist:.3f} m", flush=True)
+        self.current_index = index
+        self.update_frame(self.current_index)
+        return False
+
     def run(self):
         self.vis.poll_events()
         self.vis.update_renderer()
@@ -305,6 +415,12 @@ if __name__ == "__main__":
     # 配置路径 - 支持文件夹路径或单个文件路径
     MAP_PATH = "./map"      # 修改为文件夹路径，会加载所有地图文件
     FRAMES_FOLDER = "scans_directory" 
+    MAP_VOXEL_SIZE = 0.05   # 地图体素降采样边长 (米)，设为 None 则加载全分辨率
+    SCORE_TABLE = "./out/scan_map_scores.csv"  # scan_map_score.py 生成的评分表 (存在时自动加载)
+    TIMESTAMP_UNIT = 1e-3   # 文件名时间戳换算为秒的系数 (毫秒时间戳为 1e-3)
+    # 若已用 scan_archive.py 打包，则优先读取打包文件
+    if os.path.isfile(FRAMES_FOLDER + ARCHIVE_SUFFIX):
+        FRAMES_FOLDER = FRAMES_FOLDER + ARCHIVE_SUFFIX
     
     # 检查并创建必要目录
     if not os.path.exists(MAP_PATH):
@@ -314,7 +430,8 @@ if __name__ == "__main__":
         os.makedirs(FRAMES_FOLDER, exist_ok=True)
 
     try:
-        player = PointCloudPlayer(MAP_PATH, FRAMES_FOLDER)
+        player = PointCloudPlayer(MAP_PATH, FRAMES_FOLDER, map_voxel_size=MAP_VOXEL_SIZE, score_table=SCORE_TABLE,
+                                 timestamp_unit=TIMESTAMP_UNIT)
         player.run()
     except Exception as e:
         print(f"发生错误: {e}")
@@ -0,0 +1,196 @@
+import os
+import sys
+import io
+import csv
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from map_lod import load_full_map
+from replay_style import REFLECTOR_INTENSITY, is_reflector_map
+from scan_archive import ARCHIVE_SUFFIX, open_scan_source, parse_scan_timestamp, read_scan_frame
+
+# 强制设置标准输出为 UTF-8，解决中文乱码
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+MATCH_COLUMNS = ['frame', 'file', 'timestamp', 'x', 'y', 'candidates', 'matched', 'visible',
+                 'match_rate', 'mean_residual', 'max_residual']
+
+# 8 邻域偏移 (只取一半方向即可覆盖所有无向边)
+_NEIGHBOR_OFFSETS = np.array([[1, -1], [1, 0], [1, 1], [0, 1]], dtype=np.int64)
+
+
+def cluster_reflectors(points_xy, cell_size=0.1, min_points=3):
+    """
+    栅格连通域聚类：把高强度点落到 cell_size 栅格中，相邻 (8 邻域) 的占用栅格视为同一反光板。
+    全部向量化 (unique + searchsorted 建邻接边 + 稀疏图连通分量)，返回各簇质心 (K,2) 与点数 (K,)
+    """
+    if len(points_xy) == 0:
+        return np.zeros((0, 2)), np.zeros(0, dtype=np.int64)
+    cells = np.floor(points_xy / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0) - 1  # 留出一圈邻居的编号空间
+    width = cells[:, 1].max() + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    uniq, point_cell = np.unique(keys, return_inverse=True)
+    point_cell = point_cell.ravel()
+
+    # 占用栅格之间的邻接边
+    ux, uy = uniq // width, uniq % width
+    rows, cols = [], []
+    for dx, dy in _NEIGHBOR_OFFSETS:
+        nkeys = (ux + dx) * width + (uy + dy)
+        pos = np.searchsorted(uniq, nkeys)
+        pos[pos >= len(uniq)] = 0
+        hit = uniq[pos] == nkeys
+        rows.append(np.flatnonzero(hit))
+        cols.append(pos[hit])
+    rows, cols = np.concatenate(rows), np.concatenate(cols)
+    graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)), shape=(len(uniq), len(uniq)))
+    _, cell_label = connected_components(graph, directed=False)
+
+    labels = cell_label[point_cell]
+    counts = np.bincount(labels)
+    centroids = np.column_stack([np.bincount(labels, weights=points_xy[:, 0]),
+                                 np.bincount(labels, weights=points_xy[:, 1])]) / counts[:, None]
+    keep = counts >= min_points
+    return centroids[keep], counts[keep]
+
+
+def load_reflector_map(map_path):
+    """读取反光板地图 (文件夹中文件名含 reflector/mark/feature 的地图)，返回 XY 坐标"""
+    if os.path.isdir(map_path):
+        files = [p for p in sorted(glob.glob(os.path.join(map_path, "*.pcd")))
+                 if is_reflector_map(os.path.basename(p))]
+    else:
+        files = [map_path]
+    if not files:
+        raise ValueError(f"在 {map_path} 中没有找到反光板地图")
+    return np.vstack([load_full_map(p)[:, :2] for p in files])
+
+
+def match_scan(tree, xyz, intensity, transform_mat, cell_size=0.1, min_points=3,
+               match_dist=0.3, visible_range=20.0):
+    """
+    单帧：提取高强度点聚类为候选反光板，与地图反光板做最近邻匹配。
+    匹配是一对一的：多个候选 (同一反光板被栅格拆开、附近的杂散回波) 落到同一块地图反光板时只保留最近的一个，
+    匹配数不会超过实际命中的地图反光板数。返回 (候选数, 匹配数, 视野内地图反光板数, 匹配残差数组)
+    """
+    mask = intensity > REFLECTOR_INTENSITY
+    points = xyz[mask, :2].astype(np.float64) @ transform_mat[:2, :2].T + transform_mat[:2, 3]
+    points = points[np.isfinite(points).all(axis=1)]
+    centroids, _ = cluster_reflectors(points, cell_size, min_points)
+    visible = int(tree.query_ball_point(transform_mat[:2, 3], visible_range, return_length=True))
+    if len(centroids) == 0:
+        return 0, 0, visible, np.zeros(0)
+    dists, idx = tree.query(centroids, k=1, distance_upper_bound=match_dist)
+    found = np.isfinite(dists)
+    dists, idx = dists[found], idx[found]
+    # 按残差升序后对地图下标去重，np.unique 返回每块反光板首次出现 (即最近候选) 的位置
+    order = np.argsort(dists, kind='stable')
+    _, first = np.unique(idx[order], return_index=True)
+    residuals = dists[order][first]
+    return len(centroids), len(residuals), visible, residuals
+
+
+_worker_tree = None
+
+
+def _init_worker(reflector_xy):
+    global _worker_tree
+    _worker_tree = cKDTree(reflector_xy)
+
+
+def _match_range(frames_dir, start, end, options):
+    """子进程：处理 [start, end) 区间内的帧"""
+    archive, names = open_scan_source(frames_dir)
+    timestamps = archive.timestamps if archive is not None else None
+    rows = []
+    for index in range(start, end):
+        try:
+            xyz, intensity, transform_mat = read_scan_frame(archive, names, index)
+        except Exception as e:
+            print(f"读取失败: {names[index]} ({e})")
+            continue
+        candidates, matched, visible, residuals = match_scan(_worker_tree, xyz, intensity, transform_mat, **options)
+        ts = timestamps[index] if timestamps is not None else parse_scan_timestamp(names[index])
+        rows.append([index, os.path.basename(names[index]), ts, transform_mat[0, 3], transform_mat[1, 3],
+                     candidates, matched, visible,
+                     matched / candidates if candidates else 0.0,
+                     float(residuals.mean()) if len(residuals) else float('nan'),
+                     float(residuals.max()) if len(residuals) else float('nan')])
+    return rows
+
+
+def _weak_segments(rows, min_matched):
+    """把连续的弱匹配帧 (matched < min_matched) 合并为区段"""
+    weak = np.array([r[6] < min_matched for r in rows], dtype=bool)
+    if not weak.any():
+        return []
+    edges = np.diff(np.concatenate(([0], weak.astype(np.int8), [0])))
+    starts, ends = np.flatnonzero(edges == 1), np.flatnonzero(edges == -1)
+    return list(zip(starts, ends))
+
+
+def match_sequence(map_path, frames_dir, out_csv, workers=None, min_matched=3, **options):
+    """对整个扫描序列并行做反光板提取与匹配，写出逐帧时间序列 (CSV) 并汇总弱覆盖区段"""
+    reflector_xy = load_reflector_map(map_path)
+    n_frames = len(open_scan_source(frames_dir)[1])
+    if n_frames == 0:
+        raise ValueError(f"在 {frames_dir} 中没有找到 .pcd 文件")
+    workers = max(1, min(workers or os.cpu_count() or 1, n_frames))
+
+    t0 = time.perf_counter()
+    bounds = np.linspace(0, n_frames, min(n_frames, workers * 8) + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(reflector_xy,)) as pool:
+        futures = [pool.submit(_match_range, frames_dir, int(a), int(b), options)
+                   for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        rows = [row for fut in futures for row in fut.result()]
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_csv)), exist_ok=True)
+    with open(out_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(MATCH_COLUMNS)
+        for row in rows:
+            writer.writerow(row[:2] + [f"{row[2]:.0f}", f"{row[3]:.6f}", f"{row[4]:.6f}"] + row[5:8]
+                            + [f"{v:.6f}" for v in row[8:]])
+
+    print(f"已处理 {len(rows)} 帧 ({elapsed:.1f}s, {workers} 进程)，地图反光板 {len(reflector_xy)} 个 -> {out_csv}")
+    segments = _weak_segments(rows, min_matched)
+    print(f"匹配数 < {min_matched} 的弱覆盖区段: {len(segments)} 段")
+    for a, b in segments[:20]:
+        first, last = rows[a], rows[b - 1]
+        print(f"  帧 {first[0]} ~ {last[0]} ({b - a} 帧) | 起点 ({first[3]:.2f}, {first[4]:.2f}) "
+              f"-> 终点 ({last[3]:.2f}, {last[4]:.2f})")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐帧反光板提取与匹配率统计")
+    parser.add_argument("--map", default="./map", help="反光板地图文件或地图文件夹")
+    parser.add_argument("--frames", default="scans_directory", help="PCD 文件夹或 .scanpack 打包文件")
+    parser.add_argument("--out", default="./out/reflector_matches.csv", help="时间序列输出路径")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    parser.add_argument("--cell", type=float, default=0.1, help="聚类栅格边长 (米)")
+    parser.add_argument("--min-points", type=int, default=3, help="候选反光板最少点数")
+    parser.add_argument("--match-dist", type=float, default=0.3, help="匹配距离阈值 (米)")
+    parser.add_argument("--range", type=float, default=20.0, help="统计视野内地图反光板的半径 (米)")
+    parser.add_argument("--min-matched", type=int, default=3, help="低于该匹配数视为弱覆盖")
+    args = parser.parse_args()
+
+    frames_dir = args.frames
+    if os.path.isfile(frames_dir + ARCHIVE_SUFFIX):
+        frames_dir = frames_dir + ARCHIVE_SUFFIX
+    try:
+        match_sequence(args.map, frames_dir, args.out, workers=args.workers, min_matched=args.min_matched,
+                       cell_size=args.cell, min_points=args.min_points, match_dist=args.match_dist,
+                       visible_range=args.range)
+    except Exception as e:
+        print(f"处理失败: {e}")
+        sys.exit(1)
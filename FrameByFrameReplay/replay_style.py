@@ -0,0 +1,92 @@
+import numpy as np
+import open3d as o3d
+
+# 扫描点颜色与分层高度 (交互播放器与离屏渲染共用，保证两者画面一致)
+SCAN_COLOR = [0.0, 0.75, 1.0]        # 底色：天蓝色
+REFLECTOR_COLOR = [1.0, 0.0, 0.0]    # 高亮色：红色
+REFLECTOR_INTENSITY = 250            # 高强度点阈值
+REFLECTOR_Z = 0.2                    # 高强度点抬高高度，确保不被遮挡
+ARROW_Z = 0.5                        # 箭头高度，始终位于最顶层
+REFLECTOR_SPHERE_RADIUS = 0.0375     # 反光板地图中每个点显示为球体的半径，使其看起来更大
+
+
+def is_reflector_map(filename):
+    name_lower = filename.lower()
+    return 'reflector' in name_lower or 'mark' in name_lower or 'feature' in name_lower
+
+
+def get_map_style(filename):
+    """根据地图文件名返回颜色和点大小"""
+    name_lower = filename.lower()
+    
+    if 'global' in name_lower or 'normal_map' in name_lower:
+        # 全局地图：灰色，点大小 1（细密）
+        return {'color': [0.5, 0.5, 0.5], 'point_size': 1.0, 'description': '全局地图（灰色，小点）', 'z_offset': 0.0}
+    elif is_reflector_map(filename):
+        # 反光板/特征地图：橙色，点大小 10（醒目），Z 轴抬高
+        return {'color': [1.0, 0.5, 0.0], 'point_size': 10.0, 'description': '反光板地图（橙色，大点）', 'z_offset': 0.3}
+    elif 'local' in name_lower:
+        # 局部地图：绿色，点大小 3
+        return {'color': [0.0, 0.8, 0.0], 'point_size': 3.0, 'description': '局部地图（绿色，中点）', 'z_offset': 0.0}
+    else:
+        # 其他地图：蓝色，点大小 5
+        return {'color': [0.0, 0.5, 1.0], 'point_size': 5.0, 'description': f'其他地图（蓝色，中点）', 'z_offset': 0.0}
+
+
+def colorize_scan(points, intensities):
+    """
+    扫描点着色与 Z 轴分层 (原地修改 points)：
+    先把所有点压平到 0，再把高强度的红色点抬高，确保渲染时不被遮挡
+    """
+    colors = np.empty_like(points)
+    colors[:] = SCAN_COLOR
+    if len(points) > 0:
+        mask = intensities > REFLECTOR_INTENSITY
+        colors[mask] = REFLECTOR_COLOR
+        points[:, 2] = 0.0
+        points[mask, 2] = REFLECTOR_Z
+    return colors
+
+
+def build_reflector_spheres(points, color, radius=REFLECTOR_SPHERE_RADIUS):
+    """
+    反光板地图：每个点画成一个小球。所有球合并为一个网格 (模板球顶点整列平移后拼接)，
+    交互播放器与离屏渲染都只需添加一个几何体
+    """
+    sphere = o3d.geometry.TriangleMesh.create_sphere(radius=radius, resolution=8)
+    verts = np.asarray(sphere.vertices)
+    tris = np.asarray(sphere.triangles)
+    points = np.asarray(points, dtype=np.float64)
+    mesh = o3d.geometry.TriangleMesh()
+    mesh.vertices = o3d.utility.Vector3dVector((points[:, None, :] + verts[None, :, :]).reshape(-1, 3))
+    mesh.triangles = o3d.utility.Vector3iVector(
+        (tris[None, :, :] + (np.arange(len(points)) * len(verts))[:, None, None]).reshape(-1, 3))
+    mesh.paint_uniform_color(color)
+    mesh.compute_vertex_normals()
+    return mesh
+
+
+def build_pose_arrow():
+    """构建位于原点、压平到最高层的朝向箭头"""
+    arrow = o3d.geometry.TriangleMesh.create_arrow(
+        cylinder_radius=0.1, cone_radius=0.25, cylinder_height=0.5, cone_height=0.25
+    )
+    arrow.paint_uniform_color([0.0, 0.0, 1.0])
+    arrow.compute_vertex_normals()
+
+    R_fix = o3d.geometry.get_rotation_matrix_from_axis_angle([0, np.pi/2, 0])
+    arrow.rotate(R_fix, center=[0,0,0])
+
+    arrow_verts = np.asarray(arrow.vertices)
+    arrow_verts[:, 2] = ARROW_Z
+    return arrow
+
+
+def planar_pose(transform_mat):
+    """从 4x4 位姿中提取平面位姿 (绕 Z 轴的偏航 + XY 平移)，箭头只在 XY 平面内移动"""
+    yaw = np.arctan2(transform_mat[1, 0], transform_mat[0, 0])
+    c, s = np.cos(yaw), np.sin(yaw)
+    pose = np.eye(4)
+    pose[:2, :2] = [[c, -s], [s, c]]
+    pose[:2, 3] = transform_mat[:2, 3]
+    return pose
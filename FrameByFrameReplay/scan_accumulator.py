@@ -0,0 +1,65 @@
+import numpy as np
+
+
+class ScanRingBuffer:
+    """
+    最近 N 帧扫描的局部子图：固定容量的预分配环形缓冲区。
+    每帧只覆盖最旧的一个槽位并重算渐隐颜色，内存与单帧开销与回放时长无关，也不做任何拼接。
+    每个槽位固定 points_per_scan 个点：点数不足时用该帧第一个点填充 (重叠不可见)，超出时等间隔抽稀。
+    """
+
+    def __init__(self, n_scans, points_per_scan, fade=0.8, background=(1.0, 1.0, 1.0)):
+        self.n_scans = n_scans
+        self.points_per_scan = points_per_scan
+        self.fade = fade                                   # 最旧一帧向背景色混合的比例
+        self.background = np.asarray(background, dtype=np.float64)
+
+        capacity = n_scans * points_per_scan
+        self.points = np.zeros((capacity, 3))              # 交给显示用的点缓冲区
+        self.colors = np.zeros((capacity, 3))              # 交给显示用的颜色缓冲区 (已渐隐)
+        self._base_colors = np.zeros((capacity, 3))        # 未渐隐的原始颜色
+        # 按槽位划分的视图 (共享内存)
+        self._slot_points = self.points.reshape(n_scans, points_per_scan, 3)
+        self._slot_colors = self.colors.reshape(n_scans, points_per_scan, 3)
+        self._slot_base = self._base_colors.reshape(n_scans, points_per_scan, 3)
+        self._slots = np.arange(n_scans)
+        self.reset()
+
+    def reset(self):
+        self.head = -1    # 最新一帧所在槽位
+        self.filled = 0   # 已写入的帧数 (不超过 n_scans)
+
+    def push(self, points, colors, origin):
+        """写入一帧 (已变换到地图坐标系的点与颜色)；origin 用于空扫描时的占位"""
+        self.head = (self.head + 1) % self.n_scans
+        self.filled = min(self.filled + 1, self.n_scans)
+
+        n = len(points)
+        if n > self.points_per_scan:
+            keep = np.linspace(0, n - 1, self.points_per_scan).astype(np.int64)
+            points, colors = points[keep], colors[keep]
+            n = self.points_per_scan
+
+        slot_points = self._slot_points[self.head]
+        slot_base = self._slot_base[self.head]
+        slot_points[:n] = points
+        slot_base[:n] = colors
+        slot_points[n:] = points[0] if n else origin
+        slot_base[n:] = colors[0] if n else self.background
+
+        # 尚未写入的槽位 (reset 之后) 全部塌缩到最新一帧的占位点上
+        if self.filled < self.n_scans:
+            empty = (self.head - self._slots) % self.n_scans >= self.filled
+            self._slot_points[empty] = slot_points[0]
+            self._slot_base[empty] = slot_base[0]
+
+        self._apply_fade()
+
+    def _apply_fade(self):
+        """按帧龄线性渐隐：最新一帧保持原色，最旧一帧向背景色混合 fade 比例"""
+        ages = (self.head - self._slots) % self.n_scans
+        ages[ages >= self.filled] = 0  # 空槽位与最新一帧重叠，不做渐隐
+        weight = self.fade * ages / max(self.n_scans - 1, 1)
+        weight = weight[:, None, None]
+        np.multiply(self._slot_base, 1.0 - weight, out=self._slot_colors)
+        self._slot_colors += weight * self.background
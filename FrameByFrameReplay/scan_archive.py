@@ -0,0 +1,275 @@
+import os
+import re
+import sys
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pcd_reader import read_pcd_header, read_scan_pcd, viewpoint_to_matrix
+
+# ==================== 打包格式 (.scanpack) ====================
+# [文件头 64 字节] [帧索引 (结构化数组)] [xyz 块 float32 (N,3)] [intensity 块 float32 (N,)]
+# 每帧的点在 xyz / intensity 块中连续存放，索引记录偏移量、点数、时间戳与 VIEWPOINT，
+# 读取时整个文件以 memmap 方式映射，任意帧都是 O(1) 的零拷贝切片。
+ARCHIVE_SUFFIX = ".scanpack"
+ARCHIVE_MAGIC = b"SCANPK01"
+ARCHIVE_VERSION = 1
+BLOCK_ALIGN = 64
+VERIFY_SAMPLE_FRAMES = 200  # 往返校验用 Open3D 抽查的帧数 (均匀抽样，含首尾)，0 为全部帧
+NAME_BYTES = 128  # 索引中文件名字段的字节数 (UTF-8 编码后)
+
+HEADER_DTYPE = np.dtype([
+    ('magic', 'S8'), ('version', '<u4'), ('reserved', '<u4'),
+    ('n_frames', '<u8'), ('total_points', '<u8'),
+    ('index_offset', '<u8'), ('xyz_offset', '<u8'), ('intensity_offset', '<u8'),
+    ('pad', 'V8'),
+])
+
+INDEX_DTYPE = np.dtype([
+    ('offset', '<u8'),          # 该帧第一个点在块中的序号
+    ('count', '<u8'),           # 该帧点数
+    ('timestamp', '<f8'),       # 文件名中解析出的时间戳 (解析失败为 NaN)
+    ('viewpoint', '<f8', (7,)), # tx ty tz qw qx qy qz
+    ('name', f'S{NAME_BYTES}'), # 源 PCD 文件名 (UTF-8)
+])
+
+_ts_pattern = re.compile(r"(\d+)")
+
+
+def _align(n):
+    return (n + BLOCK_ALIGN - 1) // BLOCK_ALIGN * BLOCK_ALIGN
+
+
+def parse_scan_timestamp(file_name):
+    """从点云文件名中解析时间戳，例如 312000819_20.pcd -> 312000819"""
+    match = _ts_pattern.search(os.path.basename(file_name))
+    return float(match.group(1)) if match else float('nan')
+
+
+def _scan_pcd_header(file_path):
+    """只读取 PCD 头部，返回 (点数, VIEWPOINT)"""
+    header = read_pcd_header(file_path)
+    return header['points'], header['viewpoint']
+
+
+def _decode_source_pcd(file_path):
+    """解码源 PCD，返回 float32 的 xyz 与 intensity"""
+    xyz, intensity, _ = read_scan_pcd(file_path)
+    return xyz, intensity
+
+
+def _decode_reference_pcd(file_path):
+    """
+    往返校验用的独立解码：直接交给 Open3D 的 tensor 读取器，不经过 pcd_reader，
+    这样 pcd_reader 的解码错误不会同时出现在写入与校验两侧。返回 float32 的 xyz 与 intensity
+    """
+    import open3d as o3d
+    pcd_t = o3d.t.io.read_point_cloud(file_path)
+    if 'positions' not in pcd_t.point:
+        return np.zeros((0, 3), dtype=np.float32), np.zeros(0, dtype=np.float32)
+    xyz = pcd_t.point.positions.numpy().astype(np.float32)
+    if 'intensity' in pcd_t.point:
+        intensity = pcd_t.point['intensity'].numpy().reshape(-1).astype(np.float32)
+    else:
+        intensity = np.zeros(len(xyz), dtype=np.float32)
+    return xyz, intensity
+
+
+class ScanArchive:
+    """以 memmap 方式打开 .scanpack，逐帧零拷贝访问"""
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        header = np.fromfile(archive_path, dtype=HEADER_DTYPE, count=1)
+        if len(header) == 0 or header['magic'][0] != ARCHIVE_MAGIC:
+            raise ValueError(f"不是有效的扫描打包文件: {archive_path}")
+        header = header[0]
+        if int(header['version']) != ARCHIVE_VERSION:
+            raise ValueError(f"不支持的打包版本: {int(header['version'])}")
+
+        n_frames = int(header['n_frames'])
+        total_points = int(header['total_points'])
+        self.index = np.memmap(archive_path, dtype=INDEX_DTYPE, mode='r',
+                               offset=int(header['index_offset']), shape=(n_frames,))
+        # 空块无法 memmap，用空数组代替
+        if total_points > 0:
+            self.xyz = np.memmap(archive_path, dtype='<f4', mode='r',
+                                 offset=int(header['xyz_offset']), shape=(total_points, 3))
+            self.intensity = np.memmap(archive_path, dtype='<f4', mode='r',
+                                       offset=int(header['intensity_offset']), shape=(total_points,))
+        else:
+            self.xyz = np.zeros((0, 3), dtype=np.float32)
+            self.intensity = np.zeros(0, dtype=np.float32)
+
+        self.names = [n.decode('utf-8') for n in self.index['name']]
+        self.timestamps = np.asarray(self.index['timestamp'])
+
+    def __len__(self):
+        return len(self.index)
+
+    def read_frame(self, index):
+        """返回 (xyz 视图, intensity 视图, 4x4 位姿)，不发生拷贝"""
+        entry = self.index[index]
+        start = int(entry['offset'])
+        end = start + int(entry['count'])
+        return self.xyz[start:end], self.intensity[start:end], viewpoint_to_matrix(entry['viewpoint'])
+
+
+def open_scan_source(frames_dir):
+    """打开帧来源：.scanpack 打包文件或 PCD 文件夹，返回 (ScanArchive 或 None, 帧名列表)"""
+    if os.path.isfile(frames_dir) and frames_dir.endswith(ARCHIVE_SUFFIX):
+        archive = ScanArchive(frames_dir)
+        return archive, archive.names
+    return None, sorted(glob.glob(os.path.join(frames_dir, "*.pcd")))
+
+
+def read_scan_frame(archive, names, index):
+    """读取一帧，返回 (xyz, intensity, 4x4 位姿)"""
+    if archive is not None:
+        return archive.read_frame(index)
+    return read_scan_pcd(names[index])
+
+
+def _write_frames(archive_path, xyz_offset, intensity_offset, total_points, jobs):
+    """子进程：解码一批 PCD 并直接写入打包文件对应位置"""
+    xyz_block = np.memmap(archive_path, dtype='<f4', mode='r+', offset=xyz_offset, shape=(total_points, 3))
+    intensity_block = np.memmap(archive_path, dtype='<f4', mode='r+', offset=intensity_offset, shape=(total_points,))
+    for file_path, start, count in jobs:
+        xyz, intensity = _decode_source_pcd(file_path)
+        if len(xyz) != count:
+            raise ValueError(f"{os.path.basename(file_path)} 点数 {len(xyz)} 与头部 POINTS {count} 不一致")
+        xyz_block[start:start + count] = xyz
+        intensity_block[start:start + count] = intensity
+    xyz_block.flush()
+    intensity_block.flush()
+    return len(jobs)
+
+
+def _verify_frames(archive_path, jobs):
+    """子进程：用 Open3D 独立解码源 PCD 并与打包文件逐帧比对，返回不一致 (或 Open3D 读取失败) 的文件名"""
+    archive = ScanArchive(archive_path)
+    mismatched = []
+    for file_path, frame_idx in jobs:
+        try:
+            xyz, intensity = _decode_reference_pcd(file_path)
+        except Exception:
+            mismatched.append(os.path.basename(file_path))
+            continue
+        a_xyz, a_intensity, _ = archive.read_frame(frame_idx)
+        if not (np.array_equal(xyz, a_xyz, equal_nan=True) and
+                np.array_equal(intensity, a_intensity, equal_nan=True)):
+            mismatched.append(os.path.basename(file_path))
+    return mismatched
+
+
+def _split(items, n_chunks):
+    if not items:
+        return []
+    n_chunks = max(1, min(n_chunks, len(items)))
+    size = (len(items) + n_chunks - 1) // n_chunks
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def convert_directory(frames_dir, archive_path, workers=None, verify=True, verify_frames=VERIFY_SAMPLE_FRAMES):
+    """
+    将文件夹中的所有 PCD 打包为单个 .scanpack 文件 (并行解码 + 往返校验)。
+    往返校验用 Open3D 独立解码 verify_frames 帧 (均匀抽样，0 为全部) 与打包结果逐帧比对
+    """
+    pcd_files = sorted(glob.glob(os.path.join(frames_dir, "*.pcd")))
+    if not pcd_files:
+        raise ValueError(f"在 {frames_dir} 中没有找到 .pcd 文件")
+    # 文件名按 UTF-8 定长存放，截断可能切开多字节字符，超长的直接拒绝
+    names = [os.path.basename(p).encode('utf-8') for p in pcd_files]
+    too_long = [os.path.basename(p) for p, n in zip(pcd_files, names) if len(n) > NAME_BYTES]
+    if too_long:
+        raise ValueError(f"{len(too_long)} 个文件名超过 {NAME_BYTES} 字节 (UTF-8)，请先重命名，例如: {too_long[:5]}")
+    if verify:
+        try:
+            import open3d  # 往返校验的独立解码依赖 Open3D，打包前先确认可用
+        except (ImportError, OSError) as e:
+            raise ValueError(f"往返校验需要 Open3D ({e})，可使用 --no-verify 跳过校验")
+    workers = workers or os.cpu_count() or 1
+    t_start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 1. 并行扫描头部，得到点数与位姿，据此规划每帧的偏移量
+        headers = list(pool.map(_scan_pcd_header, pcd_files, chunksize=64))
+        counts = np.array([h[0] for h in headers], dtype=np.uint64)
+        offsets = np.zeros_like(counts)
+        offsets[1:] = np.cumsum(counts)[:-1]
+        total_points = int(counts.sum())
+
+        index = np.zeros(len(pcd_files), dtype=INDEX_DTYPE)
+        index['offset'] = offsets
+        index['count'] = counts
+        index['timestamp'] = [parse_scan_timestamp(p) for p in pcd_files]
+        index['viewpoint'] = [h[1] for h in headers]
+        index['name'] = names
+
+        index_offset = _align(HEADER_DTYPE.itemsize)
+        xyz_offset = _align(index_offset + index.nbytes)
+        intensity_offset = _align(xyz_offset + total_points * 12)
+        file_size = intensity_offset + total_points * 4
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header['magic'] = ARCHIVE_MAGIC
+        header['version'] = ARCHIVE_VERSION
+        header['n_frames'] = len(pcd_files)
+        header['total_points'] = total_points
+        header['index_offset'] = index_offset
+        header['xyz_offset'] = xyz_offset
+        header['intensity_offset'] = intensity_offset
+
+        with open(archive_path, 'wb') as f:
+            f.write(header.tobytes())
+            f.seek(index_offset)
+            f.write(index.tobytes())
+            f.truncate(file_size)
+
+        # 2. 按帧段并行解码，各进程直接写入各自的区间
+        jobs = [(p, int(o), int(c)) for p, o, c in zip(pcd_files, offsets, counts) if c > 0]
+        futures = [pool.submit(_write_frames, archive_path, xyz_offset, intensity_offset, total_points, chunk)
+                   for chunk in _split(jobs, workers * 4)]
+        for fut in futures:
+            fut.result()
+        print(f"已打包 {len(pcd_files)} 帧 / {total_points} 点 -> {archive_path} "
+              f"({(time.perf_counter() - t_start):.1f}s)")
+
+        # 3. 往返校验 (Open3D 独立解码，与写入时用的 pcd_reader 互不依赖)
+        if verify:
+            n_frames = len(pcd_files)
+            if verify_frames and verify_frames < n_frames:
+                sample = np.unique(np.linspace(0, n_frames - 1, verify_frames).round().astype(int))
+            else:
+                sample = np.arange(n_frames)
+            verify_jobs = [(pcd_files[i], int(i)) for i in sample]
+            futures = [pool.submit(_verify_frames, archive_path, chunk)
+                       for chunk in _split(verify_jobs, workers * 4)]
+            mismatched = [name for fut in futures for name in fut.result()]
+            if mismatched:
+                raise ValueError(f"往返校验失败 ({len(mismatched)} / {len(sample)} 帧)，例如: {mismatched[:5]}")
+            print(f"往返校验通过 (Open3D 抽查 {len(sample)} / {n_frames} 帧)")
+
+    return archive_path
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="将 scans_directory 中的 PCD 打包为单个 .scanpack 文件")
+    parser.add_argument("frames_dir", nargs="?", default="scans_directory")
+    parser.add_argument("archive_path", nargs="?", default=None)
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    parser.add_argument("--no-verify", action="store_true", help="跳过往返校验")
+    parser.add_argument("--verify-frames", type=int, default=VERIFY_SAMPLE_FRAMES,
+                        help="往返校验用 Open3D 抽查的帧数 (0 为全部帧)")
+    args = parser.parse_args()
+
+    archive_path = args.archive_path or args.frames_dir.rstrip("/\\") + ARCHIVE_SUFFIX
+    try:
+        convert_directory(args.frames_dir, archive_path, workers=args.workers, verify=not args.no_verify,
+                          verify_frames=args.verify_frames)
+    except Exception as e:
+        print(f"打包失败: {e}")
+        sys.exit(1)
@@ -0,0 +1,170 @@
+import os
+import sys
+import io
+import csv
+import glob
+import time
+import pickle
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+from map_lod import MAP_CACHE_DIRNAME, load_map_lod
+from replay_style import is_reflector_map
+from scan_archive import ARCHIVE_SUFFIX, open_scan_source, read_scan_frame
+
+# 强制设置标准输出为 UTF-8，解决中文乱码
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+# 平面定位：扫描与地图只在 XY 平面内比较 (显示时 Z 也被压平)
+SCORE_COLUMNS = ['frame', 'file', 'x', 'y', 'yaw', 'points', 'inlier_ratio', 'mean_dist', 'p95_dist']
+
+
+def _map_files(map_path):
+    """地图路径为文件夹时，取其中所有非反光板地图"""
+    if os.path.isdir(map_path):
+        return [p for p in sorted(glob.glob(os.path.join(map_path, "*.pcd")))
+                if not is_reflector_map(os.path.basename(p))]
+    return [map_path]
+
+
+def build_map_kdtree(map_path, voxel_size=0.05):
+    """
+    构建 (或从磁盘缓存加载) 全局地图的 XY 平面 KD-tree，返回缓存文件路径。
+    缓存以地图文件的大小/修改时间与体素大小为键，地图不变时直接复用。
+    """
+    files = _map_files(map_path)
+    if not files:
+        raise ValueError(f"在 {map_path} 中没有找到地图文件")
+    stamp = [(os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns) for p in files]
+
+    cache_dir = os.path.join(os.path.dirname(os.path.abspath(files[0])), MAP_CACHE_DIRNAME)
+    cache_path = os.path.join(cache_dir, f"kdtree_xy.voxel{voxel_size or 0:g}.pkl")
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, 'rb') as f:
+                if pickle.load(f) == stamp:
+                    return cache_path
+        except Exception as e:
+            print(f"KD-tree 缓存损坏，重新生成: {e}")
+
+    t0 = time.perf_counter()
+    points = np.vstack([load_map_lod(p, voxel_size)[0] for p in files])
+    tree = cKDTree(points[:, :2])
+    os.makedirs(cache_dir, exist_ok=True)
+    with open(cache_path, 'wb') as f:
+        pickle.dump(stamp, f)
+        pickle.dump(tree, f, protocol=pickle.HIGHEST_PROTOCOL)
+    print(f"已构建地图 KD-tree: {len(points)} 点 ({time.perf_counter() - t0:.1f}s) -> {cache_path}")
+    return cache_path
+
+
+def load_map_kdtree(cache_path):
+    with open(cache_path, 'rb') as f:
+        pickle.load(f)  # stamp
+        return pickle.load(f)
+
+
+def score_scan(tree, xyz, transform_mat, inlier_dist=0.1, max_dist=2.0):
+    """
+    按 VIEWPOINT 变换扫描后，计算每个点到地图的最近邻距离。
+    超过 max_dist 的点按 max_dist 计 (查询带上界，远离地图的点不会拖慢搜索)。
+    返回 (点数, 内点率, 平均距离, p95 距离)
+    """
+    points = xyz[:, :2].astype(np.float64) @ transform_mat[:2, :2].T + transform_mat[:2, 3]
+    points = points[np.isfinite(points).all(axis=1)]
+    if len(points) == 0:
+        return 0, 0.0, float('nan'), float('nan')
+    dists, _ = tree.query(points, k=1, distance_upper_bound=max_dist)
+    np.minimum(dists, max_dist, out=dists)
+    return len(points), float(np.mean(dists <= inlier_dist)), float(dists.mean()), float(np.percentile(dists, 95))
+
+
+_worker_tree = None
+
+
+def _init_worker(cache_path):
+    global _worker_tree
+    _worker_tree = load_map_kdtree(cache_path)
+
+
+def _score_range(frames_dir, start, end, inlier_dist, max_dist):
+    """子进程：为 [start, end) 区间内的帧打分"""
+    archive, names = open_scan_source(frames_dir)
+    rows = []
+    for index in range(start, end):
+        try:
+            xyz, _, transform_mat = read_scan_frame(archive, names, index)
+        except Exception as e:
+            print(f"读取失败: {names[index]} ({e})")
+            continue
+        n, inlier_ratio, mean_dist, p95_dist = score_scan(_worker_tree, xyz, transform_mat, inlier_dist, max_dist)
+        yaw = np.arctan2(transform_mat[1, 0], transform_mat[0, 0])
+        rows.append([index, os.path.basename(names[index]), transform_mat[0, 3], transform_mat[1, 3], yaw,
+                     n, inlier_ratio, mean_dist, p95_dist])
+    return rows
+
+
+def score_sequence(map_path, frames_dir, out_csv, workers=None, voxel_size=0.05, inlier_dist=0.1, max_dist=2.0):
+    """对整个扫描序列并行打分，并写出逐帧评分表 (CSV)"""
+    cache_path = build_map_kdtree(map_path, voxel_size)
+    n_frames = len(open_scan_source(frames_dir)[1])
+    if n_frames == 0:
+        raise ValueError(f"在 {frames_dir} 中没有找到 .pcd 文件")
+    workers = max(1, min(workers or os.cpu_count() or 1, n_frames))
+
+    t0 = time.perf_counter()
+    # 分块比进程数多，保证负载均衡
+    bounds = np.linspace(0, n_frames, min(n_frames, workers * 8) + 1).astype(int)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(cache_path,)) as pool:
+        futures = [pool.submit(_score_range, frames_dir, int(a), int(b), inlier_dist, max_dist)
+                   for a, b in zip(bounds[:-1], bounds[1:]) if b > a]
+        rows = [row for fut in futures for row in fut.result()]
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_csv)), exist_ok=True)
+    with open(out_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(SCORE_COLUMNS)
+        for row in rows:
+            writer.writerow(row[:2] + [f"{v:.6f}" for v in row[2:5]] + [row[5]] + [f"{v:.6f}" for v in row[6:]])
+
+    print(f"已评分 {len(rows)} 帧 ({elapsed:.1f}s, {workers} 进程) -> {out_csv}")
+    worst = sorted(rows, key=lambda r: r[6])[:10]
+    print("内点率最低的帧:")
+    for row in worst:
+        print(f"  [{row[0]:05d}] {row[1]} | inlier {row[6]*100:5.1f}% | mean {row[7]:.3f} m | p95 {row[8]:.3f} m")
+    return rows
+
+
+def load_worst_frames(score_csv):
+    """读取评分表，返回按内点率从低到高排序的 [(文件名, 内点率, 平均距离, p95 距离), ...]"""
+    with open(score_csv, 'r', encoding='utf-8') as f:
+        rows = [(r['file'], float(r['inlier_ratio']), float(r['mean_dist']), float(r['p95_dist']))
+                for r in csv.DictReader(f)]
+    rows.sort(key=lambda r: r[1])
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="逐帧扫描-地图一致性评分 (最近邻残差)")
+    parser.add_argument("--map", default="./map", help="全局地图文件或文件夹 (跳过反光板地图)")
+    parser.add_argument("--frames", default="scans_directory", help="PCD 文件夹或 .scanpack 打包文件")
+    parser.add_argument("--out", default="./out/scan_map_scores.csv", help="评分表输出路径")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    parser.add_argument("--voxel", type=float, default=0.05, help="建树前地图体素降采样边长 (米)，0 为全分辨率")
+    parser.add_argument("--inlier", type=float, default=0.1, help="内点距离阈值 (米)")
+    parser.add_argument("--max-dist", type=float, default=2.0, help="最近邻搜索上界 (米)")
+    args = parser.parse_args()
+
+    frames_dir = args.frames
+    if os.path.isfile(frames_dir + ARCHIVE_SUFFIX):
+        frames_dir = frames_dir + ARCHIVE_SUFFIX
+    try:
+        score_sequence(args.map, frames_dir, args.out, workers=args.workers, voxel_size=args.voxel or None,
+                       inlier_dist=args.inlier, max_dist=args.max_dist)
+    except Exception as e:
+        print(f"评分失败: {e}")
+        sys.exit(1)
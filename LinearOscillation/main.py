@@ -2,16 +2,22 @@
 
 import os
 import re
+import sys
+import time
 from datetime import datetime
-import statistics
 import math
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
 
 # 导入科学计算库
 import numpy as np
 
+# 位姿列 / 窗口统计与 StaticPose 共用 pose_windows.py (追加到 sys.path 末尾，本工具的同名模块仍然优先)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'StaticPose'))
+from pose_windows import build_prefix_sums, window_stats
+
 # 导入绘图库以及 Tkinter 嵌入相关的模块
 import matplotlib.pyplot as plt
 from matplotlib.figure import Figure
@@ -19,7 +25,15 @@ from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg, NavigationToolb
 
 # ==================== 配置 ====================
 LOG_FOLDER = ""
-all_records = []  
+# 最近一次加载的逐文件扫描报告 (显示在结果框中)
+scan_report = ""
+# 所有定位记录，按时间排序的列式数组 {'time': int64 秒, 'type': int64, 'x'/'y'/'rz': float64}
+all_records = {}
+# 每个 type 的记录下标 (按时间有序) 及对应时间，用于 searchsorted 定位时间范围
+type_index = {}
+type_times = {}
+# 每个 type 的连续列 (x/y/rz，rz 已解缠绕) 与前缀和，任意时间窗的均值 O(1)、协方差 / PCA 直线在窗口切片上得出
+type_data = {}
 
 # 防弹级正则表达式
 pattern = re.compile(
@@ -33,103 +47,269 @@ pattern = re.compile(
     r'([-+]?\d*\.?\d+)\s*\)'                           
 )
 
-def load_all_logs_from_folder(folder_path):
-    global all_records
-    all_records.clear()
-    folder = Path(folder_path)
-    if not folder.exists() or not folder.is_dir():
-        raise ValueError("指定路径不是有效文件夹")
-
+# 文件嗅探：读取开头 SNIFF_BYTES 字节，含 NUL 或非文本字节占比超过 BINARY_RATIO 的视为二进制
+SNIFF_BYTES = 4096
+BINARY_RATIO = 0.1
+TEXT_BYTES = bytes([7, 8, 9, 10, 12, 13, 27]) + bytes(range(0x20, 0x100))
+
+def is_text_file(path):
+    """嗅探文件开头判断是否为文本日志 (core dump、bag 等二进制文件直接跳过，不再逐行正则匹配)"""
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if not head or b'\x00' in head:
+        return False
+    return len(head.translate(None, TEXT_BYTES)) / len(head) <= BINARY_RATIO
+
+def to_epoch_seconds(times):
+    """'YYYY-mm-dd HH:MM:SS' 字符串列表 -> (int64 秒, 有效掩码)；整列转换，个别非法时间逐个处理"""
+    stamps = [t.replace(' ', 'T') for t in times]
+    try:
+        time_arr = np.array(stamps, dtype='datetime64[s]')
+    except ValueError:
+        # 个别行时间非法 (如月份越界) 时逐个转换，非法行置 NaT 后丢弃
+        time_arr = np.array([_parse_stamp(t) for t in stamps], dtype='datetime64[s]')
+    valid = ~np.isnat(time_arr)
+    return time_arr.astype(np.int64), valid
+
+def parse_log_file(path):
+    """子进程：逐行匹配一个文本日志，返回 (列数组, 耗时)；列数组只含时间合法的记录"""
+    t0 = time.perf_counter()
+    times, types, xs, ys, rzs = [], [], [], [], []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = pattern.search(line)
+                if match:
+                    try:
+                        log_type = int(match.group(2))
+                        x = float(match.group(3))
+                        y = float(match.group(4))
+                        rz = float(match.group(5))
+                        times.append(match.group(1))
+                        types.append(log_type)
+                        xs.append(x)
+                        ys.append(y)
+                        rzs.append(rz)
+                    except Exception:
+                        # 如果这单行数据转换出错，只跳过这一行，绝不跳过整个文件！
+                        continue
+    except Exception:
+        # 文件打不开 (权限、被占用等)，按空文件处理
+        pass
+
+    time_arr, valid = to_epoch_seconds(times)
+    columns = {
+        'time': time_arr[valid],
+        'type': np.array(types, dtype=np.int64)[valid],
+        'x': np.array(xs, dtype=np.float64)[valid],
+        'y': np.array(ys, dtype=np.float64)[valid],
+        'rz': np.array(rzs, dtype=np.float64)[valid],
+    }
+    return columns, time.perf_counter() - t0
+
+def scan_log_files(folder, workers=None):
+    """
+    递归列出候选文件，先嗅探开头跳过二进制文件，文本日志交给进程池并行解析，结果按列合并。
+    返回 (合并后的列数组, 每个文件的报告行)
+    """
+    # 深度搜索文件夹内所有的日志文件（包含子文件夹）
     log_files = []
-    for ext in ('*.log', '*.txt', '*.LOG', '*.TXT'):  
+    for ext in ('*.log', '*.txt', '*.LOG', '*.TXT'):
         log_files.extend(folder.rglob(ext))
+    # 补充查找没有后缀名的文件
     log_files.extend([f for f in folder.rglob('*') if f.is_file() and not f.suffix])
-    log_files = list(set(log_files))
+    # 文件路径去重
+    log_files = sorted(set(log_files))
 
-    matched_lines = 0
-    for log_file in log_files:
+    report = []
+    text_files = []
+    for path in log_files:
+        t0 = time.perf_counter()
         try:
-            with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                for line in f:
-                    match = pattern.search(line)
-                    if match:
-                        try:
-                            time_str = match.group(1)
-                            log_time = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-                            log_type = int(match.group(2))
-                            x = float(match.group(3))
-                            y = float(match.group(4))
-                            rz = float(match.group(5))
-                            all_records.append({
-                                'time': log_time,
-                                'type': log_type,
-                                'x': x,
-                                'y': y,
-                                'rz': rz
-                            })
-                            matched_lines += 1
-                        except Exception:
-                            continue
-        except Exception:
+            size = path.stat().st_size
+            is_text = is_text_file(path)
+        except OSError:
             continue
+        if is_text:
+            text_files.append((path, size))
+        else:
+            sniffed = min(size, SNIFF_BYTES)
+            report.append({'file': str(path.relative_to(folder)), 'status': '跳过', 'records': 0,
+                           'scanned': sniffed, 'skipped': size - sniffed, 'elapsed': time.perf_counter() - t0})
+
+    parts = []
+    if text_files:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(text_files)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(parse_log_file, [p for p, _ in text_files])
+            for (path, size), (columns, elapsed) in zip(text_files, results):
+                parts.append(columns)
+                report.append({'file': str(path.relative_to(folder)), 'status': '解析', 'records': len(columns['time']),
+                               'scanned': size, 'skipped': 0, 'elapsed': elapsed})
+
+    keys = ('time', 'type', 'x', 'y', 'rz')
+    dtypes = (np.int64, np.int64, np.float64, np.float64, np.float64)
+    merged = {k: np.concatenate([p[k] for p in parts]) if parts else np.zeros(0, dtype=dt) for k, dt in zip(keys, dtypes)}
+    report.sort(key=lambda r: r['file'])
+    return merged, report
+
+def format_scan_report(report, elapsed):
+    """每个文件的扫描报告：状态、记录数、扫描字节、跳过字节、耗时"""
+    scanned = sum(r['scanned'] for r in report)
+    skipped = sum(r['skipped'] for r in report)
+    n_skip = sum(1 for r in report if r['status'] == '跳过')
+    lines = [
+        f"扫描报告: {len(report)} 个文件 (跳过二进制 {n_skip} 个) | 扫描 {scanned / 1024 / 1024:.1f} MB | "
+        f"跳过 {skipped / 1024 / 1024:.1f} MB | 总耗时 {elapsed:.2f}s",
+        f"{'状态':<4} {'记录数':>10} {'扫描(KB)':>12} {'跳过(KB)':>12} {'耗时(ms)':>10}  文件",
+    ]
+    for r in report:
+        lines.append(f"{r['status']:<4} {r['records']:>10} {r['scanned'] / 1024:>12.1f} {r['skipped'] / 1024:>12.1f} "
+                     f"{r['elapsed'] * 1000:>10.1f}  {r['file']}")
+    return "\n".join(lines) + "\n\n"
+
+def load_all_logs_from_folder(folder_path):
+    """从指定文件夹加载所有日志文件并解析定位记录"""
+    global scan_report
+    folder = Path(folder_path)
+    if not folder.exists() or not folder.is_dir():
+        raise ValueError("指定路径不是有效文件夹")
 
-    all_records.sort(key=lambda r: r['time'])
+    t0 = time.perf_counter()
+    columns, report = scan_log_files(folder)
+    build_columns(columns)
+    scan_report = format_scan_report(report, time.perf_counter() - t0)
+    print(scan_report)
+
+    matched_lines = len(all_records['time'])
     if matched_lines > 0:
-        messagebox.showinfo("加载成功", f"扫描了 {len(log_files)} 个文件\n共成功提取了 {matched_lines} 条定位数据！")
+        n_skip = sum(1 for r in report if r['status'] == '跳过')
+        messagebox.showinfo("加载成功", f"扫描了 {len(report)} 个文件 (跳过 {n_skip} 个二进制文件)\n共成功提取了 {matched_lines} 条定位数据！")
     return matched_lines > 0
 
+def build_columns(columns):
+    """把各文件解析出的列合并后按时间排序，为每个 type 建立有序下标与前缀和"""
+    global all_records, type_index, type_times, type_data
+    by_time = np.argsort(columns['time'], kind='stable')
+    all_records = {k: v[by_time] for k, v in columns.items()}
+
+    # 稳定排序按 type 分组，组内仍保持时间顺序
+    by_type = np.argsort(all_records['type'], kind='stable')
+    unique_types, starts = np.unique(all_records['type'][by_type], return_index=True)
+    type_index = {int(t): idx for t, idx in zip(unique_types, np.split(by_type, starts[1:]))}
+    type_times = {t: all_records['time'][idx] for t, idx in type_index.items()}
+    type_data = {t: build_prefix_sums(all_records['x'][idx], all_records['y'][idx], all_records['rz'][idx])
+                 for t, idx in type_index.items()}
+
+def window_line_fit(data, lo, hi):
+    """
+    由窗口协方差矩阵的闭式特征分解得到 PCA 直线：主方向 (dx, dy) 按起点 -> 终点统一朝向，
+    横向标准差为最小特征值的平方根 (即点到直线有符号距离的标准差)。协方差在窗口切片上按两遍法求得，O(hi - lo)
+    """
+    win = window_stats(data, lo, hi)
+    a, b, c = win['var_x'], win['cov_xy'], win['var_y']
+    half_diff = (a - c) / 2
+    root_term = math.hypot(half_diff, b)
+    lambda_min = max((a + c) / 2 - root_term, 0.0)
+    theta = 0.5 * math.atan2(2 * b, a - c)
+    dx, dy = math.cos(theta), math.sin(theta)
+    if dx * (data['x'][hi - 1] - data['x'][lo]) + dy * (data['y'][hi - 1] - data['y'][lo]) < 0:
+        dx, dy = -dx, -dy
+    line_angle = math.atan2(dy, dx)
+    heading_mean = (win['mean_rz'] - line_angle + math.pi) % (2 * math.pi) - math.pi
+    return {
+        'n': win['n'], 'mean_pt': np.array([win['mean_x'], win['mean_y']]), 'dx': dx, 'dy': dy,
+        'line_angle': line_angle, 'lateral_std': math.sqrt(lambda_min),
+        'heading_mean': heading_mean, 'heading_std': math.sqrt(win['var_rz']),
+    }
+
+def _parse_stamp(stamp):
+    try:
+        return np.datetime64(stamp, 's')
+    except ValueError:
+        return np.datetime64('NaT')
+
+def to_seconds(time_str):
+    """'YYYY-mm-dd HH:MM:SS' -> int64 秒 (与 all_records['time'] 同一时间轴)"""
+    return int(np.datetime64(datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S"), 's').astype(np.int64))
+
 def get_unique_times():
-    return sorted({r['time'].strftime("%Y-%m-%d %H:%M:%S") for r in all_records})
+    if not all_records:
+        return []
+    unique = np.unique(all_records['time']).astype('datetime64[s]')
+    return [t.replace('T', ' ') for t in np.datetime_as_string(unique)]
 
 def get_unique_types():
-    return sorted(set(r['type'] for r in all_records))
-
-def analyze_and_plot():
-    start_str = combo_start.get()
-    end_str = combo_end.get()
+    return sorted(type_index.keys())
+
+def query_range(target_type, start_sec, end_sec):
+    """某 type 在 [start, end] 秒内的记录在该 type 列中的区间 [lo, hi)：在有序时间上二分查找"""
+    if target_type not in type_index:
+        return 0, 0
+    times = type_times[target_type]
+    lo = int(np.searchsorted(times, start_sec, side='left'))
+    hi = int(np.searchsorted(times, end_sec, side='right'))
+    return lo, hi
+
+def selected_window(show_warnings=True):
+    """读取界面上的时间范围与类型，返回 (type, lo, hi)；无效时返回 None"""
     try:
         target_type = int(combo_type.get())
     except ValueError:
-        messagebox.showwarning("警告", "请选择有效的类型（type）")
+        if show_warnings:
+            messagebox.showwarning("警告", "请选择有效的类型（type）")
+        return None
+
+    start_sec = to_seconds(combo_start.get())
+    end_sec = to_seconds(combo_end.get())
+    if start_sec > end_sec:
+        if show_warnings:
+            messagebox.showwarning("警告", "起始时间不能晚于结束时间")
+        return None
+
+    lo, hi = query_range(target_type, start_sec, end_sec)
+    if hi - lo < 2:
+        if show_warnings:
+            messagebox.showwarning("数据不足", "所选范围内数据少于2条，无法拟合直线。")
+        return None
+    return target_type, lo, hi
+
+def update_live_fit(*_):
+    """拖动起止滑块时实时刷新：直线朝向、横向 / 朝向波动都由 window_line_fit 在窗口切片上整列求得"""
+    window = selected_window(show_warnings=False)
+    if window is None:
+        live_label.config(text="实时拟合: 数据不足")
         return
+    target_type, lo, hi = window
+    fit = window_line_fit(type_data[target_type], lo, hi)
+    live_label.config(text=(
+        f"实时拟合: {fit['n']} 条 | 直线朝向 {np.degrees(fit['line_angle']):.2f}°\n"
+        f"横向标准差 {fit['lateral_std']:.6f} m | 朝向偏差 {fit['heading_mean']:.6f} ± {fit['heading_std']:.6f} rad"))
 
-    start_dt = datetime.strptime(start_str, "%Y-%m-%d %H:%M:%S")
-    end_dt = datetime.strptime(end_str, "%Y-%m-%d %H:%M:%S")
+def on_slider_moved(combo, times, value):
+    combo.set(times[int(float(value))])
+    update_live_fit()
 
-    if start_dt > end_dt:
-        messagebox.showwarning("警告", "起始时间不能晚于结束时间")
-        return
-
-    filtered = [r for r in all_records if start_dt <= r['time'] <= end_dt and r['type'] == target_type]
-
-    if len(filtered) < 2:
-        messagebox.showwarning("数据不足", "所选范围内数据少于2条，无法拟合直线。")
+def analyze_and_plot():
+    window = selected_window()
+    if window is None:
         return
+    target_type, lo, hi = window
 
-    # 1. 提取数据转换为 Numpy 数组
-    xs = np.array([r['x'] for r in filtered])
-    ys = np.array([r['y'] for r in filtered])
-    rzs = np.array([r['rz'] for r in filtered])
+    # 1. 该 type 连续列上的切片 (视图，无拷贝)
+    data = type_data[target_type]
+    xs, ys, rzs = data['x'][lo:hi], data['y'][lo:hi], data['rz'][lo:hi]
     points = np.column_stack((xs, ys))
 
-    # 2. PCA 拟合直线 (正交距离回归)
-    mean_pt = points.mean(axis=0)
+    # 2. PCA 拟合直线 (正交距离回归)：均值来自前缀和、协方差在切片上两遍法求得，已按起点 -> 终点统一方向
+    fit = window_line_fit(data, lo, hi)
+    mean_pt, dx, dy = fit['mean_pt'], fit['dx'], fit['dy']
     centered = points - mean_pt
-    cov_matrix = np.cov(centered, rowvar=False)
-    evals, evecs = np.linalg.eigh(cov_matrix)
-    direction = evecs[:, 1]  
-    dx, dy = direction
-
-    # 统一方向
-    traj_vec = points[-1] - points[0]
-    if np.dot(direction, traj_vec) < 0:
-        dx, dy = -dx, -dy
-
-    line_angle = np.arctan2(dy, dx)
+    line_angle = fit['line_angle']
 
-    # 3. 计算垂直距离
+    # 3. 计算有符号垂直距离 (直线左侧为正)；其标准差即实时拟合中的横向标准差 (最小特征值的平方根)
     normal_vec = np.array([-dy, dx])
-    distances = np.abs(np.dot(centered, normal_vec))
+    distances = np.dot(centered, normal_vec)
 
     # 4. 计算朝向角误差
     heading_errors = rzs - line_angle
@@ -147,10 +327,10 @@ def analyze_and_plot():
 
     output = (
         f"✅ 分析完成！\n"
-        f"数据量: {len(filtered)} 条 | 类型: {target_type}\n"
+        f"数据量: {hi - lo} 条 | 类型: {target_type}\n"
         f"拟合直线朝向角: {line_angle:.6f} rad ({np.degrees(line_angle):.2f}°)\n"
         f"-------------------------------------\n"
-        f"【位置误差（点到直线垂直距离）】\n"
+        f"【位置误差（点到直线的有符号垂直距离，左正右负）】\n"
         + format_stats(distances, "m") +
         f"-------------------------------------\n"
         f"【朝向误差（车体 RZ - 直线朝向）】\n"
@@ -225,7 +405,7 @@ def select_folder_and_load():
         messagebox.showerror("加载失败", f"无法加载日志：{e}")
 
 def init_gui():
-    global combo_start, combo_end, combo_type, result_text, right_frame
+    global combo_start, combo_end, combo_type, result_text, right_frame, live_label
     times = get_unique_times()
     types = get_unique_types()
     if not times or not types: return
@@ -255,23 +435,37 @@ def init_gui():
     combo_start = ttk.Combobox(controls_frame, values=times, state="readonly", width=22)
     combo_start.set(times[0])
     combo_start.grid(row=0, column=1, pady=5, sticky='w', padx=5)
+    slider_start = tk.Scale(controls_frame, from_=0, to=len(times) - 1, orient=tk.HORIZONTAL, showvalue=0,
+                            command=lambda v: on_slider_moved(combo_start, times, v))
+    slider_start.grid(row=1, column=0, columnspan=2, sticky='ew')
 
-    tk.Label(controls_frame, text="结束时间:", font=("Arial", 10)).grid(row=1, column=0, pady=5, sticky='w')
+    tk.Label(controls_frame, text="结束时间:", font=("Arial", 10)).grid(row=2, column=0, pady=5, sticky='w')
     combo_end = ttk.Combobox(controls_frame, values=times, state="readonly", width=22)
     combo_end.set(times[-1])
-    combo_end.grid(row=1, column=1, pady=5, sticky='w', padx=5)
+    combo_end.grid(row=2, column=1, pady=5, sticky='w', padx=5)
+    slider_end = tk.Scale(controls_frame, from_=0, to=len(times) - 1, orient=tk.HORIZONTAL, showvalue=0,
+                          command=lambda v: on_slider_moved(combo_end, times, v))
+    slider_end.set(len(times) - 1)
+    slider_end.grid(row=3, column=0, columnspan=2, sticky='ew')
 
-    tk.Label(controls_frame, text="定位类型 (type):", font=("Arial", 10)).grid(row=2, column=0, pady=5, sticky='w')
+    tk.Label(controls_frame, text="定位类型 (type):", font=("Arial", 10)).grid(row=4, column=0, pady=5, sticky='w')
     combo_type = ttk.Combobox(controls_frame, values=types, state="readonly", width=22)
     combo_type.set(types[0])
-    combo_type.grid(row=2, column=1, pady=5, sticky='w', padx=5)
+    combo_type.grid(row=4, column=1, pady=5, sticky='w', padx=5)
+    combo_type.bind("<<ComboboxSelected>>", update_live_fit)
+    combo_start.bind("<<ComboboxSelected>>", update_live_fit)
+    combo_end.bind("<<ComboboxSelected>>", update_live_fit)
 
     btn_analyze = tk.Button(left_frame, text="拟合分析与绘图", command=analyze_and_plot, bg="#2196F3", fg="white", font=("Arial", 11, "bold"))
     btn_analyze.pack(fill=tk.X, pady=10)
 
+    live_label = tk.Label(left_frame, text="实时拟合: 拖动滑块查看", font=("Consolas", 9), fg="#333333", justify=tk.LEFT, anchor='w')
+    live_label.pack(fill=tk.X)
+
     tk.Label(left_frame, text="分析与统计结果:", font=("Arial", 10, "bold")).pack(anchor='w', pady=(5,0))
     result_text = scrolledtext.ScrolledText(left_frame, wrap=tk.WORD, font=("Consolas", 10))
     result_text.pack(fill=tk.BOTH, expand=True)
+    result_text.insert(tk.END, scan_report)
 
     # 初始状态在右侧提示一句
     tk.Label(right_frame, text="点击左侧【拟合分析与绘图】在此处显示轨迹", font=("Arial", 12), fg="gray").pack(expand=True)
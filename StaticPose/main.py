@@ -2,17 +2,40 @@
 
 import os
 import re
+import time
 from datetime import datetime
-import statistics
 import tkinter as tk
 from tkinter import ttk, scrolledtext, messagebox, filedialog
 from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from pose_windows import build_prefix_sums, window_means, window_stats, sliding_variances, wrap_angle
 
 # ==================== 配置 ====================
 LOG_FOLDER = ""  # 日志文件夹路径
 
-# 全局变量：存储所有解析出的定位记录
-all_records = []  
+# 最近一次加载的逐文件扫描报告 (显示在结果框中)
+scan_report = ""
+# 全局变量：所有解析出的定位记录，按时间排序的列式数组
+# {'time': int64 秒, 'type': int64, 'x'/'y'/'rz': float64}
+all_records = {}
+# 每个 type 的记录下标 (按时间有序) 及对应时间，用于 searchsorted 定位时间范围
+type_index = {}
+type_times = {}
+# 每个 type 的连续列 (x/y/rz，rz 已解缠绕) 与前缀和 (任意时间窗的均值 O(1) 得出)
+type_data = {}
+
+# 静止段自动检测参数
+STATIONARY_WINDOW = 20                     # 滑动窗口长度 (条)
+STATIONARY_POS_STD = 0.01                  # 窗口内位置标准差上限 (m)
+STATIONARY_RZ_STD = np.radians(0.5)        # 窗口内 RZ 标准差上限 (rad)
+STATIONARY_MAX_GAP = 5                     # 相邻记录间隔超过该值 (秒) 视为断开
+STATIONARY_MIN_SECONDS = 10                # 静止段最短时长 (秒)
+
+# 最近一次检测出的静止段
+stationary_segments = []
 
 # 终极版正则表达式：对多余的空格完全免疫
 pattern = re.compile(
@@ -26,105 +49,276 @@ pattern = re.compile(
     r'([-+]?\d*\.?\d+)\s*\)'                           # 组5：提取 RZ / Yaw (偏航角)
 )
 
-def load_all_logs_from_folder(folder_path):
-    """从指定文件夹加载所有日志文件并解析定位记录"""
-    global all_records
-    all_records.clear()
-    folder = Path(folder_path)
-    if not folder.exists() or not folder.is_dir():
-        raise ValueError("指定路径不是有效文件夹")
-
+# 文件嗅探：读取开头 SNIFF_BYTES 字节，含 NUL 或非文本字节占比超过 BINARY_RATIO 的视为二进制
+SNIFF_BYTES = 4096
+BINARY_RATIO = 0.1
+TEXT_BYTES = bytes([7, 8, 9, 10, 12, 13, 27]) + bytes(range(0x20, 0x100))
+
+def is_text_file(path):
+    """嗅探文件开头判断是否为文本日志 (core dump、bag 等二进制文件直接跳过，不再逐行正则匹配)"""
+    with open(path, 'rb') as f:
+        head = f.read(SNIFF_BYTES)
+    if not head or b'\x00' in head:
+        return False
+    return len(head.translate(None, TEXT_BYTES)) / len(head) <= BINARY_RATIO
+
+def to_epoch_seconds(times):
+    """'YYYY-mm-dd HH:MM:SS' 字符串列表 -> (int64 秒, 有效掩码)；整列转换，个别非法时间逐个处理"""
+    stamps = [t.replace(' ', 'T') for t in times]
+    try:
+        time_arr = np.array(stamps, dtype='datetime64[s]')
+    except ValueError:
+        # 个别行时间非法 (如月份越界) 时逐个转换，非法行置 NaT 后丢弃
+        time_arr = np.array([_parse_stamp(t) for t in stamps], dtype='datetime64[s]')
+    valid = ~np.isnat(time_arr)
+    return time_arr.astype(np.int64), valid
+
+def parse_log_file(path):
+    """子进程：逐行匹配一个文本日志，返回 (列数组, 耗时)；列数组只含时间合法的记录"""
+    t0 = time.perf_counter()
+    times, types, xs, ys, rzs = [], [], [], [], []
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            for line in f:
+                match = pattern.search(line)
+                if match:
+                    try:
+                        log_type = int(match.group(2))
+                        x = float(match.group(3))
+                        y = float(match.group(4))
+                        rz = float(match.group(5))
+                        times.append(match.group(1))
+                        types.append(log_type)
+                        xs.append(x)
+                        ys.append(y)
+                        rzs.append(rz)
+                    except Exception:
+                        # 如果这单行数据转换出错，只跳过这一行，绝不跳过整个文件！
+                        continue
+    except Exception:
+        # 文件打不开 (权限、被占用等)，按空文件处理
+        pass
+
+    time_arr, valid = to_epoch_seconds(times)
+    columns = {
+        'time': time_arr[valid],
+        'type': np.array(types, dtype=np.int64)[valid],
+        'x': np.array(xs, dtype=np.float64)[valid],
+        'y': np.array(ys, dtype=np.float64)[valid],
+        'rz': np.array(rzs, dtype=np.float64)[valid],
+    }
+    return columns, time.perf_counter() - t0
+
+def scan_log_files(folder, workers=None):
+    """
+    递归列出候选文件，先嗅探开头跳过二进制文件，文本日志交给进程池并行解析，结果按列合并。
+    返回 (合并后的列数组, 每个文件的报告行)
+    """
     # 深度搜索文件夹内所有的日志文件（包含子文件夹）
     log_files = []
-    for ext in ('*.log', '*.txt', '*.LOG', '*.TXT'):  
+    for ext in ('*.log', '*.txt', '*.LOG', '*.TXT'):
         log_files.extend(folder.rglob(ext))
     # 补充查找没有后缀名的文件
     log_files.extend([f for f in folder.rglob('*') if f.is_file() and not f.suffix])
-    
     # 文件路径去重
-    log_files = list(set(log_files))
-
-    matched_lines = 0
+    log_files = sorted(set(log_files))
 
-    for log_file in log_files:
+    report = []
+    text_files = []
+    for path in log_files:
+        t0 = time.perf_counter()
         try:
-            with open(log_file, 'r', encoding='utf-8', errors='replace') as f:
-                for line in f:
-                    match = pattern.search(line)
-                    if match:
-                        try:
-                            time_str = match.group(1)
-                            log_time = datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S")
-                            log_type = int(match.group(2))
-                            x = float(match.group(3))
-                            y = float(match.group(4))
-                            rz = float(match.group(5))
-                            all_records.append({
-                                'time': log_time,
-                                'type': log_type,
-                                'x': x,
-                                'y': y,
-                                'rz': rz
-                            })
-                            matched_lines += 1
-                        except Exception:
-                            # 如果这单行数据转换出错，只跳过这一行，绝不跳过整个文件！
-                            continue
-        except Exception:
-            # 文件如果是二进制或系统文件打不开，直接跳过处理下一个
+            size = path.stat().st_size
+            is_text = is_text_file(path)
+        except OSError:
             continue
+        if is_text:
+            text_files.append((path, size))
+        else:
+            sniffed = min(size, SNIFF_BYTES)
+            report.append({'file': str(path.relative_to(folder)), 'status': '跳过', 'records': 0,
+                           'scanned': sniffed, 'skipped': size - sniffed, 'elapsed': time.perf_counter() - t0})
+
+    parts = []
+    if text_files:
+        workers = max(1, min(workers or os.cpu_count() or 1, len(text_files)))
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = pool.map(parse_log_file, [p for p, _ in text_files])
+            for (path, size), (columns, elapsed) in zip(text_files, results):
+                parts.append(columns)
+                report.append({'file': str(path.relative_to(folder)), 'status': '解析', 'records': len(columns['time']),
+                               'scanned': size, 'skipped': 0, 'elapsed': elapsed})
+
+    keys = ('time', 'type', 'x', 'y', 'rz')
+    dtypes = (np.int64, np.int64, np.float64, np.float64, np.float64)
+    merged = {k: np.concatenate([p[k] for p in parts]) if parts else np.zeros(0, dtype=dt) for k, dt in zip(keys, dtypes)}
+    report.sort(key=lambda r: r['file'])
+    return merged, report
+
+def format_scan_report(report, elapsed):
+    """每个文件的扫描报告：状态、记录数、扫描字节、跳过字节、耗时"""
+    scanned = sum(r['scanned'] for r in report)
+    skipped = sum(r['skipped'] for r in report)
+    n_skip = sum(1 for r in report if r['status'] == '跳过')
+    lines = [
+        f"扫描报告: {len(report)} 个文件 (跳过二进制 {n_skip} 个) | 扫描 {scanned / 1024 / 1024:.1f} MB | "
+        f"跳过 {skipped / 1024 / 1024:.1f} MB | 总耗时 {elapsed:.2f}s",
+        f"{'状态':<4} {'记录数':>10} {'扫描(KB)':>12} {'跳过(KB)':>12} {'耗时(ms)':>10}  文件",
+    ]
+    for r in report:
+        lines.append(f"{r['status']:<4} {r['records']:>10} {r['scanned'] / 1024:>12.1f} {r['skipped'] / 1024:>12.1f} "
+                     f"{r['elapsed'] * 1000:>10.1f}  {r['file']}")
+    return "\n".join(lines) + "\n\n"
 
-    all_records.sort(key=lambda r: r['time'])
-    
+def load_all_logs_from_folder(folder_path):
+    """从指定文件夹加载所有日志文件并解析定位记录"""
+    global scan_report
+    folder = Path(folder_path)
+    if not folder.exists() or not folder.is_dir():
+        raise ValueError("指定路径不是有效文件夹")
+
+    t0 = time.perf_counter()
+    columns, report = scan_log_files(folder)
+    build_columns(columns)
+    scan_report = format_scan_report(report, time.perf_counter() - t0)
+    print(scan_report)
+
+    matched_lines = len(all_records['time'])
     if matched_lines > 0:
-        messagebox.showinfo("加载成功", f"扫描了 {len(log_files)} 个文件\n共成功提取了 {matched_lines} 条定位数据！")
+        n_skip = sum(1 for r in report if r['status'] == '跳过')
+        messagebox.showinfo("加载成功", f"扫描了 {len(report)} 个文件 (跳过 {n_skip} 个二进制文件)\n共成功提取了 {matched_lines} 条定位数据！")
     return matched_lines > 0
 
+def build_columns(columns):
+    """把各文件解析出的列合并后按时间排序，并为每个 type 建立有序下标"""
+    global all_records, type_index, type_times, type_data
+    by_time = np.argsort(columns['time'], kind='stable')
+    all_records = {k: v[by_time] for k, v in columns.items()}
+
+    # 稳定排序按 type 分组，组内仍保持时间顺序
+    by_type = np.argsort(all_records['type'], kind='stable')
+    unique_types, starts = np.unique(all_records['type'][by_type], return_index=True)
+    type_index = {int(t): idx for t, idx in zip(unique_types, np.split(by_type, starts[1:]))}
+    type_times = {t: all_records['time'][idx] for t, idx in type_index.items()}
+    type_data = {t: build_prefix_sums(all_records['x'][idx], all_records['y'][idx], all_records['rz'][idx])
+                 for t, idx in type_index.items()}
+
+def detect_stationary_segments(window=STATIONARY_WINDOW, pos_std=STATIONARY_POS_STD, rz_std=STATIONARY_RZ_STD,
+                               max_gap=STATIONARY_MAX_GAP, min_seconds=STATIONARY_MIN_SECONDS):
+    """
+    按 type 扫描整个日志，提取所有静止段。每个长度为 window 的滑动窗口的位置 / RZ 方差在窗口内按两遍法
+    整列求得 (sliding_variances)；位置与 RZ 标准差都低于阈值的窗口视为静止，被任一静止窗口覆盖的记录
+    连成段 (跨越时间断档的窗口不计)，时长不足 min_seconds 的段丢弃。
+    每段给出抖动 (段内 X/Y/RZ 标准差) 与漂移 (首尾各一个窗口均值之差)
+    """
+    segments = []
+    for target_type in sorted(type_data):
+        data, times = type_data[target_type], type_times[target_type]
+        n = len(times)
+        if n < window:
+            continue
+        lo = np.arange(n - window + 1)
+        hi = lo + window
+        var_pos, var_rz = sliding_variances(data, window)
+        gaps = np.concatenate(([0], np.cumsum(np.diff(times) > max_gap)))
+        quiet = (var_pos <= pos_std ** 2) & (var_rz <= rz_std ** 2) & (gaps[hi - 1] == gaps[lo])
+
+        # 差分数组标记被静止窗口覆盖的记录，再按覆盖状态或时间断档切段
+        cover = np.bincount(lo[quiet], minlength=n + 1) - np.bincount(hi[quiet], minlength=n + 1)
+        covered = np.cumsum(cover[:-1]) > 0
+        breaks = np.flatnonzero((np.diff(covered.astype(np.int8)) != 0) | (np.diff(gaps) != 0)) + 1
+        bounds = np.concatenate(([0], breaks, [n]))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            if not covered[start] or times[end - 1] - times[start] < min_seconds:
+                continue
+            win = window_stats(data, start, end)
+            head = window_means(data, start, start + window)
+            tail = window_means(data, end - window, end)
+            segments.append({
+                'type': target_type, 'lo': int(start), 'hi': int(end),
+                'start': int(times[start]), 'end': int(times[end - 1]), 'n': int(end - start),
+                'std_x': float(np.sqrt(win['var_x'])), 'std_y': float(np.sqrt(win['var_y'])),
+                'std_rz': float(np.sqrt(win['var_rz'])),
+                'drift_xy': float(np.hypot(tail['x'] - head['x'], tail['y'] - head['y'])),
+                'drift_rz': float(wrap_angle(tail['rz'] - head['rz'])),
+            })
+    segments.sort(key=lambda seg: (seg['start'], seg['type']))
+    return segments
+
+def format_seconds(sec):
+    return str(np.datetime64(int(sec), 's')).replace('T', ' ')
+
+def _parse_stamp(stamp):
+    try:
+        return np.datetime64(stamp, 's')
+    except ValueError:
+        return np.datetime64('NaT')
+
+def to_seconds(time_str):
+    """'YYYY-mm-dd HH:MM:SS' -> int64 秒 (与 all_records['time'] 同一时间轴)"""
+    return int(np.datetime64(datetime.strptime(time_str, "%Y-%m-%d %H:%M:%S"), 's').astype(np.int64))
+
 def get_unique_times():
-    return sorted({r['time'].strftime("%Y-%m-%d %H:%M:%S") for r in all_records})
+    if not all_records:
+        return []
+    unique = np.unique(all_records['time']).astype('datetime64[s]')
+    return [t.replace('T', ' ') for t in np.datetime_as_string(unique)]
 
 def get_unique_types():
-    return sorted(set(r['type'] for r in all_records))
-
-def analyze_data():
+    return sorted(type_index.keys())
+
+def query_range(target_type, start_sec, end_sec):
+    """某 type 在 [start, end] 秒内的记录在该 type 列中的区间 [lo, hi)：在有序时间上二分查找"""
+    if target_type not in type_index:
+        return 0, 0
+    times = type_times[target_type]
+    lo = int(np.searchsorted(times, start_sec, side='left'))
+    hi = int(np.searchsorted(times, end_sec, side='right'))
+    return lo, hi
+
+def analyze_data(show_warnings=True):
     start_str = combo_start.get()
     end_str = combo_end.get()
     try:
         target_type = int(combo_type.get())
     except ValueError:
-        messagebox.showwarning("警告", "请选择有效的类型（type）")
+        if show_warnings:
+            messagebox.showwarning("警告", "请选择有效的类型（type）")
         return
 
     try:
-        start_dt = datetime.strptime(start_str, "%Y-%m-%d %H:%M:%S")
-        end_dt = datetime.strptime(end_str, "%Y-%m-%d %H:%M:%S")
+        start_sec = to_seconds(start_str)
+        end_sec = to_seconds(end_str)
     except Exception:
-        messagebox.showwarning("警告", "请选择有效的时间范围")
+        if show_warnings:
+            messagebox.showwarning("警告", "请选择有效的时间范围")
         return
 
-    if start_dt > end_dt:
-        messagebox.showwarning("警告", "起始时间不能晚于结束时间")
+    if start_sec > end_sec:
+        if show_warnings:
+            messagebox.showwarning("警告", "起始时间不能晚于结束时间")
         return
 
-    filtered = [
-        r for r in all_records
-        if start_dt <= r['time'] <= end_dt and r['type'] == target_type
-    ]
+    lo, hi = query_range(target_type, start_sec, end_sec)
 
-    if not filtered:
+    if hi <= lo:
         result_text.delete(1.0, tk.END)
         result_text.insert(tk.END, "! 在所选时间段和类型下，未找到任何定位数据。\n")
         return
 
-    xs = [r['x'] for r in filtered]
-    ys = [r['y'] for r in filtered]
-    rzs = [r['rz'] for r in filtered]
-
-    def stats(values, name):
-        max_v = max(values)
-        min_v = min(values)
-        mean_v = statistics.mean(values)
-        std_v = statistics.stdev(values) if len(values) > 1 else 0.0
+    # 均值来自前缀和 (O(1))；标准差 / 协方差 / 极值在该 type 的连续列切片 (视图，无拷贝) 上整列求得
+    data = type_data[target_type]
+    win = window_stats(data, lo, hi)
+    n = hi - lo
+
+    def stats(key, name):
+        values = data[key][lo:hi]
+        # RZ 列已解缠绕，整体平移 2kπ 使均值落回 (-π, π]，极值与均值保持同一分支
+        shift = float(wrap_angle(win['mean_rz']) - win['mean_rz']) if key == 'rz' else 0.0
+        max_v = float(values.max()) + shift
+        min_v = float(values.min()) + shift
+        mean_v = win[f'mean_{key}'] + shift
+        std_v = float(np.sqrt(win[f'var_{key}'] * n / (n - 1))) if n > 1 else 0.0  # 样本标准差
         range_v = max_v - min_v
         return (
             f"{name} 统计:\n"
@@ -139,10 +333,11 @@ def analyze_data():
         f"✅ 分析完成！\n"
         f"时间段: {start_str} ~ {end_str}\n"
         f"类型: type = {target_type}\n"
-        f"共 {len(filtered)} 条记录\n\n"
-        + stats(xs, "X")
-        + stats(ys, "Y")
-        + stats(rzs, "RZ (偏航角)")
+        f"共 {n} 条记录\n\n"
+        + stats('x', "X")
+        + stats('y', "Y")
+        + stats('rz', "RZ (偏航角)")
+        + f"XY 协方差: {win['cov_xy'] * n / max(n - 1, 1):.6e}\n"
     )
 
     result_text.delete(1.0, tk.END)
@@ -164,8 +359,36 @@ def select_folder_and_load():
     except Exception as e:
         messagebox.showerror("加载失败", f"无法加载日志：{e}")
 
+def run_stationary_detection():
+    """自动检测静止段并填入表格"""
+    global stationary_segments
+    stationary_segments = detect_stationary_segments()
+    segment_tree.delete(*segment_tree.get_children())
+    for i, seg in enumerate(stationary_segments):
+        segment_tree.insert('', tk.END, iid=str(i), values=(
+            format_seconds(seg['start']), format_seconds(seg['end']), seg['type'], seg['n'],
+            f"{seg['std_x'] * 1000:.2f}", f"{seg['std_y'] * 1000:.2f}", f"{np.degrees(seg['std_rz']):.3f}",
+            f"{seg['drift_xy'] * 1000:.2f}", f"{np.degrees(seg['drift_rz']):.3f}"))
+    segment_label.config(text=f"静止段: 共 {len(stationary_segments)} 段 (单击载入分析)")
+
+def on_segment_selected(event):
+    """单击表格中的静止段：把起止时间与类型填入上方选择框并执行分析"""
+    selection = segment_tree.selection()
+    if not selection:
+        return
+    seg = stationary_segments[int(selection[0])]
+    combo_start.set(format_seconds(seg['start']))
+    combo_end.set(format_seconds(seg['end']))
+    combo_type.set(seg['type'])
+    analyze_data()
+
+def on_slider_moved(combo, times, value):
+    """拖动起止滑块：同步下拉框并实时刷新统计 (均值来自前缀和，标准差在窗口切片上整列计算)"""
+    combo.set(times[int(float(value))])
+    analyze_data(show_warnings=False)
+
 def init_gui():
-    global combo_start, combo_end, combo_type, result_text
+    global combo_start, combo_end, combo_type, result_text, segment_tree, segment_label
 
     times = get_unique_times()
     types = get_unique_types()
@@ -177,22 +400,32 @@ def init_gui():
     for widget in root.winfo_children():
         widget.destroy()
 
-    # 设置行列权重，让第5行（文本框所在行）可以随窗口自动拉伸
+    # 设置行列权重，让静止段表格、第7行（结果框）与第9行（扫描报告）可以随窗口自动拉伸
     root.grid_rowconfigure(5, weight=1)
+    root.grid_rowconfigure(7, weight=2)
+    root.grid_rowconfigure(9, weight=1)
     root.grid_columnconfigure(0, weight=1)
     root.grid_columnconfigure(1, weight=1)
+    root.grid_columnconfigure(2, weight=3)
 
     # 起始时间
     tk.Label(root, text="起始时间:", font=("Arial", 10)).grid(row=0, column=0, padx=10, pady=5, sticky='w')
     combo_start = ttk.Combobox(root, values=times, state="readonly", width=25)
     combo_start.set(times[0])
     combo_start.grid(row=0, column=1, padx=10, pady=5, sticky='w')
+    slider_start = tk.Scale(root, from_=0, to=len(times) - 1, orient=tk.HORIZONTAL, showvalue=0,
+                            command=lambda v: on_slider_moved(combo_start, times, v))
+    slider_start.grid(row=0, column=2, padx=10, pady=5, sticky='ew')
 
     # 结束时间
     tk.Label(root, text="结束时间:", font=("Arial", 10)).grid(row=1, column=0, padx=10, pady=5, sticky='w')
     combo_end = ttk.Combobox(root, values=times, state="readonly", width=25)
     combo_end.set(times[-1])
     combo_end.grid(row=1, column=1, padx=10, pady=5, sticky='w')
+    slider_end = tk.Scale(root, from_=0, to=len(times) - 1, orient=tk.HORIZONTAL, showvalue=0,
+                          command=lambda v: on_slider_moved(combo_end, times, v))
+    slider_end.set(len(times) - 1)
+    slider_end.grid(row=1, column=2, padx=10, pady=5, sticky='ew')
 
     # 类型选择
     tk.Label(root, text="定位类型 (type):", font=("Arial", 10)).grid(row=2, column=0, padx=10, pady=5, sticky='w')
@@ -201,13 +434,41 @@ def init_gui():
     combo_type.grid(row=2, column=1, padx=10, pady=5, sticky='w')
 
     # 分析按钮
-    btn_analyze = tk.Button(root, text="开始分析", command=analyze_data, bg="#4CAF50", fg="white", font=("Arial", 10))
-    btn_analyze.grid(row=3, column=0, columnspan=2, pady=15)
+    btn_frame = tk.Frame(root)
+    btn_frame.grid(row=3, column=0, columnspan=3, pady=15)
+    btn_analyze = tk.Button(btn_frame, text="开始分析", command=analyze_data, bg="#4CAF50", fg="white", font=("Arial", 10))
+    btn_analyze.pack(side=tk.LEFT, padx=10)
+    btn_detect = tk.Button(btn_frame, text="自动检测静止段", command=run_stationary_detection, bg="#2196F3", fg="white", font=("Arial", 10))
+    btn_detect.pack(side=tk.LEFT, padx=10)
+
+    # 静止段表格 (抖动为段内标准差，漂移为首尾窗口均值之差)
+    segment_label = tk.Label(root, text="静止段:", font=("Arial", 10, "bold"))
+    segment_label.grid(row=4, column=0, columnspan=3, sticky='w', padx=10)
+    columns = ("start", "end", "type", "n", "std_x", "std_y", "std_rz", "drift_xy", "drift_rz")
+    headings = ("起始时间", "结束时间", "type", "条数", "X抖动(mm)", "Y抖动(mm)", "RZ抖动(°)", "位置漂移(mm)", "RZ漂移(°)")
+    tree_frame = tk.Frame(root)
+    tree_frame.grid(row=5, column=0, columnspan=3, padx=10, sticky='nsew')
+    segment_tree = ttk.Treeview(tree_frame, columns=columns, show='headings', height=6, selectmode='browse')
+    for col, heading in zip(columns, headings):
+        segment_tree.heading(col, text=heading)
+        segment_tree.column(col, width=150 if col in ("start", "end") else 80, anchor='center')
+    tree_scroll = ttk.Scrollbar(tree_frame, orient=tk.VERTICAL, command=segment_tree.yview)
+    segment_tree.configure(yscrollcommand=tree_scroll.set)
+    segment_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+    tree_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+    segment_tree.bind("<<TreeviewSelect>>", on_segment_selected)
 
     # 结果显示区域 (加大了 width 和 height，并加上了 sticky='nsew' 允许拉伸)
-    tk.Label(root, text="分析结果:", font=("Arial", 10, "bold")).grid(row=4, column=0, sticky='w', padx=10)
-    result_text = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=100, height=30, font=("Consolas", 10))
-    result_text.grid(row=5, column=0, columnspan=2, padx=10, pady=(0, 10), sticky='nsew')
+    tk.Label(root, text="分析结果:", font=("Arial", 10, "bold")).grid(row=6, column=0, sticky='w', padx=10)
+    result_text = scrolledtext.ScrolledText(root, wrap=tk.WORD, width=100, height=20, font=("Consolas", 10))
+    result_text.grid(row=7, column=0, columnspan=3, padx=10, pady=(0, 10), sticky='nsew')
+
+    # 扫描报告单独放一个文本框：滑块初始化时触发的分析只会刷新上面的结果框，不会覆盖报告
+    tk.Label(root, text="扫描报告:", font=("Arial", 10, "bold")).grid(row=8, column=0, sticky='w', padx=10)
+    report_text = scrolledtext.ScrolledText(root, wrap=tk.NONE, width=100, height=6, font=("Consolas", 9))
+    report_text.grid(row=9, column=0, columnspan=3, padx=10, pady=(0, 10), sticky='nsew')
+    report_text.insert(tk.END, scan_report)
+    report_text.config(state=tk.DISABLED)
 
 # ==================== 启动程序 ====================
 if __name__ == "__main__":
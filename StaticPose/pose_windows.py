@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+# 按 type 分组的位姿列与窗口统计：StaticPose 与 LinearOscillation 共用这一份实现
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+PREFIX_KEYS = ('x', 'y', 'rz')
+
+# 滑动窗口方差分块计算，每块的窗口数 (控制 (块长, window) 临时数组的内存)
+SLIDING_CHUNK = 1 << 16
+
+
+def wrap_angle(a):
+    """把角度归一化到 (-π, π]"""
+    return np.pi - (np.pi - a) % (2 * np.pi)
+
+
+def build_prefix_sums(x, y, rz):
+    """
+    一个 type 的列与 x / y / rz 的前缀和 (长度 n+1、首项为 0)，任意窗口的均值 O(1) 得出。
+    RZ 先沿时间解缠绕 (unwrap)：朝向 ±π 时原始值在 +π / -π 之间来回跳，直接求均值 / 方差没有意义。
+    前缀和只用于均值；方差若用 E[x²] - E[x]² 相减，大坐标下会丢失毫米级精度，因此在切片上计算
+    """
+    rz = np.unwrap(rz)
+    origin = {'x': float(x.mean()), 'y': float(y.mean()), 'rz': float(rz.mean())}
+    columns = {'x': x, 'y': y, 'rz': rz}
+    prefix = {k: np.concatenate(([0.0], np.cumsum(columns[k] - origin[k]))) for k in PREFIX_KEYS}
+    return {'x': x, 'y': y, 'rz': rz, 'origin': origin, 'prefix': prefix}
+
+
+def window_means(data, lo, hi):
+    """[lo, hi) 窗口的 x / y / rz 均值：前缀和相减，与窗口长度无关 (rz 为解缠绕后的值)"""
+    n = hi - lo
+    prefix, origin = data['prefix'], data['origin']
+    return {k: origin[k] + (prefix[k][hi] - prefix[k][lo]) / n for k in PREFIX_KEYS}
+
+
+def window_stats(data, lo, hi):
+    """
+    [lo, hi) 窗口的均值、方差 (总体) 与 xy 协方差。均值来自前缀和；
+    方差 / 协方差在该 type 连续列的切片 (视图) 上按两遍法求得 (先减均值再平方)，O(hi - lo)
+    """
+    means = window_means(data, lo, hi)
+    cx = data['x'][lo:hi] - means['x']
+    cy = data['y'][lo:hi] - means['y']
+    crz = data['rz'][lo:hi] - means['rz']
+    return {
+        'n': hi - lo,
+        'mean_x': means['x'], 'mean_y': means['y'], 'mean_rz': means['rz'],
+        'var_x': float(np.mean(cx * cx)),
+        'var_y': float(np.mean(cy * cy)),
+        'var_rz': float(np.mean(crz * crz)),
+        'cov_xy': float(np.mean(cx * cy)),
+    }
+
+
+def sliding_variances(data, window):
+    """
+    每个长度为 window 的滑动窗口 [i, i + window) 的位置方差 (var_x + var_y) 与 RZ 方差 (总体)，
+    返回两个长度为 n - window + 1 的数组。窗口内按两遍法计算，分块处理，总体 O(n · window)
+    """
+    n_windows = len(data['x']) - window + 1
+    if n_windows <= 0:
+        return np.zeros(0), np.zeros(0)
+    var_pos = np.empty(n_windows)
+    var_rz = np.empty(n_windows)
+    for a in range(0, n_windows, SLIDING_CHUNK):
+        b = min(a + SLIDING_CHUNK, n_windows)
+        var = {k: sliding_window_view(data[k][a:b + window - 1], window).var(axis=1) for k in PREFIX_KEYS}
+        var_pos[a:b] = var['x'] + var['y']
+        var_rz[a:b] = var['rz']
+    return var_pos, var_rz
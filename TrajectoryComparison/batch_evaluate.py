@@ -0,0 +1,141 @@
+import os
+import sys
+import io
+import csv
+import glob
+import json
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from evaluator_data import (EvaluatorData, parse_log_file, ALIGN_MODES,
+                            ASSOC_MAX_DT, ASSOC_INTERPOLATION, ALIGN_SECONDS)
+
+# 强制设置标准输出为 UTF-8，解决中文乱码
+sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+REF_KEY = "__ref__"
+SUMMARY_COLUMNS = ['file', 'poses', 'matched', 'ape_rmse', 'ape_mean', 'ape_max', 'ape_std',
+                   'rpe_rmse', 'rpe_mean', 'rpe_max', 'rpe_rot_rmse_deg', 'elapsed_ms', 'error']
+
+_worker_data = None
+_worker_options = None
+
+
+def _init_worker(ref_data, options):
+    """每个子进程只接收一次已解析 (含时间排序索引) 的 Ref 轨迹"""
+    global _worker_data, _worker_options
+    _worker_data = EvaluatorData(log_dir=None, use_cache=False)
+    _worker_data.trajectories[REF_KEY] = ref_data
+    _worker_options = options
+
+
+def _evaluate_file(filepath):
+    """子进程：解析一个候选日志并与 Ref 对比，返回汇总行"""
+    t0 = time.perf_counter()
+    fname = os.path.basename(filepath)
+    row = {'file': fname, 'poses': 0, 'matched': 0, 'error': ''}
+    try:
+        est_data = parse_log_file(filepath)
+        if est_data is None:
+            row['error'] = "no valid coordinate data"
+            return row
+        _worker_data.trajectories[fname] = est_data
+        result = _worker_data.evaluate(REF_KEY, fname, **_worker_options)
+
+        row['poses'] = result.get('n_est', 0)
+        row['matched'] = result.get('matched', 0)
+        if result['error']:
+            row['error'] = result['error']
+            return row
+        for key in ('rmse', 'mean', 'max', 'std'):
+            row[f'ape_{key}'] = result['ape'][key]
+        for key in ('rmse', 'mean', 'max'):
+            row[f'rpe_{key}'] = result['rpe'][key]
+        row['rpe_rot_rmse_deg'] = float(np.degrees(result['rpe_rot']['rmse']))
+        row['rpe_deltas'] = result['rpe_deltas']
+    except Exception as e:
+        row['error'] = str(e)
+    finally:
+        _worker_data.trajectories.pop(fname, None)
+        row['elapsed_ms'] = (time.perf_counter() - t0) * 1000
+    return row
+
+
+def find_candidates(paths, ref_path):
+    """候选可以是文件或文件夹 (取其中 .txt / .log)，自动排除 Ref 本身"""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.txt")) + glob.glob(os.path.join(path, "*.log")))
+        else:
+            files += sorted(glob.glob(path))
+    ref_abs = os.path.abspath(ref_path)
+    return [f for f in dict.fromkeys(files) if os.path.abspath(f) != ref_abs]
+
+
+def batch_evaluate(ref_path, candidates, out_path, workers=None, **options):
+    """一对多批量评估：Ref 只解析一次，候选日志在进程池中并行评估，结果写出 CSV 或 JSON"""
+    ref_data = parse_log_file(ref_path)
+    if ref_data is None:
+        raise ValueError(f"Ref 日志中没有有效坐标: {ref_path}")
+    if not candidates:
+        raise ValueError("没有找到候选日志")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(candidates)))
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(ref_data, options)) as pool:
+        rows = list(pool.map(_evaluate_file, candidates, chunksize=max(1, len(candidates) // (workers * 4))))
+    elapsed = time.perf_counter() - t0
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_path)), exist_ok=True)
+    if out_path.lower().endswith('.json'):
+        summary = {'reference': os.path.basename(ref_path), 'reference_poses': len(ref_data['x']),
+                   'options': options, 'workers': workers, 'elapsed_s': elapsed, 'results': rows}
+        with open(out_path, 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+    else:
+        with open(out_path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=SUMMARY_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+            for row in rows:
+                writer.writerow({k: (f"{v:.6f}" if isinstance(v, float) else v) for k, v in row.items()})
+
+    cpu_ms = sum(r.get('elapsed_ms', 0.0) for r in rows)
+    print(f"Ref: {os.path.basename(ref_path)} ({len(ref_data['x'])} poses)")
+    print(f"已评估 {len(rows)} 个候选 ({elapsed:.2f}s, {workers} 进程, 单任务累计 {cpu_ms / 1000:.2f}s) -> {out_path}")
+    ranked = sorted((r for r in rows if not r['error']), key=lambda r: r['ape_rmse'], reverse=True)
+    print("APE RMSE 最大的候选:")
+    for row in ranked[:10]:
+        print(f"  {row['file']:<40} APE {row['ape_rmse']:.4f} m | RPE {row['rpe_rmse']:.4f} m "
+              f"| matched {row['matched']}/{row['poses']}")
+    failed = [r for r in rows if r['error']]
+    if failed:
+        print(f"无法评估 {len(failed)} 个:")
+        for row in failed[:10]:
+            print(f"  {row['file']}: {row['error']}")
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="一对多批量轨迹评估 (APE / RPE)")
+    parser.add_argument("--ref", required=True, help="基准 (真值) 日志文件")
+    parser.add_argument("candidates", nargs='+', help="候选日志文件 / 文件夹 / 通配符")
+    parser.add_argument("--out", default="./out/batch_summary.csv", help="汇总表输出路径 (.csv 或 .json)")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    parser.add_argument("--max-dt", type=float, default=ASSOC_MAX_DT, help="时间戳关联允许的最大时间差 (秒)")
+    parser.add_argument("--interp", choices=['none', 'linear', 'se2'], default=ASSOC_INTERPOLATION or 'none',
+                        help="Ref 插值方式")
+    parser.add_argument("--align", choices=list(ALIGN_MODES.keys()), default='None', help="APE 前的对齐方式")
+    parser.add_argument("--align-seconds", type=float, default=ALIGN_SECONDS, help="只用前 N 秒的配对求对齐变换")
+    args = parser.parse_args()
+
+    options = dict(max_dt=args.max_dt, interpolation=None if args.interp == 'none' else args.interp,
+                   align=ALIGN_MODES[args.align], align_seconds=args.align_seconds)
+    try:
+        batch_evaluate(args.ref, find_candidates(args.candidates, args.ref), args.out, workers=args.workers, **options)
+    except Exception as e:
+        print(f"评估失败: {e}")
+        sys.exit(1)
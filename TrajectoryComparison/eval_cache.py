@@ -0,0 +1,98 @@
+import os
+import pickle
+import hashlib
+from collections import OrderedDict
+
+import numpy as np
+
+EVAL_CACHE_DIRNAME = ".eval_cache"
+EVAL_CACHE_VERSION = 2  # 评估算法或结果格式变化时加 1，旧缓存自动失效
+
+
+def hash_arrays(*arrays):
+    """对若干 numpy 数组的内容求 SHA1 (按 dtype/shape/字节)，用作轨迹的内容指纹"""
+    h = hashlib.sha1()
+    for arr in arrays:
+        arr = np.ascontiguousarray(arr)
+        h.update(f"{arr.dtype.str}{arr.shape}".encode())
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+class EvalCache:
+    """
+    评估结果缓存：内存中是有上限的 LRU，同时落盘到 cache_dir 下 (每个键一个 pickle 文件)。
+    键由两条轨迹的内容指纹与评估参数组成，日志内容或参数一变就自然失效，重启后命中的结果直接从磁盘取回。
+    """
+
+    def __init__(self, cache_dir, max_entries=32, max_disk_entries=500):
+        self.cache_dir = cache_dir
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._memory = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha1(repr((EVAL_CACHE_VERSION,) + parts).encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pkl")
+
+    def get(self, key):
+        """先查内存，再查磁盘；未命中返回 None"""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key]
+
+        path = self._path(key)
+        if os.path.exists(path):
+            try:
+                with open(path, 'rb') as f:
+                    value = pickle.load(f)
+                self._remember(key, value)
+                self.hits += 1
+                return value
+            except Exception as e:
+                print(f"评估缓存损坏，重新计算: {e}")
+        self.misses += 1
+        return None
+
+    def put(self, key, value):
+        self._remember(key, value)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            tmp_path = self._path(key) + ".tmp"
+            with open(tmp_path, 'wb') as f:
+                pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+            self._prune_disk()
+        except OSError as e:
+            print(f"评估缓存写入失败: {e}")
+
+    def get_or_compute(self, key, compute):
+        value = self.get(key)
+        if value is None:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def _remember(self, key, value):
+        self._memory[key] = value
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _prune_disk(self):
+        """磁盘上只保留最近写入的 max_disk_entries 个结果"""
+        files = [os.path.join(self.cache_dir, f) for f in os.listdir(self.cache_dir) if f.endswith(".pkl")]
+        if len(files) <= self.max_disk_entries:
+            return
+        files.sort(key=os.path.getmtime)
+        for path in files[:len(files) - self.max_disk_entries]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -1,7 +1,60 @@
+import time
+from collections import deque
+
 import pyqtgraph as pg
 from PyQt5.QtCore import Qt, pyqtSignal
 import numpy as np
 
+FRAME_BUDGET_MS = 1000.0 / 60  # 逐帧步进的耗时预算 (60 Hz)
+ERROR_COLORMAP = 'viridis'
+ERROR_COLOR_BINS = 16           # 误差着色的颜色档数：每档一条 connect='pairs' 折线
+MAX_COLORED_POINTS = 20000      # 当前视野内最多绘制的点数 (超过则按块抽稀，保留每块误差最大的点)
+
+
+def decimate_keep_peaks(errors, max_points):
+    """按连续块抽稀，每块保留误差最大的点，避免把尖峰抽掉；返回保留点的下标"""
+    n = len(errors)
+    if n <= max_points:
+        return np.arange(n)
+    block = int(np.ceil(n / max_points))
+    n_full = n // block
+    head = errors[:n_full * block].reshape(n_full, block)
+    keep = np.arange(n_full) * block + head.argmax(axis=1)
+    if n_full * block < n:
+        keep = np.append(keep, n_full * block + errors[n_full * block:].argmax())
+    return keep
+
+
+def prepare_error_coloring(x, y, errors):
+    """
+    误差着色的绘制缓冲区：把误差按 [0, p99] 整列映射到颜色档 (0 ~ ERROR_COLOR_BINS-1)，保留全部点，
+    抽稀在绘制时按当前视野进行。返回 (x, y, 颜色档, vmax)，没有误差时返回 None；结果只含 numpy 数组，可直接缓存
+    """
+    if len(errors) == 0:
+        return None
+    vmax = float(np.percentile(errors, 99)) or float(errors.max()) or 1.0
+    color_bin = np.clip((errors / vmax * ERROR_COLOR_BINS).astype(np.int64), 0, ERROR_COLOR_BINS - 1)
+    return x, y, color_bin.astype(np.int8), vmax
+
+
+def visible_segments(x, y, color_bin, x_range, y_range, max_points=MAX_COLORED_POINTS):
+    """
+    视野相关的细节层次：只取落在视野内的点 (各向外多带一个邻点，让穿出边界的线段也能画出)，
+    超过 max_points 时按颜色档做保留尖峰的抽稀。返回 (起点下标, 终点下标, 线段颜色档)，
+    相邻保留点之间跨越视野外的部分不连线
+    """
+    inside = (x >= x_range[0]) & (x <= x_range[1]) & (y >= y_range[0]) & (y <= y_range[1])
+    inside[1:] |= inside[:-1].copy()
+    inside[:-1] |= inside[1:].copy()
+    idx = np.flatnonzero(inside)
+    if len(idx) < 2:
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int8)
+    run = np.concatenate(([0], np.cumsum(np.diff(idx) > 1)))
+    keep = decimate_keep_peaks(color_bin[idx], max_points)
+    connected = run[keep[1:]] == run[keep[:-1]]
+    start, end = idx[keep[:-1]][connected], idx[keep[1:]][connected]
+    return start, end, np.maximum(color_bin[start], color_bin[end])
+
 class EvaluatorCanvas(pg.PlotWidget):
     canvas_clicked_pos = pyqtSignal(float, float)
 
@@ -12,10 +65,25 @@ class EvaluatorCanvas(pg.PlotWidget):
         self.addLegend()
         
         self.curve_items = {}
-        self.point_items = {}
-        self.error_lines = []
+        self.point_item = None     # 所有轨迹的当前点共用一个散点图元
+        self.point_brushes = []
+        self.error_line = None     # 所有 Est 的误差牵引线共用一个 connect='pairs' 图元
+        self.step_latency = deque(maxlen=200)  # 最近若干次 update_step 的耗时 (ms)
+
+        # 误差着色：每个颜色档一支画笔 (取档中心的颜色)，色条常驻在绘图区右侧
+        self.error_cmap = pg.colormap.get(ERROR_COLORMAP)
+        lut = self.error_cmap.map((np.arange(ERROR_COLOR_BINS) + 0.5) / ERROR_COLOR_BINS, mode='byte')
+        self.error_pens = [pg.mkPen(color=tuple(int(v) for v in c[:3]), width=3) for c in lut]
+        self.error_items = []       # 每个颜色档一条 connect='pairs' 折线
+        self.error_buffers = None   # 当前着色的完整缓冲区，视野变化时据此重新抽稀
+        self.color_bar = pg.ColorBarItem(values=(0.0, 1.0), colorMap=self.error_cmap, interactive=False, width=15)
+        self.plotItem.layout.addItem(self.color_bar, 2, 5)
+        self.color_bar.setVisible(False)
         
         self.scene().sigMouseClicked.connect(self._on_scene_clicked)
+        # 缩放 / 平移时按新视野重新抽稀着色轨迹 (限频，拖动过程中不会每个事件都重算)
+        self.range_proxy = pg.SignalProxy(self.plotItem.vb.sigRangeChanged, rateLimit=30,
+                                          slot=self._refresh_error_segments)
 
     def _on_scene_clicked(self, event):
         if event.button() == Qt.LeftButton:
@@ -27,8 +95,10 @@ class EvaluatorCanvas(pg.PlotWidget):
     def setup_trajectories(self, file_names, trajectories):
         self.clear() 
         self.curve_items.clear()
-        self.point_items.clear()
-        self.error_lines.clear()
+        self.point_brushes = []
+        self.error_items = []
+        self.error_buffers = None
+        self.color_bar.setVisible(False)
 
         # 强制颜色：Ref 用白色虚线，Est 用绿色实线
         colors = [(255, 255, 255), (50, 255, 50)]
@@ -49,39 +119,126 @@ class EvaluatorCanvas(pg.PlotWidget):
 
             curve = self.plot(x_list, y_list, pen=pen, name=name_label)
             self.curve_items[fname] = curve
-            
-            pt = pg.ScatterPlotItem(size=12, brush=pg.mkBrush(color), pen='w')
-            self.addItem(pt)
-            self.point_items[fname] = pt
+            self.point_brushes.append(pg.mkBrush(color))
 
-    def update_step(self, file_names, trajectories, current_idx):
-        if len(file_names) < 2: return []
+        # 持久图元：步进时只更新数据，不再反复创建/删除
+        self.error_line = pg.PlotCurveItem(pen=pg.mkPen('r', width=1, style=Qt.DotLine), connect='pairs')
+        self.addItem(self.error_line)
+        self.point_item = pg.ScatterPlotItem(size=12, pen='w')
+        self.addItem(self.point_item)
 
-        for line in self.error_lines:
-            self.removeItem(line)
-        self.error_lines.clear()
+    def set_error_coloring(self, x, y, errors, label="APE (m)"):
+        """把 Est 轨迹按逐点误差着色 (prepare_error_coloring + show_error_coloring)"""
+        self.show_error_coloring(prepare_error_coloring(x, y, errors), label)
 
-        ref_x, ref_y = None, None
-        err_texts = []
+    def show_error_coloring(self, buffers, label="APE (m)"):
+        """
+        用预先准备好的 (x, y, 颜色档, 色条上限) 绘制误差着色轨迹：每个颜色档一条折线，
+        只绘制当前视野内 (抽稀后) 的线段，缩放 / 平移时由 _refresh_error_segments 重新计算
+        """
+        for item in self.error_items:
+            self.removeItem(item)
+        self.error_items = []
+        self.error_buffers = buffers
+        if buffers is None:
+            self.color_bar.setVisible(False)
+            return
 
-        for i, fname in enumerate(file_names):
-            if fname not in trajectories: continue
+        for pen in self.error_pens:
+            item = pg.PlotCurveItem(pen=pen, connect='pairs')
+            item.setZValue(5)  # 在轨迹线之上、当前点之下
+            self.addItem(item)
+            self.error_items.append(item)
+        if self.point_item is not None:
+            self.point_item.setZValue(10)
+        self._refresh_error_segments()
+
+        self.color_bar.setLevels((0.0, buffers[3]))
+        self.color_bar.axis.setLabel(label)
+        self.color_bar.setVisible(True)
+
+    def _refresh_error_segments(self, *_):
+        """按当前视野重新抽稀，并把线段按颜色档分给各条折线"""
+        if self.error_buffers is None or not self.error_items:
+            return
+        x, y, color_bin, _ = self.error_buffers
+        x_range, y_range = self.plotItem.vb.viewRange()
+        start, end, seg_bin = visible_segments(x, y, color_bin, x_range, y_range)
+        order = np.argsort(seg_bin, kind='stable')
+        start, end = start[order], end[order]
+        bounds = np.concatenate(([0], np.cumsum(np.bincount(seg_bin, minlength=ERROR_COLOR_BINS))))
+        for b, item in enumerate(self.error_items):
+            lo, hi = bounds[b], bounds[b + 1]
+            seg_x = np.empty(2 * (hi - lo))
+            seg_y = np.empty(2 * (hi - lo))
+            seg_x[0::2], seg_x[1::2] = x[start[lo:hi]], x[end[lo:hi]]
+            seg_y[0::2], seg_y[1::2] = y[start[lo:hi]], y[end[lo:hi]]
+            item.setData(seg_x, seg_y, connect='pairs')
+
+    def update_step(self, file_names, trajectories, current_idx):
+        if self.point_item is None: return []
+        t0 = time.perf_counter()
+
+        # 只用已加载的轨迹；Ref (file_names[0]) 不在时没有比较基准，清空当前点与牵引线
+        names = [f for f in file_names if f in trajectories]
+        if len(names) < 2 or names[0] != file_names[0]:
+            self.point_item.setData([], [])
+            self.error_line.setData([], [])
+            return []
+        px = np.empty(len(names))
+        py = np.empty(len(names))
+        for i, fname in enumerate(names):
             data = trajectories[fname]
             idx = min(current_idx, len(data['x']) - 1)
-            px, py = data['x'][idx], data['y'][idx]
-            
-            self.point_items[fname].setData([px], [py])
+            px[i], py[i] = data['x'][idx], data['y'][idx]
 
-            if i == 0:
-                ref_x, ref_y = px, py
-            elif ref_x is not None:
-                # 画误差牵引线
-                line = pg.PlotCurveItem([ref_x, px], [ref_y, py], 
-                                        pen=pg.mkPen('r', width=1, style=Qt.DotLine))
-                self.addItem(line)
-                self.error_lines.append(line)
-
-                dist = np.hypot(ref_x - px, ref_y - py)
-                err_texts.append(f"<b>APE Offset:</b> {dist:.4f} m")
-
-        return err_texts
\ No newline at end of file
+        self.point_item.setData(px, py, brush=self.point_brushes[:len(names)])
+
+        # 误差牵引线：Ref-Est1, Ref-Est2 ... 成对连接
+        n_est = len(names) - 1
+        line_x = np.empty(2 * n_est)
+        line_y = np.empty(2 * n_est)
+        line_x[0::2], line_y[0::2] = px[0], py[0]
+        line_x[1::2], line_y[1::2] = px[1:], py[1:]
+        self.error_line.setData(line_x, line_y, connect='pairs')
+
+        dists = np.hypot(px[1:] - px[0], py[1:] - py[0])
+        err_texts = [f"<b>APE Offset:</b> {dist:.4f} m" for dist in dists]
+
+        self.step_latency.append((time.perf_counter() - t0) * 1000)
+        return err_texts
+
+    def latency_text(self):
+        """最近一次 / 平均 / 最大步进耗时，与帧预算对比"""
+        if not self.step_latency:
+            return ""
+        samples = np.fromiter(self.step_latency, dtype=np.float64)
+        status = "OK" if samples.max() <= FRAME_BUDGET_MS else "OVER"
+        return (f"Step latency: {samples[-1]:.2f} ms (avg {samples.mean():.2f}, max {samples.max():.2f}, "
+                f"budget {FRAME_BUDGET_MS:.1f} ms {status})")
+
+
+class DriftCanvas(pg.PlotWidget):
+    """漂移曲线面板：APE 随 Ref 累计路程的分箱统计 (均值 / P50 / P95 / 最大值)"""
+
+    def __init__(self):
+        super().__init__(title="APE vs Traveled Distance")
+        self.showGrid(x=True, y=True)
+        self.setLabel('bottom', "Distance", units='m')
+        self.setLabel('left', "APE", units='m')
+        self.addLegend()
+
+        self.curves = {
+            'mean': self.plot(pen=pg.mkPen((80, 160, 255), width=2), name="Mean"),
+            'p50': self.plot(pen=pg.mkPen((50, 255, 50), width=2), name="P50"),
+            'p95': self.plot(pen=pg.mkPen((255, 170, 0), width=2), name="P95"),
+            'max': self.plot(pen=pg.mkPen('r', width=1, style=Qt.DotLine), name="Max"),
+        }
+
+    def set_drift(self, drift):
+        """drift 为 evaluate 结果中的 'drift'；None 时清空。空箱 (NaN) 直接断开，不连线"""
+        for key, curve in self.curves.items():
+            if drift is None:
+                curve.setData([], [])
+            else:
+                curve.setData(drift['distance'], drift[key], connect='finite')
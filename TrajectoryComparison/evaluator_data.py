@@ -1,18 +1,332 @@
 import os
 import glob
 import re
+import time
+from collections import OrderedDict
 import numpy as np
 
+from eval_cache import EVAL_CACHE_DIRNAME, EvalCache, hash_arrays
+from jump_events import parse_log_times, wrap_angle
+
+# 默认的 RPE 间隔：按帧数 (步长) 与按路程 (米)
+RPE_FRAME_DELTAS = (1, 10, 100)
+RPE_DISTANCE_DELTAS = (1.0, 5.0, 10.0)
+
+# 漂移曲线：按 Ref 累计路程分箱的边长 (米)，以及报告中最多列出的箱数
+DRIFT_BIN_SIZE = 10.0
+DRIFT_REPORT_ROWS = 12
+
+# 时间戳关联：允许的最大时间差 (秒)，以及 Ref 插值方式 (None / 'linear' / 'se2')
+ASSOC_MAX_DT = 0.1
+ASSOC_INTERPOLATION = 'se2'
+
+# APE 前的对齐方式：None / 'se2' / 'sim2'；ALIGN_SECONDS 不为 None 时只用前 N 秒的配对求变换
+ALIGN_MODES = {'None': None, 'SE(2)': 'se2', 'Sim(2)': 'sim2'}
+ALIGN_SECONDS = None
+
+# 懒加载：启动时只预扫描文件头尾，完整解析的轨迹最多常驻内存的条数
+PRESCAN_BYTES = 64 * 1024
+MAX_LOADED_TRAJECTORIES = 6
+
+
+TIME_PATTERN = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})")
+STATE_PATTERN = re.compile(r"Location_state\s*=\s*(?P<state>[\w:]+).*?type\s*=\s*(?P<type>\d+)")
+COORD_PATTERN = re.compile(r"\(([-+\d\s.,]+)\)")
+
+
+def parse_log_file(filepath):
+    """解析单个日志文件，返回轨迹字典；没有有效坐标时返回 None"""
+    x_list, y_list, t_list = [], [], []
+    ts_list, state_list, type_list = [], [], []
+
+    with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if not line: continue
+            if "Location_state" not in line:
+                continue
+
+            coord_match = COORD_PATTERN.search(line)
+            if coord_match:
+                nums_str = coord_match.group(1).replace(',', ' ')
+                parts = [float(p) for p in nums_str.split() if p.strip()]
+
+                if len(parts) >= 3:
+                    x_list.append(parts[0])
+                    y_list.append(parts[1])
+                    t_list.append(parts[-1])
+
+                    time_match = TIME_PATTERN.search(line)
+                    ts_list.append(time_match.group(1) if time_match else "--")
+
+                    state_match = STATE_PATTERN.search(line)
+                    state_list.append(state_match.group('state') if state_match else "--")
+                    type_list.append(state_match.group('type') if state_match else "--")
+
+    if not x_list:
+        return None
+    times = parse_log_times(ts_list)
+    valid = np.flatnonzero(np.isfinite(times))
+    return {
+        'x': np.array(x_list), 'y': np.array(y_list), 't': np.array(t_list),
+        'time': times, 'time_order': valid[np.argsort(times[valid], kind='stable')],
+        'timestamps': ts_list, 'states': state_list, 'types': type_list
+    }
+
+
+def prescan_log_file(filepath):
+    """
+    快速预扫描：只读文件开头与结尾各 PRESCAN_BYTES 字节，取第一条与最后一条定位日志的时间戳。
+    返回 {'path', 'size', 'start', 'end'}，找不到时间戳时为 "--"
+    """
+    size = os.path.getsize(filepath)
+    with open(filepath, 'rb') as f:
+        head = f.read(PRESCAN_BYTES).decode('utf-8', errors='ignore')
+        if size > PRESCAN_BYTES:
+            f.seek(max(size - PRESCAN_BYTES, PRESCAN_BYTES))
+            tail = f.read().decode('utf-8', errors='ignore')
+        else:
+            tail = head
+
+    def first_time(lines):
+        for line in lines:
+            if "Location_state" in line:
+                match = TIME_PATTERN.search(line)
+                if match:
+                    return match.group(1)
+        return None
+
+    start = first_time(head.splitlines())
+    end = first_time(reversed(tail.splitlines())) or first_time(reversed(head.splitlines()))
+    return {'path': filepath, 'size': size, 'start': start or "--", 'end': end or "--"}
+
+
+def format_epoch(sec):
+    """秒 (parse_log_times 的结果) -> 日志格式的时间戳字符串 2024-01-15 10:30:45,123"""
+    return str(np.datetime64(int(round(sec * 1000)), 'ms')).replace('T', ' ').replace('.', ',')
+
+
+def path_length(x, y):
+    """累计路程 (米)，第 0 个点为 0"""
+    cum = np.zeros(len(x))
+    np.cumsum(np.hypot(np.diff(x), np.diff(y)), out=cum[1:])
+    return cum
+
+
+def delta_pairs(n, delta, cum_dist=None):
+    """
+    RPE 的 (i, j) 索引对。cum_dist 为 None 时 delta 为帧数，j = i + delta；
+    否则 delta 为路程 (米)，j 为累计路程首次达到 cum_dist[i] + delta 的点 (searchsorted 一次求出全部)
+    """
+    if cum_dist is None:
+        i = np.arange(max(n - int(delta), 0))
+        return i, i + int(delta)
+    j = np.searchsorted(cum_dist, cum_dist + delta, side='left')
+    i = np.flatnonzero(j < n)
+    return i, j[i]
+
+
+def pose_arrays(x, y, t):
+    """预先算好每个位姿的 cos/sin，多个 RPE 间隔共用"""
+    return x, y, t, np.cos(t), np.sin(t)
+
+
+def compute_rpe(ref, est, i, j):
+    """
+    整数组计算 RPE：把 i -> j 的世界坐标位移转到第 i 帧的局部坐标系下，比较 Ref 与 Est 的相对位移。
+    ref/est 为 pose_arrays 的返回值；返回 (平移误差 m, 旋转误差 rad)
+    """
+    ref_x, ref_y, ref_t, ref_c, ref_s = ref
+    est_x, est_y, est_t, est_c, est_s = est
+
+    c, s = ref_c[i], ref_s[i]
+    dx, dy = ref_x[j] - ref_x[i], ref_y[j] - ref_y[i]
+    rel_x_ref, rel_y_ref = c * dx + s * dy, -s * dx + c * dy
+
+    c, s = est_c[i], est_s[i]
+    dx, dy = est_x[j] - est_x[i], est_y[j] - est_y[i]
+    rel_x_est, rel_y_est = c * dx + s * dy, -s * dx + c * dy
+
+    trans_err = np.hypot(rel_x_ref - rel_x_est, rel_y_ref - rel_y_est)
+    rot_err = np.abs(wrap_angle((ref_t[j] - ref_t[i]) - (est_t[j] - est_t[i])))
+    return trans_err, rot_err
+
+
+def interpolate_se2(x0, y0, t0, x1, y1, t1, alpha):
+    """
+    SE(2) 测地线插值：在 T0 的局部坐标系下取 log(T0^-1 T1)，按 alpha 缩放后 exp 回来。
+    旋转与平移耦合插值，转弯处比分别线性插值更贴近真实运动
+    """
+    c0, s0 = np.cos(t0), np.sin(t0)
+    dx, dy = x1 - x0, y1 - y0
+    lx, ly = c0 * dx + s0 * dy, -s0 * dx + c0 * dy
+    w = wrap_angle(t1 - t0)
+
+    def left_jacobian(theta):
+        small = np.abs(theta) < 1e-9
+        safe = np.where(small, 1.0, theta)
+        a = np.where(small, 1.0, np.sin(safe) / safe)
+        b = np.where(small, 0.0, (1.0 - np.cos(safe)) / safe)
+        return a, b
+
+    # log: v = V(w)^-1 * l
+    a, b = left_jacobian(w)
+    det = a * a + b * b
+    vx, vy = (a * lx + b * ly) / det, (-b * lx + a * ly) / det
+    # exp(alpha * (v, w))
+    a, b = left_jacobian(alpha * w)
+    px, py = alpha * (a * vx - b * vy), alpha * (b * vx + a * vy)
+    return x0 + c0 * px - s0 * py, y0 + s0 * px + c0 * py, t0 + alpha * w
+
+
+def associate_by_time(ref_time, est_time, max_dt=ASSOC_MAX_DT, ref_order=None):
+    """
+    按时间戳为每个 Est 位姿找 Ref 位姿：对排序后的 Ref 时间 searchsorted 一次，O(n log n)。
+    返回 (est_idx, ref_k0, ref_k1, alpha)：Est 第 est_idx 个位姿对应 Ref 第 k0 与 k1 个位姿之间 alpha 处
+    (k0 == k1 时 alpha 为 0，即最近邻)。超出 max_dt 或缺少时间戳的位姿被丢弃。
+    ref_order 为预先排好的 Ref 时间顺序 (解析时已算好)，可省去每次排序
+    """
+    if ref_order is None:
+        ref_valid = np.flatnonzero(np.isfinite(ref_time))
+        ref_order = ref_valid[np.argsort(ref_time[ref_valid], kind='stable')]
+    order = ref_order
+    times = ref_time[order]
+    est_idx = np.flatnonzero(np.isfinite(est_time))
+    if len(times) == 0 or len(est_idx) == 0:
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, empty, np.zeros(0)
+    query = est_time[est_idx]
+
+    k1 = np.clip(np.searchsorted(times, query, side='left'), 0, len(times) - 1)
+    k0 = np.clip(k1 - 1, 0, len(times) - 1)
+    span = times[k1] - times[k0]
+    alpha = np.divide(query - times[k0], span, out=np.zeros_like(query), where=span > 0)
+    bracketed = (span > 0) & (alpha >= 0) & (alpha <= 1) \
+        & (query - times[k0] <= max_dt) & (times[k1] - query <= max_dt)
+
+    # 不能插值的位姿 (两端或 Ref 间隔过大) 退化为最近邻
+    nearest = np.where(np.abs(query - times[k0]) <= np.abs(times[k1] - query), k0, k1)
+    near_ok = np.abs(query - times[nearest]) <= max_dt
+    k0 = np.where(bracketed, k0, nearest)
+    k1 = np.where(bracketed, k1, nearest)
+    alpha = np.where(bracketed, alpha, 0.0)
+    keep = bracketed | near_ok
+    return est_idx[keep], order[k0[keep]], order[k1[keep]], alpha[keep]
+
+
+def umeyama_alignment_2d(src_xy, dst_xy, with_scale=False):
+    """
+    Umeyama 闭式解：求 dst ≈ s * R @ src + t (最小二乘)，只需一次 2x2 SVD。
+    src_xy/dst_xy 为 (N,2)；返回 (R 2x2, t (2,), s)
+    """
+    mu_src, mu_dst = src_xy.mean(axis=0), dst_xy.mean(axis=0)
+    src_c, dst_c = src_xy - mu_src, dst_xy - mu_dst
+    cov = dst_c.T @ src_c / len(src_xy)
+    U, D, Vt = np.linalg.svd(cov)
+    S = np.diag([1.0, np.sign(np.linalg.det(U) * np.linalg.det(Vt)) or 1.0])
+    R = U @ S @ Vt
+    var_src = np.mean(np.sum(src_c**2, axis=1))
+    s = float(np.trace(np.diag(D) @ S) / var_src) if with_scale and var_src > 0 else 1.0
+    t = mu_dst - s * R @ mu_src
+    return R, t, s
+
+
+def apply_alignment_2d(x, y, t, R, trans, s):
+    """把 SE(2)/Sim(2) 变换作用到整条轨迹 (位置与航向)"""
+    ax = s * (R[0, 0] * x + R[0, 1] * y) + trans[0]
+    ay = s * (R[1, 0] * x + R[1, 1] * y) + trans[1]
+    return ax, ay, wrap_angle(t + np.arctan2(R[1, 0], R[0, 0]))
+
+
+def binned_stats(values, bins, n_bins, percentiles=(50, 95)):
+    """
+    按非负整数分箱 bins 对 values 做分组统计 (计数 / 均值 / 分位数 / 最大值)。
+    把 "箱号 + 归一化到 [0,1) 的值" 作为一个浮点键只排序一次 (比双键 lexsort 快一个数量级)，同箱的值即按大小相邻，
+    再用每箱起始偏移直接取分位位置 (线性插值)，没有逐箱的 Python 循环
+    """
+    counts = np.bincount(bins, minlength=n_bins)
+    nonempty = counts > 0
+    span = np.ptp(values)
+    key = bins + (values - values.min()) / (span * (1 + 1e-9)) if span > 0 else bins.astype(np.float64)
+    sorted_vals = values[np.argsort(key)]
+    starts = np.zeros(n_bins, dtype=np.int64)
+    np.cumsum(counts[:-1], out=starts[1:])
+    last = np.maximum(starts + counts - 1, 0)
+
+    stats = {'count': counts}
+    with np.errstate(invalid='ignore', divide='ignore'):
+        stats['mean'] = np.bincount(bins, weights=values, minlength=n_bins) / counts
+    for q in percentiles:
+        pos = starts + q / 100.0 * np.maximum(counts - 1, 0)
+        lo = np.floor(pos).astype(np.int64)
+        hi = np.minimum(lo + 1, last)
+        frac = pos - lo
+        val = sorted_vals[np.minimum(lo, len(sorted_vals) - 1)] * (1 - frac) + \
+            sorted_vals[np.minimum(hi, len(sorted_vals) - 1)] * frac
+        stats[f'p{q}'] = np.where(nonempty, val, np.nan)
+    stats['max'] = np.where(nonempty, sorted_vals[np.minimum(last, len(sorted_vals) - 1)], np.nan)
+    return stats
+
+
+def drift_curve(cum_dist, errors, bin_size=DRIFT_BIN_SIZE):
+    """误差随累计路程的变化：按 bin_size 米分箱，返回每箱的中心路程与统计量"""
+    bins = (cum_dist // bin_size).astype(np.int64)
+    n_bins = int(bins[-1]) + 1
+    curve = binned_stats(errors, bins, n_bins)
+    curve['distance'] = (np.arange(n_bins) + 0.5) * bin_size
+    curve['bin_size'] = bin_size
+    return curve
+
+
+def grouped_error_stats(labels, errors):
+    """
+    按类别标签分组的误差统计 (计数 / RMSE / P95 / 最大值)：先 np.unique 做字典编码，
+    再对整数编码一次性 bincount + 分箱排序，不按组循环计算
+    """
+    names, codes = np.unique(np.asarray(labels), return_inverse=True)
+    codes = codes.ravel()
+    stats = binned_stats(errors, codes, len(names), percentiles=(95,))
+    rmse = np.sqrt(np.bincount(codes, weights=errors**2, minlength=len(names)) / stats['count'])
+    return [{'group': str(name), 'count': int(stats['count'][k]), 'rmse': float(rmse[k]),
+             'p95': float(stats['p95'][k]), 'max': float(stats['max'][k])} for k, name in enumerate(names)]
+
+
+def error_stats(errors):
+    """误差统计：RMSE / Mean / Max / Min / Std"""
+    return {
+        'rmse': float(np.sqrt(np.mean(errors**2))),
+        'mean': float(np.mean(errors)),
+        'max': float(np.max(errors)),
+        'min': float(np.min(errors)),
+        'std': float(np.std(errors)),
+    }
+
+
+def format_stats(stats, unit):
+    text = f"  RMSE : {stats['rmse']:.6f} {unit}\n"
+    text += f"  Mean : {stats['mean']:.6f} {unit}\n"
+    text += f"  Max  : {stats['max']:.6f} {unit}\n"
+    text += f"  Min  : {stats['min']:.6f} {unit}\n"
+    text += f"  Std  : {stats['std']:.6f} {unit}\n"
+    return text
+
+
 class EvaluatorData:
-    def __init__(self, log_dir):
+    def __init__(self, log_dir, use_cache=True):
         self.log_dir = log_dir
-        self.trajectories = {}  
+        self.trajectories = OrderedDict()  # 已完整解析的轨迹 (LRU，最多 MAX_LOADED_TRAJECTORIES 条)
         self.file_names = []    
+        self.file_info = {}     # 预扫描结果：文件名 -> 路径 / 大小 / 首尾时间
         self.max_len = 0        
+        # 评估结果缓存 (内存 LRU + 日志目录下的 .eval_cache/)
+        self.cache = EvalCache(os.path.join(log_dir, EVAL_CACHE_DIRNAME)) if use_cache and log_dir else None
 
     def load_data(self):
+        """只预扫描目录 (文件列表、大小、首尾时间)，轨迹在被选中时才由 ensure_loaded 完整解析"""
+        t0 = time.perf_counter()
         self.trajectories.clear()
         self.file_names.clear()
+        self.file_info.clear()
         self.max_len = 0
 
         if not os.path.exists(self.log_dir):
@@ -25,111 +339,334 @@ class EvaluatorData:
         if not files:
             return False, "No log files found in the directory."
 
-        time_pattern = re.compile(r"(\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2},\d{3})")
-        state_pattern = re.compile(r"Location_state\s*=\s*(?P<state>[\w:]+).*?type\s*=\s*(?P<type>\d+)")
-        coord_pattern = re.compile(r"\(([-+\d\s.,]+)\)")
-
         for filepath in files:
             fname = os.path.basename(filepath)
-            
-            x_list, y_list, t_list = [], [], []
-            ts_list, state_list, type_list = [], [], []
-            
-            with open(filepath, 'r', encoding='utf-8', errors='ignore') as f:
-                for line in f:
-                    line = line.strip()
-                    if not line: continue
-                    if "Location_state" not in line:
-                        continue
-
-                    coord_match = coord_pattern.search(line)
-                    if coord_match:
-                        nums_str = coord_match.group(1).replace(',', ' ')
-                        parts = [float(p) for p in nums_str.split() if p.strip()]
-                        
-                        if len(parts) >= 3:
-                            x_list.append(parts[0])     
-                            y_list.append(parts[1])     
-                            t_list.append(parts[-1])    
-                            
-                            time_match = time_pattern.search(line)
-                            ts_list.append(time_match.group(1) if time_match else "--")
-                            
-                            state_match = state_pattern.search(line)
-                            state_list.append(state_match.group('state') if state_match else "--")
-                            type_list.append(state_match.group('type') if state_match else "--")
-                            
-            if len(x_list) > 0:
-                self.trajectories[fname] = {
-                    'x': np.array(x_list), 'y': np.array(y_list), 't': np.array(t_list),
-                    'timestamps': ts_list, 'states': state_list, 'types': type_list
-                }
-                self.file_names.append(fname)
-                self.max_len = max(self.max_len, len(x_list))
-
-        if not self.file_names:
-            return False, "Found files, but no valid coordinate data extracted."
-
-        return True, f"Loaded {len(self.file_names)} trajectories successfully."
-
-    def compute_evaluation_report(self, ref_name, est_name):
-        """ 综合计算 APE (绝对位姿误差) 和 RPE (相对位姿误差) """
-        if ref_name not in self.trajectories or est_name not in self.trajectories:
-            return "Invalid trajectory selection."
+            try:
+                self.file_info[fname] = prescan_log_file(filepath)
+            except OSError as e:
+                print(f"Skip {fname}: {e}")
+                continue
+            self.file_names.append(fname)
 
+        total_mb = sum(info['size'] for info in self.file_info.values()) / 1024 / 1024
+        return True, (f"Found {len(self.file_names)} logs ({total_mb:.1f} MB), "
+                      f"pre-scanned in {(time.perf_counter() - t0) * 1000:.0f} ms.")
+
+    def is_loaded(self, name):
+        return name in self.trajectories
+
+    def parse_files(self, names):
+        """
+        完整解析 names 中尚未加载的文件，结果放在新的字典里返回 (loaded, failed)。
+        不读写 self.trajectories，可以在后台线程调用；合并由界面线程的 add_trajectories 完成
+        """
+        loaded, failed = {}, []
+        for name in names:
+            if name in self.trajectories or name in loaded:
+                continue
+            info = self.file_info.get(name)
+            data = parse_log_file(info['path']) if info else None
+            if data is None:
+                failed.append(name)
+            else:
+                loaded[name] = data
+        return loaded, failed
+
+    def add_trajectories(self, loaded, keep):
+        """
+        把 parse_files 的结果并入常驻轨迹 (只在界面线程调用)：keep 中的轨迹标记为最近使用，
+        超出常驻上限时淘汰最久未使用且不在 keep 中的轨迹，并按剩余轨迹重新计算 max_len
+        """
+        self.trajectories.update(loaded)
+        for name in keep:
+            if name in self.trajectories:
+                self.trajectories.move_to_end(name)
+        for name in list(self.trajectories.keys()):
+            if len(self.trajectories) <= MAX_LOADED_TRAJECTORIES:
+                break
+            if name not in keep:
+                del self.trajectories[name]
+        self.max_len = max((len(d['x']) for d in self.trajectories.values()), default=0)
+
+    def ensure_loaded(self, names):
+        """同步版本：解析 names 中尚未加载的文件并并入常驻轨迹，返回无法解析出坐标的文件名列表"""
+        loaded, failed = self.parse_files(names)
+        self.add_trajectories(loaded, names)
+        return failed
+
+    def associate(self, ref_name, est_name, max_dt=ASSOC_MAX_DT, interpolation=ASSOC_INTERPOLATION):
+        """
+        Ref 与 Est 的位姿配对。两条轨迹都有时间戳且时间段有重叠时按时间关联 (可选插值 Ref)，
+        否则 (缺少时间戳或时间段完全错开) 退化为按序号对齐，说明文字中注明原因。
+        返回 (ref_x, ref_y, ref_t, est_x, est_y, est_t, est_idx, 说明文字)
+        """
         ref_data = self.trajectories[ref_name]
         est_data = self.trajectories[est_name]
-        
-        min_len = min(len(ref_data['x']), len(est_data['x']))
+        ref_time, est_time = ref_data.get('time'), est_data.get('time')
+        n_est = len(est_data['x'])
+
+        fallback = None
+        if ref_time is None or est_time is None or not (np.isfinite(ref_time).any() and np.isfinite(est_time).any()):
+            fallback = "no timestamps"
+        else:
+            # 时间段完全不重叠 (如回放生成的候选轨迹) 时按时间一个也配不上，退化为按序号对齐并说明原因
+            ref_lo, ref_hi = np.nanmin(ref_time), np.nanmax(ref_time)
+            est_lo, est_hi = np.nanmin(est_time), np.nanmax(est_time)
+            if est_lo > ref_hi + max_dt or est_hi < ref_lo - max_dt:
+                fallback = (f"timestamps do not overlap, Ref {format_epoch(ref_lo)} ~ {format_epoch(ref_hi)}, "
+                            f"Est {format_epoch(est_lo)} ~ {format_epoch(est_hi)}")
+
+        if fallback is not None:
+            min_len = min(len(ref_data['x']), n_est)
+            est_idx = np.arange(min_len)
+            info = f"Association: by index ({fallback}), {min_len} / {n_est} poses"
+            return (ref_data['x'][:min_len], ref_data['y'][:min_len], ref_data['t'][:min_len],
+                    est_data['x'][:min_len], est_data['y'][:min_len], est_data['t'][:min_len], est_idx, info)
+
+        est_idx, k0, k1, alpha = associate_by_time(ref_time, est_time, max_dt, ref_data.get('time_order'))
+        rx, ry, rt = ref_data['x'], ref_data['y'], ref_data['t']
+        if interpolation == 'se2':
+            ref_x, ref_y, ref_t = interpolate_se2(rx[k0], ry[k0], rt[k0], rx[k1], ry[k1], rt[k1], alpha)
+        elif interpolation == 'linear':
+            ref_x = rx[k0] + alpha * (rx[k1] - rx[k0])
+            ref_y = ry[k0] + alpha * (ry[k1] - ry[k0])
+            ref_t = rt[k0] + alpha * wrap_angle(rt[k1] - rt[k0])
+        else:
+            pick = np.where(alpha < 0.5, k0, k1)
+            ref_x, ref_y, ref_t = rx[pick], ry[pick], rt[pick]
+
+        info = (f"Association: by timestamp (max dt {max_dt:g} s, interp {interpolation or 'nearest'}), "
+                f"matched {len(est_idx)} / {n_est} poses ({100.0 * len(est_idx) / max(n_est, 1):.1f}%)")
+        return (ref_x, ref_y, ref_t, est_data['x'][est_idx], est_data['y'][est_idx], est_data['t'][est_idx],
+                est_idx, info)
+
+    def align(self, ref_x, ref_y, est_x, est_y, est_t, est_time=None, mode='se2', seconds=None):
+        """
+        用配对好的位姿求 Est -> Ref 的 SE(2)/Sim(2) 变换并作用到整条 Est。
+        seconds 不为 None 时只用 Est 前 seconds 秒内的配对 (需要时间戳)。返回 (x, y, t, 说明文字)
+        """
+        use = np.ones(len(est_x), dtype=bool)
+        scope = "all pairs"
+        if seconds is not None:
+            if est_time is not None and np.isfinite(est_time).any():
+                use = est_time <= np.nanmin(est_time) + seconds
+                scope = f"first {seconds:g} s"
+            else:
+                scope = "all pairs (no timestamps for first-N-seconds)"
+        if use.sum() < 2:
+            return est_x, est_y, est_t, f"Alignment: skipped ({use.sum()} pairs in {scope})"
+
+        R, trans, s = umeyama_alignment_2d(np.column_stack([est_x[use], est_y[use]]),
+                                           np.column_stack([ref_x[use], ref_y[use]]), with_scale=(mode == 'sim2'))
+        est_x, est_y, est_t = apply_alignment_2d(est_x, est_y, est_t, R, trans, s)
+        info = (f"Alignment: {'Sim(2)' if mode == 'sim2' else 'SE(2)'} on {use.sum()} pairs ({scope})\n"
+                f"  rot {np.degrees(np.arctan2(R[1, 0], R[0, 0])):.4f} deg, "
+                f"trans ({trans[0]:.4f}, {trans[1]:.4f}) m, scale {s:.6f}")
+        return est_x, est_y, est_t, info
+
+    def paired_poses(self, ref_name, est_name, max_dt=ASSOC_MAX_DT, interpolation=ASSOC_INTERPOLATION,
+                     align=None, align_seconds=ALIGN_SECONDS):
+        """关联 + (可选) 对齐，返回 (ref_x, ref_y, ref_t, est_x, est_y, est_t, est_idx, 关联说明, 对齐说明)"""
+        ref_x, ref_y, ref_t, est_x, est_y, est_t, est_idx, assoc_info = self.associate(ref_name, est_name, max_dt, interpolation)
+        align_info = None
+        if align and len(ref_x) >= 2:
+            est_time = self.trajectories[est_name].get('time')
+            est_x, est_y, est_t, align_info = self.align(ref_x, ref_y, est_x, est_y, est_t,
+                                                         None if est_time is None else est_time[est_idx],
+                                                         align, align_seconds)
+        return ref_x, ref_y, ref_t, est_x, est_y, est_t, est_idx, assoc_info, align_info
+
+    def trajectory_hash(self, name):
+        """轨迹内容指纹 (首次使用时计算并记在轨迹字典里)"""
+        data = self.trajectories[name]
+        if 'hash' not in data:
+            data['hash'] = hash_arrays(data['x'], data['y'], data['t'], data.get('time', np.zeros(0)),
+                                       np.asarray(data.get('states', [])), np.asarray(data.get('types', [])))
+        return data['hash']
+
+    def cached(self, kind, ref_name, est_name, options, compute):
+        """按 (类别, 两条轨迹的内容指纹, 参数) 查缓存，未命中时调用 compute() 并写入缓存"""
+        if self.cache is None:
+            return compute()
+        key = self.cache.make_key(kind, self.trajectory_hash(ref_name), self.trajectory_hash(est_name),
+                                  sorted(options.items()))
+        return self.cache.get_or_compute(key, compute)
+
+    def point_errors(self, ref_name, est_name, kind='ape', **options):
+        """
+        逐点误差，用于轨迹着色。kind='ape' 为每个配对位姿的绝对误差；
+        kind='rpe' 为第 i -> i+1 步的相对平移误差 (记在第 i 个点上，最后一点沿用前一步)。
+        返回 (est_idx, errors)：errors[k] 属于 Est 的第 est_idx[k] 个位姿
+        """
+        options = {'max_dt': ASSOC_MAX_DT, 'interpolation': ASSOC_INTERPOLATION, 'align': None,
+                   'align_seconds': ALIGN_SECONDS, **options}
+        return self.cached(f'point_errors:{kind}', ref_name, est_name, options,
+                           lambda: self._point_errors(ref_name, est_name, kind, **options))
+
+    def _point_errors(self, ref_name, est_name, kind, **options):
+        ref_x, ref_y, ref_t, est_x, est_y, est_t, est_idx, _, _ = self.paired_poses(ref_name, est_name, **options)
+        if len(ref_x) < 2:
+            return est_idx, np.zeros(len(est_idx))
+        if kind == 'rpe':
+            trans_err, _ = compute_rpe(pose_arrays(ref_x, ref_y, ref_t), pose_arrays(est_x, est_y, est_t),
+                                       *delta_pairs(len(ref_x), 1))
+            return est_idx, np.append(trans_err, trans_err[-1])
+        return est_idx, np.hypot(ref_x - est_x, ref_y - est_y)
+
+    def evaluate(self, ref_name, est_name,
+                 frame_deltas=RPE_FRAME_DELTAS, distance_deltas=RPE_DISTANCE_DELTAS,
+                 max_dt=ASSOC_MAX_DT, interpolation=ASSOC_INTERPOLATION,
+                 align=None, align_seconds=ALIGN_SECONDS, drift_bin=DRIFT_BIN_SIZE):
+        """
+        计算 APE / RPE 的数值结果 (字典)，供报告文本与批量评估共用。
+        result['error'] 不为 None 时表示无法评估
+        """
+        if ref_name not in self.trajectories or est_name not in self.trajectories:
+            return {'error': "Invalid trajectory selection."}
+
+        options = dict(frame_deltas=tuple(frame_deltas), distance_deltas=tuple(distance_deltas), max_dt=max_dt,
+                       interpolation=interpolation, align=align, align_seconds=align_seconds, drift_bin=drift_bin)
+        return self.cached('evaluate', ref_name, est_name, options,
+                           lambda: self._evaluate(ref_name, est_name, **options))
+
+    def _evaluate(self, ref_name, est_name, frame_deltas, distance_deltas, max_dt, interpolation,
+                  align, align_seconds, drift_bin):
+        ref_x, ref_y, ref_t, est_x, est_y, est_t, est_idx, assoc_info, align_info = self.paired_poses(
+            ref_name, est_name, max_dt, interpolation, align, align_seconds)
+        result = {'error': None, 'assoc_info': assoc_info, 'align_info': align_info,
+                  'n_est': len(self.trajectories[est_name]['x']), 'matched': len(ref_x)}
+        min_len = len(ref_x)
         if min_len < 2:
-            return "Not enough matched points for evaluation."
+            result['error'] = "Not enough matched points for evaluation."
+            return result
 
-        ref_pts = np.vstack((ref_data['x'][:min_len], ref_data['y'][:min_len])).T
-        est_pts = np.vstack((est_data['x'][:min_len], est_data['y'][:min_len])).T
-        
         # --- 1. APE (Absolute Pose Error) 计算 ---
-        ape_errors = np.linalg.norm(ref_pts - est_pts, axis=1)
-        ape_rmse = np.sqrt(np.mean(ape_errors**2))
-        
-        out_text = f"=== APE (Absolute Pose Error) ===\n"
-        out_text += f"Evaluate global consistency.\n"
-        out_text += f"  RMSE : {ape_rmse:.6f} m\n"
-        out_text += f"  Mean : {np.mean(ape_errors):.6f} m\n"
-        out_text += f"  Max  : {np.max(ape_errors):.6f} m\n"
-        out_text += f"  Min  : {np.min(ape_errors):.6f} m\n"
-        out_text += f"  Std  : {np.std(ape_errors):.6f} m\n"
-        out_text += "-"*40 + "\n"
+        ape_errors = np.hypot(ref_x - est_x, ref_y - est_y)
+        result['ape'] = error_stats(ape_errors)
 
         # --- 2. RPE (Relative Pose Error) 计算 ---
-        ref_t = ref_data['t'][:min_len]
-        est_t = est_data['t'][:min_len]
-        
-        rpe_errors = []
-        for i in range(min_len - 1):
-            # 将第 i 到 i+1 步的世界坐标位移，转换到第 i 步的局部坐标系下
-            dx_ref, dy_ref = ref_pts[i+1, 0] - ref_pts[i, 0], ref_pts[i+1, 1] - ref_pts[i, 1]
-            c_ref, s_ref = np.cos(ref_t[i]), np.sin(ref_t[i])
-            rel_x_ref = c_ref * dx_ref + s_ref * dy_ref
-            rel_y_ref = -s_ref * dx_ref + c_ref * dy_ref
-
-            dx_est, dy_est = est_pts[i+1, 0] - est_pts[i, 0], est_pts[i+1, 1] - est_pts[i, 1]
-            c_est, s_est = np.cos(est_t[i]), np.sin(est_t[i])
-            rel_x_est = c_est * dx_est + s_est * dy_est
-            rel_y_est = -s_est * dx_est + c_est * dy_est
-
-            # 计算两个相对位移向量之间的差异
-            err = np.hypot(rel_x_ref - rel_x_est, rel_y_ref - rel_y_est)
-            rpe_errors.append(err)
-
-        rpe_errors = np.array(rpe_errors)
-        rpe_rmse = np.sqrt(np.mean(rpe_errors**2))
-
-        out_text += f"=== RPE (Relative Pose Error) ===\n"
-        out_text += f"Evaluate local accuracy (Step = 1).\n"
-        out_text += f"  RMSE : {rpe_rmse:.6f} m\n"
-        out_text += f"  Mean : {np.mean(rpe_errors):.6f} m\n"
-        out_text += f"  Max  : {np.max(rpe_errors):.6f} m\n"
-        out_text += f"  Min  : {np.min(rpe_errors):.6f} m\n"
-        out_text += f"  Std  : {np.std(rpe_errors):.6f} m\n"
-
-        return out_text
\ No newline at end of file
+        ref_poses, est_poses = pose_arrays(ref_x, ref_y, ref_t), pose_arrays(est_x, est_y, est_t)
+        trans_err, rot_err = compute_rpe(ref_poses, est_poses, *delta_pairs(min_len, 1))
+        result['rpe'] = error_stats(trans_err)
+        result['rpe_rot'] = error_stats(rot_err)
+
+        # --- 3. 多间隔 RPE：按帧数与按 Ref 累计路程 ---
+        cum_dist = path_length(ref_x, ref_y)
+        rows = [(f"{d} fr", d, None) for d in frame_deltas if d != 1]
+        rows += [(f"{d:g} m", d, cum_dist) for d in distance_deltas]
+        result['rpe_deltas'] = []
+        for label, delta, cum in rows:
+            i, j = delta_pairs(min_len, delta, cum)
+            if len(i) == 0:
+                result['rpe_deltas'].append({'delta': label, 'pairs': 0})
+                continue
+            trans_err, rot_err = compute_rpe(ref_poses, est_poses, i, j)
+            result['rpe_deltas'].append({
+                'delta': label, 'pairs': len(i),
+                't_rmse': float(np.sqrt(np.mean(trans_err**2))), 't_max': float(trans_err.max()),
+                'r_rmse': float(np.sqrt(np.mean(rot_err**2))), 'r_max': float(rot_err.max()),
+            })
+
+        # --- 4. 漂移曲线：APE 随 Ref 累计路程的变化 ---
+        result['drift'] = drift_curve(cum_dist, ape_errors, drift_bin)
+
+        # --- 5. 按 Est 的定位状态 (去掉 ":" 后的子码) 与 type 分组的 APE ---
+        est_data = self.trajectories[est_name]
+        states = np.char.partition(np.asarray(est_data['states'])[est_idx], ':')[:, 0]
+        result['breakdown'] = {
+            'state': grouped_error_stats(states, ape_errors),
+            'type': grouped_error_stats(np.asarray(est_data['types'])[est_idx], ape_errors),
+        }
+        return result
+
+    def compute_evaluation_report(self, ref_name, est_name, **options):
+        """ 综合计算 APE (绝对位姿误差) 和 RPE (相对位姿误差) """
+        return format_report(self.evaluate(ref_name, est_name, **options))
+
+
+def format_report(result):
+    """把 evaluate 的结果格式化为报告文本"""
+    if 'assoc_info' not in result:
+        return result['error']
+    out_text = result['assoc_info'] + "\n"
+    if result['error']:
+        return out_text + result['error']
+    if result['align_info']:
+        out_text += result['align_info'] + "\n"
+    out_text += "-"*40 + "\n"
+
+    out_text += f"=== APE (Absolute Pose Error) ===\n"
+    out_text += f"Evaluate global consistency.\n"
+    out_text += format_stats(result['ape'], "m")
+    out_text += "-"*40 + "\n"
+
+    out_text += f"=== RPE (Relative Pose Error) ===\n"
+    out_text += f"Evaluate local accuracy (Step = 1).\n"
+    out_text += format_stats(result['rpe'], "m")
+    out_text += f"  Rot RMSE : {np.degrees(result['rpe_rot']['rmse']):.4f} deg\n"
+
+    if result['rpe_deltas']:
+        out_text += "-"*40 + "\n"
+        out_text += "=== RPE by Delta (trans m / rot deg) ===\n"
+        out_text += f"  {'Delta':>8} {'Pairs':>8} {'T-RMSE':>9} {'T-Max':>9} {'R-RMSE':>8} {'R-Max':>8}\n"
+        for row in result['rpe_deltas']:
+            if row['pairs'] == 0:
+                out_text += f"  {row['delta']:>8} {0:>8}   (trajectory too short)\n"
+                continue
+            out_text += (f"  {row['delta']:>8} {row['pairs']:>8} {row['t_rmse']:>9.4f} {row['t_max']:>9.4f} "
+                         f"{np.degrees(row['r_rmse']):>8.3f} {np.degrees(row['r_max']):>8.3f}\n")
+
+    breakdown = result.get('breakdown')
+    if breakdown is not None:
+        out_text += "-"*40 + "\n"
+        out_text += "=== APE by Loc State / Type (m) ===\n"
+        out_text += f"  {'Group':<22} {'Count':>7} {'RMSE':>8} {'P95':>8} {'Max':>8}\n"
+        for kind in ('state', 'type'):
+            for row in breakdown[kind]:
+                label = f"{kind}={row['group']}"
+                out_text += (f"  {label:<22} {row['count']:>7} {row['rmse']:>8.4f} "
+                             f"{row['p95']:>8.4f} {row['max']:>8.4f}\n")
+
+    drift = result.get('drift')
+    if drift is not None:
+        filled = np.flatnonzero(drift['count'] > 0)
+        shown = filled[np.unique(np.linspace(0, len(filled) - 1, min(len(filled), DRIFT_REPORT_ROWS)).astype(int))]
+        out_text += "-"*40 + "\n"
+        out_text += f"=== Drift vs Distance (APE m, bin {drift['bin_size']:g} m) ===\n"
+        out_text += f"  {'Dist':>8} {'Count':>7} {'Mean':>8} {'P50':>8} {'P95':>8} {'Max':>8}\n"
+        for b in shown:
+            out_text += (f"  {drift['distance'][b]:>8.1f} {drift['count'][b]:>7} {drift['mean'][b]:>8.4f} "
+                         f"{drift['p50'][b]:>8.4f} {drift['p95'][b]:>8.4f} {drift['max'][b]:>8.4f}\n")
+    return out_text
+
+
+def benchmark_rpe(n_poses=1_000_000, frame_deltas=RPE_FRAME_DELTAS, distance_deltas=RPE_DISTANCE_DELTAS):
+    """RPE 性能测试：随机游走生成 n_poses 个位姿的 Ref/Est，对每个间隔计时"""
+    rng = np.random.default_rng(0)
+    ref_t = np.cumsum(rng.normal(0, 0.01, n_poses))
+    ref_x = np.cumsum(0.05 * np.cos(ref_t))
+    ref_y = np.cumsum(0.05 * np.sin(ref_t))
+    est_x = ref_x + rng.normal(0, 0.01, n_poses)
+    est_y = ref_y + rng.normal(0, 0.01, n_poses)
+    est_t = ref_t + rng.normal(0, 0.002, n_poses)
+
+    t0 = time.perf_counter()
+    ref_poses, est_poses = pose_arrays(ref_x, ref_y, ref_t), pose_arrays(est_x, est_y, est_t)
+    cum_dist = path_length(ref_x, ref_y)
+    print(f"{n_poses} poses, path {cum_dist[-1]:.0f} m, cos/sin + cumsum {(time.perf_counter() - t0) * 1000:.1f} ms")
+    total = time.perf_counter() - t0
+    for delta, cum in [(d, None) for d in frame_deltas] + [(d, cum_dist) for d in distance_deltas]:
+        t0 = time.perf_counter()
+        i, j = delta_pairs(n_poses, delta, cum)
+        trans_err, rot_err = compute_rpe(ref_poses, est_poses, i, j)
+        rmse = np.sqrt(np.mean(trans_err**2))
+        cost = time.perf_counter() - t0
+        total += cost
+        unit = "fr" if cum is None else "m"
+        print(f"  delta {delta:g} {unit}: {len(i)} pairs, T-RMSE {rmse:.4f} m, {cost * 1000:.1f} ms")
+    print(f"total {total * 1000:.1f} ms")
+    return total
+
+
+if __name__ == '__main__':
+    benchmark_rpe()
@@ -0,0 +1,327 @@
+import sys
+import io
+import math
+import time
+import argparse
+from collections import deque
+
+import numpy as np
+
+from evaluator_data import (EvaluatorData, parse_log_file, interpolate_se2, wrap_angle, format_stats,
+                            ASSOC_MAX_DT, ASSOC_INTERPOLATION)
+
+STREAM_PERCENTILES = (50, 95, 99)
+STREAM_REF_HORIZON = 5.0  # Est 尚未到达时 Ref 缓冲区最多保留的时长 (秒)，落后更多的 Est 位姿会被丢弃
+STREAM_PENDING_HORIZON = 5.0   # Ref 停滞时 Est 排队等待的最长时长 (秒)，更早的位姿按过期丢弃
+STREAM_MAX_PENDING = 10000     # 排队 Est 位姿的最大条数，超出时丢弃最早的
+
+
+class RunningStats:
+    """Welford 在线统计：每个新值 O(1) 更新，不保存历史；方差用 M2 累加，避免大数相减的精度损失"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        if value < self.min: self.min = value
+        if value > self.max: self.max = value
+
+    @property
+    def variance(self):
+        return self.m2 / self.count if self.count else 0.0
+
+    def stats(self):
+        """与 error_stats 相同的键 (std 为总体标准差，与 np.std 一致)；RMSE^2 = mean^2 + var"""
+        if not self.count:
+            return None
+        return {
+            'rmse': math.sqrt(self.mean ** 2 + self.variance),
+            'mean': self.mean,
+            'max': self.max,
+            'min': self.min,
+            'std': math.sqrt(self.variance),
+        }
+
+
+class P2Quantile:
+    """
+    P² 分位数估计 (Jain & Chlamtac 1985)：只维护 5 个标记点的高度与位置，每个新值 O(1) 更新，
+    内存恒定。前 5 个值之前返回精确分位数
+    """
+
+    def __init__(self, p):
+        self.p = p
+        self.heights = []
+        self.positions = [0, 1, 2, 3, 4]
+        self.desired = [0.0, 2 * p, 4 * p, 2 + 2 * p, 4.0]
+        self.increments = [0.0, p / 2, p, (1 + p) / 2, 1.0]
+
+    def update(self, value):
+        q = self.heights
+        if len(q) < 5:
+            q.append(value)
+            if len(q) == 5:
+                q.sort()
+            return
+
+        n = self.positions
+        if value < q[0]:
+            q[0] = value
+            k = 0
+        elif value >= q[4]:
+            q[4] = value
+            k = 3
+        else:
+            k = 0
+            while value >= q[k + 1]:
+                k += 1
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # 中间三个标记点偏离期望位置超过 1 时移动一格，高度用抛物线 (失败时线性) 公式修正
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                qp = q[i] + d / (n[i + 1] - n[i - 1]) * (
+                    (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+                    + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+                if not q[i - 1] < qp < q[i + 1]:
+                    qp = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = qp
+                n[i] += d
+
+    def value(self):
+        if not self.heights:
+            return math.nan
+        if len(self.heights) < 5:
+            return float(np.percentile(self.heights, self.p * 100))
+        return self.heights[2]
+
+
+class StreamingErrorStats:
+    """一路误差的流式统计：Welford (RMSE / Mean / Max / Min / Std) + 每个分位数一个 P² 估计器"""
+
+    def __init__(self, percentiles=STREAM_PERCENTILES):
+        self.running = RunningStats()
+        self.quantiles = {p: P2Quantile(p / 100.0) for p in percentiles}
+
+    def update(self, value):
+        self.running.update(value)
+        for q in self.quantiles.values():
+            q.update(value)
+
+    def stats(self):
+        stats = self.running.stats()
+        if stats is not None:
+            for p, q in self.quantiles.items():
+                stats[f'p{p}'] = q.value()
+        return stats
+
+
+def format_stream_stats(stats, unit):
+    text = format_stats(stats, unit)
+    for key in sorted((k for k in stats if k.startswith('p')), key=lambda k: int(k[1:])):
+        text += f"  {key.upper():<5}: {stats[key]:.6f} {unit}\n"
+    return text
+
+
+class IncrementalEvaluator:
+    """
+    增量 APE / RPE 评估，用于对接实时真值流：Ref 与 Est 位姿按时间顺序逐个送入，
+    每个新配对只做 O(1) 的关联、误差计算与统计更新，历史位姿不保存也不重算。
+
+    关联规则与 EvaluatorData 一致：Est 位姿在 Ref 中找前后两帧，时间差均不超过 max_dt 时插值
+    (se2 / linear)，否则取 max_dt 内的最近帧，都没有则丢弃。Ref 尚未覆盖到的 Est 位姿先排队，
+    等 Ref 时间追上后再处理；Ref 缓冲区只保留最早待处理 Est 之前的一帧 (没有待处理的 Est 时
+    最多保留 STREAM_REF_HORIZON 秒)，长度有界。Ref 停滞或中断时排队的 Est 同样有界：
+    比最新 Est 早 STREAM_PENDING_HORIZON 秒以上或超出 STREAM_MAX_PENDING 条的位姿按过期丢弃并计数。
+    RPE 为相邻两个配对之间的相对位姿误差 (对应离线报告中的 1 帧间隔)；不做轨迹对齐。
+    """
+
+    def __init__(self, max_dt=ASSOC_MAX_DT, interpolation=ASSOC_INTERPOLATION, percentiles=STREAM_PERCENTILES):
+        self.max_dt = max_dt
+        self.interpolation = interpolation
+        self.ref_buffer = deque()   # (time, x, y, t)，时间递增
+        self.pending = deque()      # 等待 Ref 覆盖的 Est 位姿
+        self.last_pair = None       # 上一个配对 (ref_pose, est_pose)，用于 RPE
+        self.last_est_time = -math.inf
+
+        self.matched = 0
+        self.dropped = 0            # 超出 max_dt 找不到 Ref 的 Est 位姿
+        self.out_of_order = 0       # 时间倒退而被忽略的位姿
+        self.expired = 0            # Ref 停滞时在队列中等待过久 (或队列已满) 而丢弃的 Est 位姿
+        self.ape = StreamingErrorStats(percentiles)
+        self.rpe = StreamingErrorStats(percentiles)
+        self.rpe_rot = StreamingErrorStats(percentiles)
+
+    def add_ref(self, stamp, x, y, t):
+        if self.ref_buffer and stamp < self.ref_buffer[-1][0]:
+            self.out_of_order += 1
+            return
+        self.ref_buffer.append((stamp, x, y, t))
+        self._flush()
+        if not self.pending:
+            self._trim_ref(max(self.last_est_time, stamp - STREAM_REF_HORIZON))
+
+    def add_est(self, stamp, x, y, t):
+        if stamp < self.last_est_time:
+            self.out_of_order += 1
+            return
+        self.last_est_time = stamp
+        self.pending.append((stamp, x, y, t))
+        self._flush()
+        # Ref 停滞时队列不能无限增长：按时间窗与条数上限丢弃最早的位姿
+        while self.pending and (self.pending[0][0] < stamp - STREAM_PENDING_HORIZON
+                                or len(self.pending) > STREAM_MAX_PENDING):
+            self.pending.popleft()
+            self.expired += 1
+
+    def finish(self):
+        """数据流结束：剩余的 Est 位姿不会再有后续 Ref，按最近帧处理"""
+        while self.pending:
+            self._associate(self.pending.popleft())
+
+    def _flush(self):
+        # Ref 时间已经追上 (或前后两帧都已到达) 的 Est 位姿可以确定配对
+        while self.pending and self.ref_buffer and self.ref_buffer[-1][0] >= self.pending[0][0]:
+            self._associate(self.pending.popleft())
+
+    def _associate(self, est):
+        stamp = est[0]
+        buf = self.ref_buffer
+        self._trim_ref(stamp)
+        if not buf:
+            self.dropped += 1
+            return
+
+        r0 = buf[0]
+        r1 = buf[1] if len(buf) >= 2 else r0
+        ref = None
+        if r0[0] <= stamp <= r1[0] and r1[0] > r0[0] and stamp - r0[0] <= self.max_dt and r1[0] - stamp <= self.max_dt:
+            alpha = (stamp - r0[0]) / (r1[0] - r0[0])
+            if self.interpolation == 'se2':
+                px, py, pt = interpolate_se2(r0[1], r0[2], r0[3], r1[1], r1[2], r1[3], alpha)
+                ref = (stamp, float(px), float(py), float(pt))
+            elif self.interpolation == 'linear':
+                ref = (stamp, r0[1] + alpha * (r1[1] - r0[1]), r0[2] + alpha * (r1[2] - r0[2]),
+                       r0[3] + alpha * wrap_angle(r1[3] - r0[3]))
+        if ref is None:
+            nearest = r0 if abs(stamp - r0[0]) <= abs(r1[0] - stamp) else r1
+            if abs(stamp - nearest[0]) > self.max_dt:
+                self.dropped += 1
+                return
+            ref = nearest
+        self._update(ref, est)
+
+    def _trim_ref(self, stamp):
+        """Est 按时间递增，早于 stamp 的 Ref 帧只需保留最后一帧 (作为插值左端点)"""
+        buf = self.ref_buffer
+        while len(buf) >= 2 and buf[1][0] <= stamp:
+            buf.popleft()
+
+    def _update(self, ref, est):
+        self.matched += 1
+        self.ape.update(math.hypot(ref[1] - est[1], ref[2] - est[2]))
+
+        if self.last_pair is not None:
+            ref_prev, est_prev = self.last_pair
+            c, s = math.cos(ref_prev[3]), math.sin(ref_prev[3])
+            dx, dy = ref[1] - ref_prev[1], ref[2] - ref_prev[2]
+            rel_x_ref, rel_y_ref = c * dx + s * dy, -s * dx + c * dy
+            c, s = math.cos(est_prev[3]), math.sin(est_prev[3])
+            dx, dy = est[1] - est_prev[1], est[2] - est_prev[2]
+            rel_x_est, rel_y_est = c * dx + s * dy, -s * dx + c * dy
+            self.rpe.update(math.hypot(rel_x_ref - rel_x_est, rel_y_ref - rel_y_est))
+            rot = (ref[3] - ref_prev[3]) - (est[3] - est_prev[3])
+            self.rpe_rot.update(abs((rot + math.pi) % (2 * math.pi) - math.pi))
+        self.last_pair = (ref, est)
+
+    def summary(self):
+        return {
+            'matched': self.matched, 'dropped': self.dropped, 'pending': len(self.pending),
+            'expired': self.expired, 'out_of_order': self.out_of_order, 'ref_buffer': len(self.ref_buffer),
+            'ape': self.ape.stats(), 'rpe': self.rpe.stats(), 'rpe_rot': self.rpe_rot.stats(),
+        }
+
+    def format_summary(self):
+        s = self.summary()
+        text = (f"Matched: {s['matched']} | Dropped: {s['dropped']} | Pending: {s['pending']} "
+                f"| Expired: {s['expired']}\n")
+        if s['ape'] is None:
+            return text + "No associated pose pairs yet.\n"
+        text += "=== APE (Streaming) ===\n" + format_stream_stats(s['ape'], "m")
+        if s['rpe'] is not None:
+            text += "\n=== RPE Step=1 (Streaming) ===\n" + format_stream_stats(s['rpe'], "m")
+            rot = {k: math.degrees(v) for k, v in s['rpe_rot'].items()}
+            text += "\n=== RPE Rotation (Streaming) ===\n" + format_stream_stats(rot, "deg")
+        return text
+
+
+def replay_logs(ref_path, est_path, max_dt=ASSOC_MAX_DT, interpolation=ASSOC_INTERPOLATION):
+    """
+    把两个日志按时间交错回放进增量评估器 (模拟实时数据流)，输出流式统计，
+    并与离线 EvaluatorData.evaluate 的结果对照，同时给出单个位姿的平均更新耗时
+    """
+    ref_data, est_data = parse_log_file(ref_path), parse_log_file(est_path)
+    if ref_data is None or est_data is None:
+        raise ValueError("日志中没有有效坐标")
+
+    stream = []
+    for tag, data in (('ref', ref_data), ('est', est_data)):
+        for i in data['time_order']:
+            stream.append((data['time'][i], tag, data['x'][i], data['y'][i], data['t'][i]))
+    if not stream:
+        raise ValueError("日志缺少时间戳，无法按时间回放")
+    stream.sort(key=lambda item: (item[0], item[1] != 'ref'))
+
+    evaluator = IncrementalEvaluator(max_dt=max_dt, interpolation=interpolation)
+    t0 = time.perf_counter()
+    for stamp, tag, x, y, t in stream:
+        if tag == 'ref':
+            evaluator.add_ref(stamp, x, y, t)
+        else:
+            evaluator.add_est(stamp, x, y, t)
+    evaluator.finish()
+    elapsed = time.perf_counter() - t0
+
+    print(evaluator.format_summary())
+    print(f"回放 {len(stream)} 个位姿，耗时 {elapsed:.3f}s ({elapsed / len(stream) * 1e6:.1f} us/位姿)，"
+          f"Ref 缓冲区最终长度 {len(evaluator.ref_buffer)}")
+
+    offline = EvaluatorData(log_dir=None, use_cache=False)
+    offline.trajectories['ref'] = ref_data
+    offline.trajectories['est'] = est_data
+    result = offline.evaluate('ref', 'est', max_dt=max_dt, interpolation=interpolation, align=None)
+    if not result['error']:
+        print(f"离线对照: matched {result['matched']} | APE RMSE {result['ape']['rmse']:.6f} m "
+              f"| RPE RMSE {result['rpe']['rmse']:.6f} m")
+    return evaluator
+
+
+if __name__ == "__main__":
+    # 强制设置标准输出为 UTF-8，解决中文乱码
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description="增量 APE / RPE 评估 (按时间回放两个日志，模拟实时数据流)")
+    parser.add_argument("ref", help="基准 (真值) 日志文件")
+    parser.add_argument("est", help="待评估日志文件")
+    parser.add_argument("--max-dt", type=float, default=ASSOC_MAX_DT, help="时间戳关联允许的最大时间差 (秒)")
+    parser.add_argument("--interp", choices=['none', 'linear', 'se2'], default=ASSOC_INTERPOLATION or 'none',
+                        help="Ref 插值方式")
+    args = parser.parse_args()
+    try:
+        replay_logs(args.ref, args.est, max_dt=args.max_dt, interpolation=None if args.interp == 'none' else args.interp)
+    except Exception as e:
+        print(f"评估失败: {e}")
+        sys.exit(1)
@@ -0,0 +1,98 @@
+import os
+import sys
+import io
+import csv
+import glob
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from evaluator_data import parse_log_file
+from jump_events import JUMP_MAX_SPEED, JUMP_MIN_DIST, JUMP_MAX_YAW_RATE, JUMP_MIN_YAW, detect_jumps
+
+JUMP_COLUMNS = ['time', 'file', 'index', 'jump_m', 'yaw_deg', 'speed', 'yaw_rate_deg',
+                'state_from', 'state_to', 'reason']
+
+
+def _scan_file(filepath, options):
+    """子进程：解析一个日志并检测跳变，返回 (文件名, 帧数, 事件列表, 耗时)"""
+    t0 = time.perf_counter()
+    fname = os.path.basename(filepath)
+    data = parse_log_file(filepath)
+    if data is None:
+        return fname, 0, [], time.perf_counter() - t0
+    events = detect_jumps(data, **options)
+    for event in events:
+        event['file'] = fname
+    return fname, len(data['x']), events, time.perf_counter() - t0
+
+
+def scan_logs(files, out_csv, workers=None, **options):
+    """对所有日志并行做跳变检测，写出按时间排序的事件表 (CSV)"""
+    if not files:
+        raise ValueError("没有找到日志文件")
+    workers = max(1, min(workers or os.cpu_count() or 1, len(files)))
+
+    t0 = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(_scan_file, files, [options] * len(files)))
+    elapsed = time.perf_counter() - t0
+
+    events = [e for _, _, file_events, _ in results for e in file_events]
+    events.sort(key=lambda e: (e['time'], e['file'], e['index']))
+
+    os.makedirs(os.path.dirname(os.path.abspath(out_csv)), exist_ok=True)
+    with open(out_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=JUMP_COLUMNS)
+        writer.writeheader()
+        for e in events:
+            writer.writerow({k: (f"{v:.4f}" if isinstance(v, float) else v) for k, v in e.items()})
+
+    total_frames = sum(r[1] for r in results)
+    print(f"已扫描 {len(files)} 个日志, {total_frames} 帧 ({elapsed:.2f}s, {workers} 进程)，"
+          f"共 {len(events)} 个事件 -> {out_csv}")
+    for fname, n_frames, file_events, cost in results:
+        if file_events:
+            reasons = {}
+            for e in file_events:
+                for r in e['reason'].split('+'):
+                    reasons[r] = reasons.get(r, 0) + 1
+            detail = ", ".join(f"{k} {v}" for k, v in sorted(reasons.items()))
+            print(f"  {fname:<40} {n_frames:>8} 帧 | {len(file_events):>4} 个事件 ({detail})")
+    largest = sorted((e for e in events if 'jump' in e['reason']), key=lambda e: e['jump_m'], reverse=True)[:10]
+    if largest:
+        print("位移最大的跳变:")
+        for e in largest:
+            print(f"  {e['time']} {e['file']} [{e['index']}] {e['jump_m']:.3f} m "
+                  f"| {e['state_from']} -> {e['state_to']}")
+    return events
+
+
+if __name__ == "__main__":
+    # 强制设置标准输出为 UTF-8，解决中文乱码 (放在这里，界面 import detect_jumps 时不受影响)
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+
+    parser = argparse.ArgumentParser(description="重定位跳变检测 (位置 / 航向跳变与定位状态切换)")
+    parser.add_argument("logs", nargs='*', default=["./logs"], help="日志文件 / 文件夹 / 通配符 (默认 ./logs)")
+    parser.add_argument("--out", default="./out/jump_events.csv", help="事件表输出路径")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数 (默认 CPU 核数)")
+    parser.add_argument("--max-speed", type=float, default=JUMP_MAX_SPEED, help="隐含速度上限 (m/s)")
+    parser.add_argument("--min-dist", type=float, default=JUMP_MIN_DIST, help="最小跳变位移 (m)")
+    parser.add_argument("--max-yaw-rate", type=float, default=np.degrees(JUMP_MAX_YAW_RATE), help="隐含角速度上限 (deg/s)")
+    parser.add_argument("--min-yaw", type=float, default=np.degrees(JUMP_MIN_YAW), help="最小航向跳变 (deg)")
+    args = parser.parse_args()
+
+    files = []
+    for path in args.logs:
+        if os.path.isdir(path):
+            files += sorted(glob.glob(os.path.join(path, "*.txt")) + glob.glob(os.path.join(path, "*.log")))
+        else:
+            files += sorted(glob.glob(path))
+    try:
+        scan_logs(files, args.out, workers=args.workers, max_speed=args.max_speed, min_dist=args.min_dist,
+                  max_yaw_rate=np.radians(args.max_yaw_rate), min_yaw=np.radians(args.min_yaw))
+    except Exception as e:
+        print(f"检测失败: {e}")
+        sys.exit(1)
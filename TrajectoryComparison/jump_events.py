@@ -0,0 +1,60 @@
+import numpy as np
+
+# 重定位跳变检测的公共部分：只依赖 numpy，TrajectoryComparison 与 Display_location 共用
+
+# 相邻两帧之间的跳变阈值
+JUMP_MAX_SPEED = 2.0                      # 隐含速度上限 (m/s)
+JUMP_MIN_DIST = 0.3                       # 位移小于该值不算跳变 (m)，避免时间戳抖动造成误报
+JUMP_MAX_YAW_RATE = np.radians(90.0)      # 隐含角速度上限 (rad/s)
+JUMP_MIN_YAW = np.radians(10.0)           # 航向变化小于该值不算跳变 (rad)
+
+
+def wrap_angle(a):
+    """把角度归一化到 [-pi, pi)"""
+    return (a + np.pi) % (2 * np.pi) - np.pi
+
+
+def parse_log_times(ts_list):
+    """日志时间戳字符串 (2024-01-15 10:30:45,123) -> 秒 (float64)，缺失为 NaN；整列一次转换"""
+    stamps = np.array([s.replace(' ', 'T').replace(',', '.') if s != "--" else 'NaT' for s in ts_list],
+                      dtype='datetime64[ms]')
+    secs = stamps.astype(np.int64) / 1000.0
+    secs[np.isnat(stamps)] = np.nan
+    return secs
+
+
+def detect_jumps(data, max_speed=JUMP_MAX_SPEED, min_dist=JUMP_MIN_DIST,
+                 max_yaw_rate=JUMP_MAX_YAW_RATE, min_yaw=JUMP_MIN_YAW):
+    """
+    对一条轨迹的相邻帧整列求位移、航向变化与隐含速度，标记三类事件：
+    位置跳变 (jump)、航向跳变 (yaw)、定位状态切换 (state，只比较冒号前的状态名)。
+    缺少时间戳时速度未知，只要位移/航向超过下限就算跳变。返回事件字典列表 (index 为跳变后的帧)
+    """
+    x, y, t = data['x'], data['y'], data['t']
+    if len(x) < 2:
+        return []
+    times = data.get('time')
+    dt = np.diff(times) if times is not None else np.full(len(x) - 1, np.nan)
+    dist = np.hypot(np.diff(x), np.diff(y))
+    dyaw = np.abs(wrap_angle(np.diff(t)))
+    with np.errstate(invalid='ignore', divide='ignore'):
+        speed = np.where(dt > 0, dist / dt, np.nan)
+        yaw_rate = np.where(dt > 0, dyaw / dt, np.nan)
+
+    # NaN 速度 (时间戳缺失或倒退) 不能证明是正常运动，按跳变处理
+    pos_jump = (dist > min_dist) & ~(speed <= max_speed)
+    yaw_jump = (dyaw > min_yaw) & ~(yaw_rate <= max_yaw_rate)
+    states = np.char.partition(np.asarray(data['states']), ':')[:, 0]
+    state_flip = states[1:] != states[:-1]
+
+    events = []
+    for i in np.flatnonzero(pos_jump | yaw_jump | state_flip):
+        reason = [name for name, flag in (('jump', pos_jump[i]), ('yaw', yaw_jump[i]), ('state', state_flip[i])) if flag]
+        events.append({
+            'time': data['timestamps'][i + 1], 'index': int(i + 1),
+            'jump_m': float(dist[i]), 'yaw_deg': float(np.degrees(dyaw[i])),
+            'speed': float(speed[i]), 'yaw_rate_deg': float(np.degrees(yaw_rate[i])),
+            'state_from': data['states'][i], 'state_to': data['states'][i + 1],
+            'reason': '+'.join(reason),
+        })
+    return events
@@ -2,16 +2,35 @@ import sys
 import os
 import numpy as np
 from PyQt5.QtWidgets import (QApplication, QMainWindow, QWidget, QVBoxLayout, 
-                             QHBoxLayout, QLabel, QTextEdit, QSplitter, QScrollArea, QComboBox, QFormLayout, QGroupBox)
-from PyQt5.QtCore import Qt
+                             QHBoxLayout, QLabel, QTextEdit, QSplitter, QScrollArea, QComboBox, QFormLayout, QGroupBox,
+                             QSpinBox, QListWidget, QListWidgetItem)
+from PyQt5.QtCore import Qt, QThread
 
 import pyqtgraph as pg
 
-from evaluator_data import EvaluatorData
-from evaluator_canvas import EvaluatorCanvas
+from evaluator_data import EvaluatorData, ALIGN_MODES, format_report
+from evaluator_canvas import EvaluatorCanvas, DriftCanvas, prepare_error_coloring
+from jump_events import detect_jumps
 
 LOG_DIR = os.path.join(os.getcwd(), 'logs')
 
+
+class LoadWorker(QThread):
+    """
+    后台线程：完整解析下拉框中选中的日志，界面在此期间保持响应。
+    解析结果先放在线程自己的 loaded 里，由界面线程在 on_files_loaded 中并入 (线程内不碰共享的 trajectories)
+    """
+
+    def __init__(self, data_manager, names):
+        super().__init__()
+        self.data_manager = data_manager
+        self.names = names
+        self.loaded = {}
+        self.failed = []
+
+    def run(self):
+        self.loaded, self.failed = self.data_manager.parse_files(self.names)
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
@@ -20,12 +39,15 @@ class MainWindow(QMainWindow):
 
         self.current_idx = 0
         self.selected_files = [] # 仅存当前对比的两个文件
+        self.load_worker = None
+        self.failed_files = set()  # 解析不出坐标的文件，不再重复尝试
         
         self.data_manager = EvaluatorData(LOG_DIR)
         
         pg.setConfigOptions(antialias=True)
         self.canvas = EvaluatorCanvas()
         self.canvas.canvas_clicked_pos.connect(self.on_canvas_click)
+        self.drift_canvas = DriftCanvas()
 
         self.init_ui()
         self.process_initial_data()
@@ -50,9 +72,27 @@ class MainWindow(QMainWindow):
         self.cmb_est = QComboBox()
         select_layout.addRow("Reference (GT):", self.cmb_ref)
         select_layout.addRow("Estimated:", self.cmb_est)
+
+        # APE 前的对齐 (Umeyama)，前 N 秒为 0 时使用全部配对
+        self.cmb_align = QComboBox()
+        self.cmb_align.addItems(list(ALIGN_MODES.keys()))
+        self.spin_align_sec = QSpinBox()
+        self.spin_align_sec.setRange(0, 3600)
+        self.spin_align_sec.setSuffix(" s")
+        self.spin_align_sec.setSpecialValueText("All")
+        select_layout.addRow("Alignment:", self.cmb_align)
+        select_layout.addRow("Align First:", self.spin_align_sec)
+
+        # Est 轨迹按逐点误差着色
+        self.cmb_color = QComboBox()
+        self.cmb_color.addItems(["None", "APE", "RPE"])
+        select_layout.addRow("Color By:", self.cmb_color)
         
         self.cmb_ref.currentIndexChanged.connect(self.on_selection_changed)
         self.cmb_est.currentIndexChanged.connect(self.on_selection_changed)
+        self.cmb_align.currentIndexChanged.connect(self.on_selection_changed)
+        self.spin_align_sec.valueChanged.connect(self.on_selection_changed)
+        self.cmb_color.currentIndexChanged.connect(self.on_selection_changed)
         
         grp_select.setLayout(select_layout)
         left_layout.addWidget(grp_select)
@@ -67,7 +107,21 @@ class MainWindow(QMainWindow):
         self.realtime_error_label.setStyleSheet("color: blue; font-weight: bold; font-size: 13px;")
         left_layout.addWidget(self.realtime_error_label)
 
-        # 3. 详细状态面板
+        self.latency_label = QLabel("")
+        self.latency_label.setStyleSheet("color: gray; font-size: 11px;")
+        left_layout.addWidget(self.latency_label)
+
+        # 3. 跳变事件列表 (重定位跳变 / 状态切换)，单击跳到对应帧
+        grp_jumps = QGroupBox("Jump Events")
+        jumps_layout = QVBoxLayout()
+        self.list_jumps = QListWidget()
+        self.list_jumps.setStyleSheet("font-family: Consolas, monospace; font-size: 12px;")
+        self.list_jumps.itemClicked.connect(self.on_jump_clicked)
+        jumps_layout.addWidget(self.list_jumps)
+        grp_jumps.setLayout(jumps_layout)
+        left_layout.addWidget(grp_jumps)
+
+        # 4. 详细状态面板
         self.frame_details_label = QLabel("Waiting for selection...")
         self.frame_details_label.setWordWrap(True)
         self.frame_details_label.setTextFormat(Qt.RichText)
@@ -81,7 +135,8 @@ class MainWindow(QMainWindow):
         # === 右侧绘图区 ===
         right_panel = QWidget()
         right_layout = QVBoxLayout(right_panel)
-        right_layout.addWidget(self.canvas)
+        right_layout.addWidget(self.canvas, stretch=3)
+        right_layout.addWidget(self.drift_canvas, stretch=1)
 
         splitter.addWidget(left_panel)
         splitter.addWidget(right_panel)
@@ -99,6 +154,11 @@ class MainWindow(QMainWindow):
         
         self.cmb_ref.addItems(self.data_manager.file_names)
         self.cmb_est.addItems(self.data_manager.file_names)
+        for i, fname in enumerate(self.data_manager.file_names):
+            info = self.data_manager.file_info[fname]
+            tip = f"{info['size'] / 1024 / 1024:.1f} MB | {info['start']} ~ {info['end']}"
+            self.cmb_ref.setItemData(i, tip, Qt.ToolTipRole)
+            self.cmb_est.setItemData(i, tip, Qt.ToolTipRole)
         
         # 默认选中前两个，如果不够就都选第一个
         self.cmb_ref.setCurrentIndex(0)
@@ -107,6 +167,7 @@ class MainWindow(QMainWindow):
         self.cmb_ref.blockSignals(False)
         self.cmb_est.blockSignals(False)
         
+        self.text_output.setText(msg)
         self.on_selection_changed()
 
     def on_selection_changed(self):
@@ -116,15 +177,71 @@ class MainWindow(QMainWindow):
         
         if not ref_name or not est_name: return
 
+        bad = [f for f in (ref_name, est_name) if f in self.failed_files]
+        if bad:
+            self.selected_files = []
+            self.text_output.setText("No valid coordinate data extracted from:\n" + "\n".join(bad))
+            return
+
+        # 选中的文件尚未解析时交给后台线程，解析完成后再回到这里
+        missing = [f for f in (ref_name, est_name) if not self.data_manager.is_loaded(f)]
+        if missing:
+            self.selected_files = []
+            self.text_output.setText("Loading:\n" + "\n".join(missing) + "\n...")
+            if self.load_worker is None:
+                self.load_worker = LoadWorker(self.data_manager, [ref_name, est_name])
+                self.load_worker.finished.connect(self.on_files_loaded)
+                self.load_worker.start()
+            return
+
         self.selected_files = [ref_name, est_name]
         self.current_idx = 0  # 切换轨迹时重置游标到起点
 
         # 计算并更新 evo APE/RPE 报告
-        report = self.data_manager.compute_evaluation_report(ref_name, est_name)
-        self.text_output.setText(report)
+        align_sec = self.spin_align_sec.value()
+        options = dict(align=ALIGN_MODES[self.cmb_align.currentText()],
+                       align_seconds=align_sec if align_sec > 0 else None)
+        result = self.data_manager.evaluate(ref_name, est_name, **options)
+        self.text_output.setText(format_report(result))
+        self.drift_canvas.set_drift(result.get('drift'))
         
         # 重绘画布
         self.canvas.setup_trajectories(self.selected_files, self.data_manager.trajectories)
+
+        color_by = self.cmb_color.currentText()
+        if color_by != "None":
+            # 着色缓冲区 (全部点 + 颜色档，抽稀在绘制时按视野进行) 与评估结果一起缓存，来回切换时直接取回
+            buffers = self.data_manager.cached(f'color_bins:{color_by}', ref_name, est_name, options,
+                                               lambda: self.prepare_color_buffers(ref_name, est_name, color_by, options))
+            self.canvas.show_error_coloring(buffers, label=f"{color_by} (m)")
+        self.refresh_jump_events()
+        self.update_step_display()
+
+    def on_files_loaded(self):
+        """后台解析结束：在界面线程合并结果 (含 LRU 淘汰)、记录失败的文件，并按当前下拉框选择刷新 (期间选择可能已经变化)"""
+        self.data_manager.add_trajectories(self.load_worker.loaded, self.load_worker.names)
+        self.failed_files.update(self.load_worker.failed)
+        self.load_worker = None
+        self.on_selection_changed()
+
+    def prepare_color_buffers(self, ref_name, est_name, color_by, options):
+        est_idx, errors = self.data_manager.point_errors(ref_name, est_name, kind=color_by.lower(), **options)
+        est_data = self.data_manager.trajectories[est_name]
+        return prepare_error_coloring(est_data['x'][est_idx], est_data['y'][est_idx], errors)
+
+    def refresh_jump_events(self):
+        """对选中的两条轨迹做跳变检测，按帧序号列出"""
+        self.list_jumps.clear()
+        for prefix, fname in zip(("[Ref]", "[Est]"), self.selected_files):
+            for e in detect_jumps(self.data_manager.trajectories[fname]):
+                text = (f"{prefix} #{e['index']:<6} {e['time'][11:]} {e['reason']:<10} "
+                        f"{e['jump_m']:.2f} m {e['yaw_deg']:.1f}° | {e['state_from']} -> {e['state_to']}")
+                item = QListWidgetItem(text)
+                item.setData(Qt.UserRole, e['index'])
+                self.list_jumps.addItem(item)
+
+    def on_jump_clicked(self, item):
+        self.current_idx = item.data(Qt.UserRole)
         self.update_step_display()
 
     def update_step_display(self):
@@ -136,10 +253,14 @@ class MainWindow(QMainWindow):
         
         if err_texts:
             self.realtime_error_label.setText(f"Step {self.current_idx} Offset:\n" + "\n".join(err_texts))
+        else:
+            self.realtime_error_label.setText("Ref / Est not loaded yet")
+        self.latency_label.setText(self.canvas.latency_text())
 
         # 更新下方详细姿态面板
         info_text = f"<b>--- Frame Index: {self.current_idx} ---</b><br>"
         for fname in self.selected_files:
+            if fname not in self.data_manager.trajectories: continue  # 已被淘汰或仍在后台加载
             data = self.data_manager.trajectories[fname]
             idx = min(self.current_idx, len(data['x']) - 1)
             
@@ -180,7 +301,9 @@ class MainWindow(QMainWindow):
             self.update_step_display()
 
     def keyPressEvent(self, event):
-        if event.key() == Qt.Key_Right:
+        if not self.selected_files:
+            super().keyPressEvent(event)
+        elif event.key() == Qt.Key_Right:
             # 限制不能超过较长的那条轨迹
             max_l = max(len(self.data_manager.trajectories[f]['x']) for f in self.selected_files)
             if self.current_idx < max_l - 1: